@@ -56,6 +56,39 @@ def ingest_documents(rag_system: RAGSystem, documents: List[str]) -> bool:
         return False
 
 
+def ingest_files(rag_system: RAGSystem, paths: List[str]) -> bool:
+    """
+    摄取文件
+    
+    Args:
+        rag_system: RAG系统实例
+        paths: 文件路径列表（txt、md、csv、pdf）
+    
+    Returns:
+        是否全部成功摄取
+    """
+    try:
+        logger.info(f"正在摄取 {len(paths)} 个文件...")
+        chunks = 0
+        failed_files: List[str] = []
+        failed_batches = 0
+        for result in rag_system.ingest_files(paths):
+            failed_files.extend(result["failed"])
+            if result["success"]:
+                chunks += result["count"]
+            else:
+                failed_batches += 1
+                print(f"第 {result['batch']} 批写入失败: {result['error']}")
+        
+        for path in failed_files:
+            print(f"读取文件 {path} 失败")
+        print(f"共写入 {chunks} 个分块")
+        return not failed_files and not failed_batches and chunks > 0
+    except Exception as e:
+        logger.error(f"文件摄取过程中发生错误: {str(e)}")
+        return False
+
+
 def query_system(rag_system: RAGSystem, question: str, use_rerank: bool = True) -> dict:
     """
     查询RAG系统
@@ -171,7 +204,7 @@ def main():
     parser.add_argument('--mode', choices=['interactive', 'query', 'ingest'], 
                        default='interactive', help='运行模式')
     parser.add_argument('--question', type=str, help='查询问题')
-    parser.add_argument('--documents', nargs='+', help='要摄取的文档文件路径')
+    parser.add_argument('--documents', nargs='+', help='要摄取的文件路径（txt、md、csv、pdf）')
     parser.add_argument('--no-rerank', action='store_true', help='禁用重排序')
     
     args = parser.parse_args()
@@ -191,24 +224,8 @@ def main():
             print("摄取模式下必须提供 --documents 参数")
             sys.exit(1)
         
-        # 读取文档文件
-        documents = []
-        for doc_path in args.documents:
-            try:
-                with open(doc_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if content:
-                        documents.append(content)
-                    else:
-                        print(f"警告: 文件 {doc_path} 为空")
-            except Exception as e:
-                print(f"读取文件 {doc_path} 失败: {str(e)}")
-                continue
-        
-        if documents:
-            ingest_documents(rag_system, documents)
-        else:
-            print("没有成功读取任何文档")
+        # 加载、标准化、分块后写入
+        if not ingest_files(rag_system, args.documents):
             sys.exit(1)
 
 
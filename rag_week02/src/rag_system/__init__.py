@@ -3,18 +3,27 @@ RAG系统主模块
 提供统一的导入接口
 """
 
-from .core import RAGSystem, config, logger
+from .core import RAGSystem, IngestJob, EmbeddingMigration, Document, Chunk, config, logger
 from .embeddings import CustomEmbedding
 from .database import ChromaDBManager
 from .reranker import CustomReranker
 from .llm import CustomLLM
+from .ingestion import DataLoader, PDFParser, FinancialTermStandardizer, TextChunker
 
 __all__ = [
     'RAGSystem',
+    'IngestJob',
+    'EmbeddingMigration',
+    'Document',
+    'Chunk',
     'CustomEmbedding', 
     'ChromaDBManager',
     'CustomReranker',
     'CustomLLM',
+    'DataLoader',
+    'PDFParser',
+    'FinancialTermStandardizer',
+    'TextChunker',
     'config',
     'logger'
 ]
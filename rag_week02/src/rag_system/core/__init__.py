@@ -4,6 +4,13 @@
 
 from .config import ConfigManager, config
 from .logger import setup_logger, logger, log_function_call
+from .documents import Document, Chunk
+from .pipeline import Stage, StagedPipeline
 from .rag_system import RAGSystem
+from .ingest_job import IngestJob
+from .migration import EmbeddingMigration
 
-__all__ = ['ConfigManager', 'config', 'setup_logger', 'logger', 'log_function_call', 'RAGSystem']
\ No newline at end of file
+__all__ = [
+    'ConfigManager', 'config', 'setup_logger', 'logger', 'log_function_call',
+    'Document', 'Chunk', 'Stage', 'StagedPipeline', 'RAGSystem', 'IngestJob', 'EmbeddingMigration'
+]
\ No newline at end of file
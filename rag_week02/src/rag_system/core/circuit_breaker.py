@@ -0,0 +1,184 @@
+"""
+熔断器模块
+模型服务连续失败后快速失败，避免每个请求都等到超时，并在后台探测服务恢复
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from .logger import logger
+from .config import config
+from .endpoints import is_endpoint_failure
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - 关闭（closed）：正常放行，连续failure_threshold次服务端故障后打开；
+    - 打开（open）：直接抛出CircuitOpenError，不发出请求；
+    - 半开（half_open）：只放行一个试探请求，成功则关闭，失败则重新打开。
+
+    提供probe时，打开期间由后台线程每recovery_timeout秒调用一次probe，探测成功后进入半开；
+    未提供probe时，打开recovery_timeout秒后由下一个请求作为试探请求。
+    4xx错误和限流不是服务故障，不计入失败次数。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        recovery_timeout: Optional[float] = None,
+        probe: Optional[Callable[[], bool]] = None
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            name: 名称，用于日志
+            failure_threshold: 连续失败多少次后打开，默认使用配置值
+            recovery_timeout: 打开后多少秒开始试探恢复，默认使用配置值
+            probe: 探测服务是否恢复的函数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or config.scheduler.breaker_failure_threshold
+        self.recovery_timeout = (
+            config.scheduler.breaker_recovery_seconds if recovery_timeout is None else recovery_timeout
+        )
+        self.probe = probe
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> str:
+        """当前状态"""
+        with self._lock:
+            return self._state
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """
+        通过熔断器执行调用
+
+        Args:
+            func: 执行请求的函数
+
+        Returns:
+            func的返回值
+
+        Raises:
+            CircuitOpenError: 熔断器打开时
+        """
+        trial = self._before_call()
+        try:
+            result = func()
+        except Exception as e:
+            if is_endpoint_failure(e):
+                self._on_failure(trial, e)
+            else:
+                self._on_success(trial)
+            raise
+        self._on_success(trial)
+        return result
+
+    def reset(self) -> None:
+        """强制关闭熔断器"""
+        with self._lock:
+            self._close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取熔断器状态
+
+        Returns:
+            包含state、failures和rejected字段的字典
+        """
+        with self._lock:
+            return {"state": self._state, "failures": self._failures, "rejected": self._rejected}
+
+    def _before_call(self) -> bool:
+        """判断是否放行，返回本次调用是否为试探请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if (self._state == self.OPEN and self.probe is None
+                    and time.monotonic() - self._opened_at >= self.recovery_timeout):
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self._rejected += 1
+            remaining = max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+        raise CircuitOpenError(f"{self.name}服务熔断中，约 {remaining:.0f} 秒后重试")
+
+    def _on_success(self, trial: bool) -> None:
+        with self._lock:
+            if trial or self._state != self.CLOSED:
+                logger.info(f"{self.name}服务已恢复，熔断器关闭")
+            self._close()
+
+    def _on_failure(self, trial: bool, error: Exception) -> None:
+        with self._lock:
+            self._failures += 1
+            if trial:
+                self._trial_in_flight = False
+            if not trial and (self._state != self.CLOSED or self._failures < self.failure_threshold):
+                return
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+        logger.warning(f"{self.name}服务连续失败 {self._failures} 次，熔断器打开: {str(error)}")
+        self._start_probe()
+
+    def _close(self) -> None:
+        """关闭熔断器（调用方持有锁）"""
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def _start_probe(self) -> None:
+        """熔断器打开时启动后台探测线程"""
+        if self.probe is None:
+            return
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, name=f"breaker-probe-{self.name}", daemon=True
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        """周期性探测服务，探测成功后进入半开状态"""
+        while True:
+            time.sleep(self.recovery_timeout)
+            with self._lock:
+                if self._state != self.OPEN:
+                    self._probe_thread = None
+                    return
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self._state == self.OPEN:
+                        self._state = self.HALF_OPEN
+                        self._trial_in_flight = False
+                logger.info(f"{self.name}服务探测成功，熔断器进入半开状态")
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker(name='{self.name}', state='{self._state}')"
@@ -4,7 +4,7 @@
 """
 
 import os
-from typing import Optional
+from typing import Optional, Tuple
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
@@ -18,6 +18,8 @@ class EmbeddingConfig:
     api_key: str
     base_url: str
     model_name: str
+    rpm: int = 0
+    tpm: int = 0
     
     @classmethod
     def from_env(cls) -> 'EmbeddingConfig':
@@ -25,7 +27,9 @@ class EmbeddingConfig:
         return cls(
             api_key=os.getenv('EMBEDDING_API_KEY', ''),
             base_url=os.getenv('EMBEDDING_BASE_URL', '/api/inference/v1'),
-            model_name=os.getenv('EMBEDDING_MODEL_NAME', 'bge-large-zh-v1.5')
+            model_name=os.getenv('EMBEDDING_MODEL_NAME', 'bge-large-zh-v1.5'),
+            rpm=int(os.getenv('EMBEDDING_RPM', '0')),
+            tpm=int(os.getenv('EMBEDDING_TPM', '0'))
         )
 
 
@@ -35,6 +39,9 @@ class RerankerConfig:
     api_key: str
     base_url: str
     model_name: str
+    rpm: int = 0
+    tpm: int = 0
+    timeout: float = 30.0
     
     @classmethod
     def from_env(cls) -> 'RerankerConfig':
@@ -42,7 +49,10 @@ class RerankerConfig:
         return cls(
             api_key=os.getenv('RERANKER_API_KEY', ''),
             base_url=os.getenv('RERANKER_BASE_URL', '/api/inference/v1'),
-            model_name=os.getenv('RERANKER_MODEL_NAME', 'bge-reranker-v2-m3')
+            model_name=os.getenv('RERANKER_MODEL_NAME', 'bge-reranker-v2-m3'),
+            rpm=int(os.getenv('RERANKER_RPM', '0')),
+            tpm=int(os.getenv('RERANKER_TPM', '0')),
+            timeout=float(os.getenv('RERANKER_TIMEOUT', '30'))
         )
 
 
@@ -52,6 +62,8 @@ class LLMConfig:
     api_key: str
     base_url: str
     model_name: str
+    rpm: int = 0
+    tpm: int = 0
     
     @classmethod
     def from_env(cls) -> 'LLMConfig':
@@ -59,7 +71,9 @@ class LLMConfig:
         return cls(
             api_key=os.getenv('LLM_API_KEY', ''),
             base_url=os.getenv('LLM_BASE_URL', '/api/inference/v1'),
-            model_name=os.getenv('LLM_MODEL_NAME', 'GLM-4.6-FP8')
+            model_name=os.getenv('LLM_MODEL_NAME', 'GLM-4.6-FP8'),
+            rpm=int(os.getenv('LLM_RPM', '0')),
+            tpm=int(os.getenv('LLM_TPM', '0'))
         )
 
 
@@ -68,13 +82,116 @@ class DatabaseConfig:
     """数据库配置"""
     collection_name: str
     persist_directory: Optional[str] = None
+    batch_size: int = 500
+    manifest_path: Optional[str] = None
+    index_fields: Tuple[str, ...] = ('source', 'page', 'method')
+    index_directory: Optional[str] = None
+    external_documents: bool = False
+    document_store_directory: Optional[str] = None
+    document_block_size: int = 64
+    document_cache_blocks: int = 32
+    pool_size: int = 32
+    pool_idle_seconds: float = 600.0
     
     @classmethod
     def from_env(cls) -> 'DatabaseConfig':
         """从环境变量创建配置"""
+        persist_directory = os.getenv('CHROMA_PERSIST_DIRECTORY', None)
+        default_manifest = os.path.join(persist_directory, 'ingest_manifest.json') if persist_directory else None
+        index_fields = os.getenv('CHROMA_INDEX_FIELDS', 'source,page,method')
         return cls(
             collection_name=os.getenv('CHROMA_COLLECTION_NAME', 'rag_collection'),
-            persist_directory=os.getenv('CHROMA_PERSIST_DIRECTORY', None)
+            persist_directory=persist_directory,
+            batch_size=int(os.getenv('CHROMA_BATCH_SIZE', '500')),
+            manifest_path=os.getenv('CHROMA_MANIFEST_PATH', default_manifest),
+            index_fields=tuple(field.strip() for field in index_fields.split(',') if field.strip()),
+            index_directory=os.getenv('CHROMA_INDEX_DIRECTORY', persist_directory),
+            external_documents=os.getenv('CHROMA_EXTERNAL_DOCUMENTS', 'false').lower() in ('1', 'true', 'yes'),
+            document_store_directory=os.getenv('CHROMA_DOCUMENT_STORE_DIRECTORY', persist_directory),
+            document_block_size=int(os.getenv('CHROMA_DOCUMENT_BLOCK_SIZE', '64')),
+            document_cache_blocks=int(os.getenv('CHROMA_DOCUMENT_CACHE_BLOCKS', '32')),
+            pool_size=int(os.getenv('CHROMA_POOL_SIZE', '32')),
+            pool_idle_seconds=float(os.getenv('CHROMA_POOL_IDLE_SECONDS', '600'))
+        )
+
+
+@dataclass
+class IngestConfig:
+    """文档摄取流水线配置"""
+    batch_size: int = 64
+    queue_size: int = 4
+    embed_workers: int = 2
+    store_workers: int = 1
+    journal_dir: str = 'ingest_jobs'
+    max_retries: int = 3
+    files_per_batch: int = 8
+    load_workers: int = 2
+    standardize_workers: int = 1
+    chunk_workers: int = 1
+    chunk_size: int = 400
+    chunk_overlap: int = 40
+    chunk_method: str = 'recursive'
+    chunk_unit: str = 'tokens'
+    terms_path: str = ''
+    pdf_workers: int = 1
+    pdf_pages_per_task: int = 16
+    pdf_profile: str = 'text'
+    parse_cache_path: str = ''
+    csv_rows: int = 100
+    
+    @classmethod
+    def from_env(cls) -> 'IngestConfig':
+        """从环境变量创建配置"""
+        return cls(
+            batch_size=int(os.getenv('INGEST_BATCH_SIZE', '64')),
+            queue_size=int(os.getenv('INGEST_QUEUE_SIZE', '4')),
+            embed_workers=int(os.getenv('INGEST_EMBED_WORKERS', '2')),
+            store_workers=int(os.getenv('INGEST_STORE_WORKERS', '1')),
+            journal_dir=os.getenv('INGEST_JOURNAL_DIR', 'ingest_jobs'),
+            max_retries=int(os.getenv('INGEST_MAX_RETRIES', '3')),
+            files_per_batch=int(os.getenv('INGEST_FILES_PER_BATCH', '8')),
+            load_workers=int(os.getenv('INGEST_LOAD_WORKERS', '2')),
+            standardize_workers=int(os.getenv('INGEST_STANDARDIZE_WORKERS', '1')),
+            chunk_workers=int(os.getenv('INGEST_CHUNK_WORKERS', '1')),
+            chunk_size=int(os.getenv('INGEST_CHUNK_SIZE', '400')),
+            chunk_overlap=int(os.getenv('INGEST_CHUNK_OVERLAP', '40')),
+            chunk_method=os.getenv('INGEST_CHUNK_METHOD', 'recursive'),
+            chunk_unit=os.getenv('INGEST_CHUNK_UNIT', 'tokens'),
+            terms_path=os.getenv('INGEST_TERMS_PATH', ''),
+            pdf_workers=int(os.getenv('INGEST_PDF_WORKERS', '1')),
+            pdf_pages_per_task=int(os.getenv('INGEST_PDF_PAGES_PER_TASK', '16')),
+            pdf_profile=os.getenv('INGEST_PDF_PROFILE', 'text'),
+            parse_cache_path=os.getenv('INGEST_PARSE_CACHE_PATH', ''),
+            csv_rows=int(os.getenv('INGEST_CSV_ROWS', '100'))
+        )
+
+
+@dataclass
+class SchedulerConfig:
+    """模型调用调度配置"""
+    interactive_concurrency: int = 16
+    bulk_concurrency: int = 2
+    failure_threshold: int = 3
+    ejection_seconds: float = 30.0
+    health_check_interval: float = 10.0
+    hedge_requests: bool = False
+    hedge_percentile: float = 95.0
+    breaker_failure_threshold: int = 5
+    breaker_recovery_seconds: float = 30.0
+    
+    @classmethod
+    def from_env(cls) -> 'SchedulerConfig':
+        """从环境变量创建配置"""
+        return cls(
+            interactive_concurrency=int(os.getenv('SCHEDULER_INTERACTIVE_CONCURRENCY', '16')),
+            bulk_concurrency=int(os.getenv('SCHEDULER_BULK_CONCURRENCY', '2')),
+            failure_threshold=int(os.getenv('SCHEDULER_FAILURE_THRESHOLD', '3')),
+            ejection_seconds=float(os.getenv('SCHEDULER_EJECTION_SECONDS', '30')),
+            health_check_interval=float(os.getenv('SCHEDULER_HEALTH_CHECK_INTERVAL', '10')),
+            hedge_requests=os.getenv('SCHEDULER_HEDGE_REQUESTS', 'false').lower() in ('1', 'true', 'yes'),
+            hedge_percentile=float(os.getenv('SCHEDULER_HEDGE_PERCENTILE', '95')),
+            breaker_failure_threshold=int(os.getenv('SCHEDULER_BREAKER_FAILURE_THRESHOLD', '5')),
+            breaker_recovery_seconds=float(os.getenv('SCHEDULER_BREAKER_RECOVERY_SECONDS', '30'))
         )
 
 
@@ -103,6 +220,8 @@ class ConfigManager:
         self.reranker = RerankerConfig.from_env()
         self.llm = LLMConfig.from_env()
         self.database = DatabaseConfig.from_env()
+        self.ingest = IngestConfig.from_env()
+        self.scheduler = SchedulerConfig.from_env()
         self.logging = LoggingConfig.from_env()
     
     def validate_config(self) -> bool:
@@ -132,21 +251,71 @@ class ConfigManager:
             'embedding': {
                 'api_key': '***' if self.embedding.api_key else '',
                 'base_url': self.embedding.base_url,
-                'model_name': self.embedding.model_name
+                'model_name': self.embedding.model_name,
+                'rpm': self.embedding.rpm,
+                'tpm': self.embedding.tpm
             },
             'reranker': {
                 'api_key': '***' if self.reranker.api_key else '',
                 'base_url': self.reranker.base_url,
-                'model_name': self.reranker.model_name
+                'model_name': self.reranker.model_name,
+                'rpm': self.reranker.rpm,
+                'tpm': self.reranker.tpm,
+                'timeout': self.reranker.timeout
             },
             'llm': {
                 'api_key': '***' if self.llm.api_key else '',
                 'base_url': self.llm.base_url,
-                'model_name': self.llm.model_name
+                'model_name': self.llm.model_name,
+                'rpm': self.llm.rpm,
+                'tpm': self.llm.tpm
             },
             'database': {
                 'collection_name': self.database.collection_name,
-                'persist_directory': self.database.persist_directory
+                'persist_directory': self.database.persist_directory,
+                'batch_size': self.database.batch_size,
+                'manifest_path': self.database.manifest_path,
+                'index_fields': list(self.database.index_fields),
+                'index_directory': self.database.index_directory,
+                'external_documents': self.database.external_documents,
+                'document_store_directory': self.database.document_store_directory,
+                'document_block_size': self.database.document_block_size,
+                'document_cache_blocks': self.database.document_cache_blocks,
+                'pool_size': self.database.pool_size,
+                'pool_idle_seconds': self.database.pool_idle_seconds
+            },
+            'ingest': {
+                'batch_size': self.ingest.batch_size,
+                'queue_size': self.ingest.queue_size,
+                'embed_workers': self.ingest.embed_workers,
+                'store_workers': self.ingest.store_workers,
+                'journal_dir': self.ingest.journal_dir,
+                'max_retries': self.ingest.max_retries,
+                'files_per_batch': self.ingest.files_per_batch,
+                'load_workers': self.ingest.load_workers,
+                'standardize_workers': self.ingest.standardize_workers,
+                'chunk_workers': self.ingest.chunk_workers,
+                'chunk_size': self.ingest.chunk_size,
+                'chunk_overlap': self.ingest.chunk_overlap,
+                'chunk_method': self.ingest.chunk_method,
+                'chunk_unit': self.ingest.chunk_unit,
+                'terms_path': self.ingest.terms_path,
+                'pdf_workers': self.ingest.pdf_workers,
+                'pdf_pages_per_task': self.ingest.pdf_pages_per_task,
+                'pdf_profile': self.ingest.pdf_profile,
+                'parse_cache_path': self.ingest.parse_cache_path,
+                'csv_rows': self.ingest.csv_rows
+            },
+            'scheduler': {
+                'interactive_concurrency': self.scheduler.interactive_concurrency,
+                'bulk_concurrency': self.scheduler.bulk_concurrency,
+                'failure_threshold': self.scheduler.failure_threshold,
+                'ejection_seconds': self.scheduler.ejection_seconds,
+                'health_check_interval': self.scheduler.health_check_interval,
+                'hedge_requests': self.scheduler.hedge_requests,
+                'hedge_percentile': self.scheduler.hedge_percentile,
+                'breaker_failure_threshold': self.scheduler.breaker_failure_threshold,
+                'breaker_recovery_seconds': self.scheduler.breaker_recovery_seconds
             },
             'logging': {
                 'level': self.logging.level,
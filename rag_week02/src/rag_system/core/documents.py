@@ -0,0 +1,154 @@
+"""
+文档模型模块
+摄取流水线中流转的文档和分块，使用__slots__减少大量小对象的内存开销
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+class Document:
+    """
+    待摄取的文档
+
+    使用__slots__保存文本、元数据和ID，支持doc["text"]和doc.get("metadata")形式的访问，
+    也可以像之前的(文本, 元数据)元组一样解包和比较。
+    """
+
+    __slots__ = ("text", "metadata", "id")
+
+    def __init__(self, text: str, metadata: Optional[Dict[str, Any]] = None, id: Optional[str] = None):
+        self.text = text
+        self.metadata = metadata if metadata is not None else {}
+        self.id = id
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """按字段名取值，字段不存在或为None时返回默认值"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __iter__(self) -> Iterator[Any]:
+        """按(文本, 元数据)解包"""
+        yield self.text
+        yield self.metadata
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Document):
+            return (self.text, self.metadata, self.id) == (other.text, other.metadata, other.id)
+        if isinstance(other, tuple):
+            return (self.text, self.metadata) == other
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Document(id={self.id!r}, length={len(self.text)}, metadata={self.metadata!r})"
+
+
+class Chunk:
+    """
+    文本分块
+
+    分块不复制文本，只保存源文本的引用和位置，content在访问时切片得到。
+    start和end为分块在全文中的位置，base为源文本第一个字符在全文中的位置
+    （一次性分块时为0，流式分块时源文本是当前窗口）。
+    支持chunk["content"]和chunk["metadata"]形式的访问，与之前返回字典的调用方式兼容。
+    """
+
+    __slots__ = ("source", "start", "end", "method", "base")
+
+    FIELDS = ("content", "metadata")
+
+    def __init__(self, source: str, start: int, end: int, method: str, base: int = 0):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.method = method
+        self.base = base
+
+    @property
+    def content(self) -> str:
+        """分块文本"""
+        return self.source[self.start - self.base:self.end - self.base]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """分块元数据（start、end、method）"""
+        return {"start": self.start, "end": self.end, "method": self.method}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """按字段名取值，字段不存在时返回默认值"""
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"content": self.content, "metadata": self.metadata}
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Chunk):
+            return self.metadata == other.metadata and self.content == other.content
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Chunk(start={self.start}, end={self.end}, method='{self.method}')"
+
+
+def unpack_documents(
+    documents: Sequence[Union[str, Document]],
+    metadatas: Optional[List[Dict]] = None,
+    ids: Optional[List[str]] = None
+) -> Tuple[List[str], Optional[List[Dict]], Optional[List[str]]]:
+    """
+    把Document列表拆分为文本、元数据和ID列表
+
+    字符串列表原样返回；显式传入的metadatas和ids优先于Document中的字段，
+    Document的ID只有在全部提供时才使用，否则由调用方生成。
+
+    Args:
+        documents: 文档内容或Document列表
+        metadatas: 文档元数据列表
+        ids: 文档ID列表
+
+    Returns:
+        (文本列表, 元数据列表, ID列表)
+    """
+    if not any(isinstance(document, Document) for document in documents):
+        return documents, metadatas, ids
+
+    texts = [document.text if isinstance(document, Document) else document for document in documents]
+    if metadatas is None:
+        metadatas = [
+            document.metadata if isinstance(document, Document) and document.metadata else {"source": "default"}
+            for document in documents
+        ]
+    if ids is None and all(isinstance(document, Document) and document.id for document in documents):
+        ids = [document.id for document in documents]
+    return texts, metadatas, ids
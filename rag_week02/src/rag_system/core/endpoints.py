@@ -0,0 +1,438 @@
+"""
+模型端点负载均衡模块
+一个组件配置多个推理服务地址时，按未完成请求数和延迟选择端点，连续失败的端点暂时摘除
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from .logger import logger
+from .config import config
+from .scheduler import RateLimitError
+
+
+def parse_urls(value: Union[str, Sequence[str]]) -> List[str]:
+    """解析逗号分隔的端点地址列表"""
+    if not isinstance(value, (list, tuple)):
+        value = str(value).split(',')
+    return [url.strip().rstrip('/') for url in value if url and url.strip()]
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """取异常携带的HTTP状态码"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_endpoint_failure(error: Exception) -> bool:
+    """
+    判断异常是否说明服务端故障
+
+    网络错误、超时和5xx是服务端故障；4xx由请求本身引起，限流说明服务端正常但额度不足，都不算故障。
+    """
+    if isinstance(error, RateLimitError):
+        return False
+    status = _status_code(error)
+    return status is None or status >= 500
+
+
+class EndpointError(RuntimeError):
+    """端点返回服务端错误"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Endpoint:
+    """单个推理服务端点"""
+
+    def __init__(self, url: str, factory: Optional[Callable[[str], Any]] = None):
+        """
+        初始化端点
+
+        Args:
+            url: 端点地址
+            factory: 根据地址创建客户端的函数，客户端在首次使用时创建
+        """
+        self.url = url
+        self._factory = factory
+        self._client = None
+        self.outstanding = 0
+        # 延迟的指数加权移动平均（秒），None表示尚未测得
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> Any:
+        """该端点的客户端"""
+        if self._client is None and self._factory is not None:
+            self._client = self._factory(self.url)
+        return self._client
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def __repr__(self) -> str:
+        return f"Endpoint(url='{self.url}', outstanding={self.outstanding})"
+
+
+class EndpointPool:
+    """
+    端点池
+
+    每次调用选择(未完成请求数+1)×延迟EWMA最小的端点，尚未测得延迟的端点优先试探。
+    调用失败（网络错误、超时或5xx）时换一个端点重试；连续失败达到failure_threshold次的端点
+    被摘除ejection_seconds秒，到期后放回一次试探请求，再次失败立即重新摘除。
+    被摘除的端点还会由后台线程按health_check_interval主动探测，探测成功后提前恢复。
+    4xx错误和限流不是端点故障，直接抛出，不切换端点也不计入失败次数。
+
+    对幂等调用可以启用对冲：请求在最近成功调用延迟的hedge_percentile分位内没有返回时，
+    向另一个端点发出第二份相同的请求，使用先成功返回的结果。
+    """
+
+    # 延迟EWMA中最新样本的权重
+    EWMA_ALPHA = 0.3
+    # 计算对冲延迟使用的最近延迟样本数，样本不足HEDGE_MIN_SAMPLES时不对冲
+    LATENCY_WINDOW = 256
+    HEDGE_MIN_SAMPLES = 20
+    # 对冲请求最多占全部请求的比例，避免整体变慢时请求量翻倍
+    HEDGE_MAX_RATIO = 0.1
+    # 执行对冲调用的线程数上限
+    HEDGE_WORKERS = 64
+
+    def __init__(
+        self,
+        urls: Union[str, Sequence[str]],
+        factory: Optional[Callable[[str], Any]] = None,
+        health_check: Optional[Callable[[Endpoint], bool]] = None,
+        failure_threshold: Optional[int] = None,
+        ejection_seconds: Optional[float] = None,
+        health_check_interval: Optional[float] = None,
+        hedge_percentile: Optional[float] = None
+    ):
+        """
+        初始化端点池
+
+        Args:
+            urls: 端点地址列表或逗号分隔的字符串
+            factory: 根据地址创建客户端的函数
+            health_check: 健康检查函数，返回端点是否可用
+            failure_threshold: 连续失败多少次后摘除端点，默认使用配置值
+            ejection_seconds: 摘除时长，默认使用配置值
+            health_check_interval: 主动探测被摘除端点的间隔秒数，默认使用配置值，0表示不主动探测
+            hedge_percentile: 发出对冲请求的延迟分位数（0-100），默认使用配置值，0表示不对冲
+        """
+        urls = parse_urls(urls)
+        if not urls:
+            raise ValueError("至少需要一个端点地址")
+
+        self.endpoints = [Endpoint(url, factory) for url in urls]
+        self.health_check = health_check
+        self.failure_threshold = failure_threshold or config.scheduler.failure_threshold
+        self.ejection_seconds = config.scheduler.ejection_seconds if ejection_seconds is None else ejection_seconds
+        self.health_check_interval = (
+            config.scheduler.health_check_interval if health_check_interval is None else health_check_interval
+        )
+        self.hedge_percentile = config.scheduler.hedge_percentile if hedge_percentile is None else hedge_percentile
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._latencies: deque = deque(maxlen=self.LATENCY_WINDOW)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def select(self, exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        """
+        选择一个端点并计入未完成请求，调用结束后必须调用complete
+
+        Args:
+            exclude: 本次调用已经试过的端点
+
+        Returns:
+            选中的端点
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude] or self.endpoints
+            healthy = [endpoint for endpoint in candidates if endpoint.available(now)]
+            if not healthy:
+                # 全部被摘除时选择最早恢复的端点，避免组件完全不可用
+                healthy = [min(candidates, key=lambda endpoint: endpoint.ejected_until)]
+            endpoint = min(healthy, key=self._score)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def complete(self, endpoint: Endpoint, elapsed: Optional[float], error: Optional[Exception] = None) -> None:
+        """
+        结束一次调用
+
+        Args:
+            endpoint: select返回的端点
+            elapsed: 调用耗时，None表示不计入延迟统计
+            error: 端点故障，None表示成功
+        """
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if error is None:
+                if elapsed is not None:
+                    self._latencies.append(elapsed)
+                    endpoint.latency = (
+                        elapsed if endpoint.latency is None
+                        else self.EWMA_ALPHA * elapsed + (1 - self.EWMA_ALPHA) * endpoint.latency
+                    )
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+                return
+
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures < self.failure_threshold:
+                return
+            endpoint.ejected_until = time.monotonic() + self.ejection_seconds
+            eject = len(self.endpoints) > 1
+
+        if eject:
+            logger.warning(
+                f"端点 {endpoint.url} 连续失败 {endpoint.failures} 次，摘除 {self.ejection_seconds:.0f} 秒: {str(error)}"
+            )
+            self._start_health_checks()
+
+    def call(
+        self,
+        func: Callable[[Endpoint], Any],
+        attempts: Optional[int] = None,
+        hedge: bool = False,
+        exclude: Sequence[Endpoint] = ()
+    ) -> Any:
+        """
+        在选中的端点上执行调用，端点故障时换一个端点重试
+
+        Args:
+            func: 输入端点、执行请求的函数
+            attempts: 最多尝试的端点数，默认为端点总数
+            hedge: 是否对慢请求发出对冲请求，只能用于幂等调用
+            exclude: 优先避开的端点
+
+        Returns:
+            func的返回值
+        """
+        if hedge:
+            delay = self.hedge_delay()
+            if delay is not None:
+                return self._hedged_call(func, attempts, delay)
+
+        with self._lock:
+            self._calls += 1
+        attempts = attempts or len(self.endpoints)
+        tried: List[Endpoint] = list(exclude)
+        for attempt in range(attempts):
+            endpoint = self.select(exclude=tried)
+            start = time.perf_counter()
+            try:
+                result = func(endpoint)
+            except Exception as e:
+                if not is_endpoint_failure(e):
+                    self.complete(endpoint, None)
+                    raise
+                self.complete(endpoint, time.perf_counter() - start, e)
+                tried.append(endpoint)
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(f"端点 {endpoint.url} 调用失败，切换到其他端点: {str(e)}")
+                continue
+            self.complete(endpoint, time.perf_counter() - start)
+            return result
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        发出对冲请求前的等待秒数
+
+        Returns:
+            最近成功调用延迟的hedge_percentile分位；样本不足、未启用或对冲比例已达上限时为None
+        """
+        with self._lock:
+            if not self.hedge_percentile or len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+                return None
+            if self._hedged > self.HEDGE_MAX_RATIO * max(1, self._calls):
+                return None
+            samples = sorted(self._latencies)
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[index]
+
+    def _hedged_call(self, func: Callable[[Endpoint], Any], attempts: Optional[int], delay: float) -> Any:
+        """
+        发出主请求，超过delay秒未返回时向另一个端点发出对冲请求，返回先成功的结果。
+        没有其他可用端点时不对冲，只等待主请求，避免把同一个端点的负载翻倍。
+
+        Python线程无法中断，落后的请求不会被真正取消：尚未开始的直接取消，已经发出的继续完成，
+        其结果被丢弃，但延迟和失败仍计入端点统计。
+        """
+        chosen: List[Endpoint] = []
+
+        def tracked(endpoint: Endpoint) -> Any:
+            chosen.append(endpoint)
+            return func(endpoint)
+
+        executor = self._hedge_executor()
+        # 在调用方的上下文中运行，使优先级通道等上下文变量在工作线程中保持不变
+        primary = executor.submit(contextvars.copy_context().run, self.call, tracked, attempts)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._has_alternative(chosen[-1:]):
+            return primary.result()
+
+        with self._lock:
+            self._hedged += 1
+        hedge = executor.submit(
+            contextvars.copy_context().run, self.call, func, attempts, False, chosen[-1:]
+        )
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for other in pending:
+                    other.cancel()
+                if future is hedge:
+                    with self._lock:
+                        self._hedge_wins += 1
+                return future.result()
+        raise error
+
+    def _has_alternative(self, exclude: Sequence[Endpoint]) -> bool:
+        """判断除exclude之外是否还有未被摘除的端点"""
+        now = time.monotonic()
+        with self._lock:
+            return any(endpoint not in exclude and endpoint.available(now) for endpoint in self.endpoints)
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        """执行对冲调用的线程池（首次使用时创建）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.HEDGE_WORKERS, thread_name_prefix="endpoint-hedge")
+            return self._executor
+
+    def check_health(self) -> int:
+        """
+        探测被摘除的端点，探测成功的端点立即恢复
+
+        Returns:
+            恢复的端点数量
+        """
+        if self.health_check is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            ejected = [endpoint for endpoint in self.endpoints if not endpoint.available(now)]
+
+        recovered = 0
+        for endpoint in ejected:
+            try:
+                healthy = self.health_check(endpoint)
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    endpoint.ejected_until = 0.0
+                recovered += 1
+                logger.info(f"端点 {endpoint.url} 健康检查通过，恢复使用")
+        return recovered
+
+    def probe(self) -> bool:
+        """依次对各端点做健康检查，任意一个通过即返回True；未配置健康检查时返回False"""
+        if self.health_check is None:
+            return False
+        for endpoint in self.endpoints:
+            try:
+                if self.health_check(endpoint):
+                    return True
+            except Exception:
+                continue
+        return False
+
+    def close(self) -> None:
+        """停止后台健康检查和对冲线程池"""
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        """
+        获取对冲统计信息
+
+        Returns:
+            包含calls、hedged、hedge_wins和delay字段的字典，hedge_wins为对冲请求先返回的次数
+        """
+        delay = self.hedge_delay()
+        with self._lock:
+            return {"calls": self._calls, "hedged": self._hedged, "hedge_wins": self._hedge_wins, "delay": delay}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点的统计信息
+
+        Returns:
+            地址到统计信息的映射，包含requests、errors、outstanding、latency和ejected字段
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                endpoint.url: {
+                    "requests": endpoint.requests,
+                    "errors": endpoint.errors,
+                    "outstanding": endpoint.outstanding,
+                    "latency": endpoint.latency,
+                    "ejected": not endpoint.available(now)
+                }
+                for endpoint in self.endpoints
+            }
+
+    @staticmethod
+    def _score(endpoint: Endpoint):
+        """选择端点的排序键：未完成请求越多、延迟越高越靠后"""
+        latency = endpoint.latency if endpoint.latency is not None else 0.0
+        return (endpoint.outstanding + 1) * latency, endpoint.outstanding
+
+    def _start_health_checks(self) -> None:
+        """有端点被摘除时启动后台健康检查线程"""
+        if self.health_check is None or self.health_check_interval <= 0:
+            return
+        with self._lock:
+            if self._health_thread is not None and self._health_thread.is_alive():
+                return
+            self._health_thread = threading.Thread(target=self._health_loop, name="endpoint-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        """周期性探测被摘除的端点，没有被摘除的端点时退出"""
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
+            now = time.monotonic()
+            with self._lock:
+                if all(endpoint.available(now) for endpoint in self.endpoints):
+                    self._health_thread = None
+                    return
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def __repr__(self) -> str:
+        return f"EndpointPool(urls={self.urls})"
@@ -0,0 +1,194 @@
+"""
+可恢复摄取任务模块
+将已完成的批次记录到本地日志，任务中断后从上次提交的位置继续
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+from .logger import logger
+from .config import config
+from ..database.manifest import assign_document_ids
+
+if TYPE_CHECKING:
+    from .rag_system import RAGSystem
+
+
+class IngestJob:
+    """
+    可恢复的摄取任务
+
+    输入按固定大小切分为批次，每批写入成功后追加一条记录到任务日志（JSONL）。
+    再次运行同一任务时跳过日志中已提交的批次，失败的批次在本次运行内按指数退避重试，
+    连续两次以相同错误失败的批次视为确定性错误，不再重试。
+    """
+
+    def __init__(
+        self,
+        rag_system: 'RAGSystem',
+        job_id: str,
+        journal_dir: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: float = 1.0
+    ):
+        """
+        初始化摄取任务
+
+        Args:
+            rag_system: RAG系统实例
+            job_id: 任务ID，相同ID的任务共享同一份日志
+            journal_dir: 任务日志目录，默认使用配置值
+            batch_size: 每批文档数量，续传时必须与首次运行一致
+            max_retries: 失败批次的最大重试次数
+            retry_delay: 首次重试前的等待秒数，之后每次翻倍
+        """
+        if not job_id:
+            raise ValueError("任务ID不能为空")
+
+        self.rag_system = rag_system
+        self.job_id = job_id
+        self.journal_dir = journal_dir or config.ingest.journal_dir
+        self.batch_size = batch_size or config.ingest.batch_size
+        self.max_retries = config.ingest.max_retries if max_retries is None else max_retries
+        self.retry_delay = retry_delay
+        self.journal_path = os.path.join(self.journal_dir, f"{job_id}.jsonl")
+
+    def completed_batches(self) -> Dict[int, str]:
+        """
+        读取任务日志中已提交的批次
+
+        Returns:
+            批次序号到该批文档ID指纹的映射
+        """
+        completed: Dict[int, str] = {}
+        if not os.path.exists(self.journal_path):
+            return completed
+
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程在写入最后一行时中断，忽略不完整的记录
+                    continue
+                completed[entry["batch"]] = entry["fingerprint"]
+        return completed
+
+    def run(
+        self,
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Dict]] = None,
+        ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        运行或继续摄取任务
+
+        Args:
+            documents: 文档内容列表，续传时必须与首次运行的输入相同
+            metadatas: 文档元数据列表
+            ids: 文档ID列表，为空时根据来源和内容哈希生成确定性ID
+
+        Returns:
+            任务统计信息，包含batches、committed、skipped、failed和success字段
+        """
+        if metadatas is None:
+            metadatas = [{"source": "default"} for _ in documents]
+        if ids is None:
+            ids = assign_document_ids(documents, metadatas)
+        if not len(documents) == len(metadatas) == len(ids):
+            raise ValueError("documents、metadatas和ids的长度不一致")
+
+        total_batches = (len(documents) + self.batch_size - 1) // self.batch_size
+        completed = self.completed_batches()
+        if completed:
+            logger.info(f"任务 {self.job_id} 从断点继续，日志中已提交 {len(completed)} 批")
+
+        committed = 0
+        skipped = 0
+        failed: List[int] = []
+        errors: Dict[int, str] = {}
+        retryable: List[int] = []
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                if not retryable:
+                    break
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                logger.warning(f"任务 {self.job_id} 有 {len(retryable)} 批失败，{delay:.1f} 秒后第 {attempt} 次重试")
+                time.sleep(delay)
+
+            pending = set(retryable) if attempt > 0 else None
+            fingerprints: Dict[int, str] = {}
+            pass_errors: Dict[int, str] = {}
+
+            def skip_batch(index: int, batch_ids: List[str]) -> bool:
+                nonlocal skipped
+                if pending is not None and index not in pending:
+                    return True
+                fingerprint = self._fingerprint(batch_ids)
+                if pending is None and completed.get(index) == fingerprint:
+                    skipped += 1
+                    return True
+                fingerprints[index] = fingerprint
+                return False
+
+            records = zip(documents, metadatas, ids)
+            for result in self.rag_system.ingest_stream(records, batch_size=self.batch_size, skip_batch=skip_batch):
+                if result["success"]:
+                    self._commit(result["batch"], fingerprints[result["batch"]], result["count"])
+                    completed[result["batch"]] = fingerprints[result["batch"]]
+                    committed += 1
+                else:
+                    pass_errors[result["batch"]] = str(result["error"])
+
+            # 同一批次连续两次以相同错误失败时视为确定性错误（如数据问题），不再重试
+            retryable = [index for index, error in pass_errors.items() if errors.get(index) != error]
+            for index in pass_errors:
+                if index not in retryable:
+                    logger.error(f"任务 {self.job_id} 第 {index} 批重复出现相同错误，停止重试: {pass_errors[index]}")
+            for index in pending or ():
+                errors.pop(index, None)
+            errors.update(pass_errors)
+            failed = sorted(errors)
+
+            if not pass_errors:
+                break
+
+        stats = {
+            "job_id": self.job_id,
+            "batches": total_batches,
+            "committed": committed,
+            "skipped": skipped,
+            "failed": failed,
+            "success": not failed
+        }
+        if failed:
+            logger.error(f"任务 {self.job_id} 仍有 {len(failed)} 批失败，重新运行任务将只处理这些批次")
+        else:
+            logger.info(f"任务 {self.job_id} 完成，本次提交 {committed} 批，跳过 {skipped} 批")
+        return stats
+
+    def reset(self) -> None:
+        """删除任务日志，下次运行将从头开始"""
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+            logger.info(f"已删除任务日志: {self.journal_path}")
+
+    def _commit(self, index: int, fingerprint: str, count: int) -> None:
+        """追加一条批次提交记录并刷盘"""
+        os.makedirs(self.journal_dir, exist_ok=True)
+        entry = {"batch": index, "fingerprint": fingerprint, "count": count, "committed_at": time.time()}
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _fingerprint(batch_ids: Sequence[str]) -> str:
+        """批次文档ID的指纹，用于确认续传时的输入与日志一致"""
+        return hashlib.sha256("\n".join(batch_ids).encode('utf-8')).hexdigest()[:16]
+
+    def __repr__(self) -> str:
+        return f"IngestJob(job_id='{self.job_id}', journal_path='{self.journal_path}')"
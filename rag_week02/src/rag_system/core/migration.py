@@ -0,0 +1,263 @@
+"""
+嵌入模型迁移模块
+在后台用新的嵌入模型重建集合，完成后原子切换，迁移期间查询继续使用旧集合
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from .logger import logger
+from .config import config
+from .scheduler import priority, BULK
+from ..database.chroma_manager import ChromaDBManager
+
+if TYPE_CHECKING:
+    from .rag_system import RAGSystem
+    from ..embeddings.custom_embedding import CustomEmbedding
+
+
+class EmbeddingMigration:
+    """
+    嵌入模型迁移任务
+
+    迁移分三个阶段：
+    1. 复制：分页读取旧集合的文档和元数据，用新模型计算嵌入后写入影子集合，按max_docs_per_second限速，
+       嵌入调用走批量通道；
+    2. 追赶：对比两个集合的文档ID，补写复制期间新增的文档、删除已被删除的文档，直到差异不超过catch_up_threshold；
+    3. 切换：持有RAGSystem的写锁做最后一次追赶，然后重命名集合并替换RAGSystem的集合管理器和嵌入客户端。
+
+    切换前所有查询和写入都使用旧集合和旧模型；切换后旧集合以"{名称}_pre_{时间戳}"保留，可用于回滚。
+    文档ID由来源和内容哈希生成，内容变化会产生新ID，因此按ID对比即可发现变化。
+    停止后再次运行会复用影子集合，已迁移的文档不再重复嵌入。
+    """
+
+    def __init__(
+        self,
+        rag_system: 'RAGSystem',
+        target_embedding: 'CustomEmbedding',
+        batch_size: Optional[int] = None,
+        max_docs_per_second: float = 0.0,
+        catch_up_threshold: int = 0,
+        max_catch_up_passes: int = 5
+    ):
+        """
+        初始化迁移任务
+
+        Args:
+            rag_system: 要迁移的RAG系统（或租户视图）
+            target_embedding: 新的嵌入模型客户端
+            batch_size: 每批重新嵌入的文档数量，默认使用摄取配置
+            max_docs_per_second: 重新嵌入的速率上限，0表示不限速
+            catch_up_threshold: 剩余差异不超过此数量时进入切换阶段
+            max_catch_up_passes: 切换前最多执行的追赶次数
+        """
+        self.rag_system = rag_system
+        self.target_embedding = target_embedding
+        self.batch_size = batch_size or config.ingest.batch_size
+        self.max_docs_per_second = max_docs_per_second
+        self.catch_up_threshold = catch_up_threshold
+        self.max_catch_up_passes = max_catch_up_passes
+
+        self.source = rag_system.db_manager
+        self.shadow_name = f"{self.source.collection_name}_migrating"
+        self.shadow: Optional[ChromaDBManager] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._progress: Dict[str, Any] = {
+            "state": "pending",
+            "total": 0,
+            "migrated": 0,
+            "deleted": 0,
+            "passes": 0,
+            "elapsed": 0.0,
+            "docs_per_second": 0.0,
+            "error": None
+        }
+        self._start_time = 0.0
+
+    def start(self) -> 'EmbeddingMigration':
+        """在后台线程中运行迁移"""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("迁移任务已在运行")
+        self._thread = threading.Thread(target=self._run_safely, name="embedding-migration", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """等待后台迁移结束，返回进度信息"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.progress()
+
+    def stop(self) -> None:
+        """请求停止迁移，已写入影子集合的数据保留，旧集合继续提供服务"""
+        self._stop.set()
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        获取迁移进度
+
+        Returns:
+            包含state、total、migrated、deleted、passes、elapsed、docs_per_second和error字段的字典
+        """
+        return dict(self._progress)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        同步运行迁移
+
+        Returns:
+            迁移结束时的进度信息
+        """
+        self._start_time = time.perf_counter()
+        self._stop.clear()
+        self.shadow = ChromaDBManager(
+            collection_name=self.shadow_name,
+            embedding_function=self.target_embedding.get_embeddings,
+            external_documents=self.source.external_documents,
+            client=self.source.client
+        )
+        logger.info(
+            f"开始迁移集合 {self.source.collection_name} 到模型 {self.target_embedding.model_name}，"
+            f"影子集合: {self.shadow_name}"
+        )
+
+        self._set_state("copying")
+        self._copy()
+        if self._stopped():
+            return self.progress()
+
+        self._set_state("catching_up")
+        for _ in range(self.max_catch_up_passes):
+            remaining = self._catch_up()
+            if self._stopped():
+                return self.progress()
+            if remaining <= self.catch_up_threshold:
+                break
+
+        self._set_state("switching")
+        self._switch()
+        self._set_state("switched")
+        logger.info(
+            f"迁移完成，共重新嵌入 {self._progress['migrated']} 个文档，"
+            f"耗时 {self._progress['elapsed']:.2f} 秒"
+        )
+        return self.progress()
+
+    def _run_safely(self) -> None:
+        """后台线程入口，异常记录到进度中"""
+        try:
+            self.run()
+        except Exception as e:
+            logger.error(f"嵌入模型迁移失败: {str(e)}")
+            self._progress["error"] = str(e)
+            self._set_state("failed")
+
+    def _copy(self) -> None:
+        """分页复制旧集合中的全部文档"""
+        total = self.source._collection_count()
+        self._progress["total"] = total
+        offset = 0
+        while offset < total and not self._stop.is_set():
+            page = self.source.collection.get(
+                include=["metadatas"] if self.source.external_documents else ["documents", "metadatas"],
+                limit=self.batch_size,
+                offset=offset
+            )
+            if len(page["ids"]) == 0:
+                break
+            offset += len(page["ids"])
+
+            # 影子集合中已有的文档（上次停止前迁移过的）不再重复嵌入
+            existing = set(self.shadow.collection.get(ids=page["ids"], include=[])["ids"])
+            rows = [i for i, doc_id in enumerate(page["ids"]) if doc_id not in existing]
+            if not rows:
+                continue
+            ids = [page["ids"][i] for i in rows]
+            documents = (
+                self.source.fetch_documents(ids) if self.source.external_documents
+                else [page["documents"][i] for i in rows]
+            )
+            self._migrate(ids, documents, [page["metadatas"][i] for i in rows])
+
+    def _catch_up(self) -> int:
+        """
+        对比两个集合的文档ID并补齐差异
+
+        Returns:
+            本次处理的差异数量
+        """
+        self._progress["passes"] += 1
+        source_ids = set(self.source.collection.get(include=[])["ids"])
+        shadow_ids = set(self.shadow.collection.get(include=[])["ids"])
+        missing = [doc_id for doc_id in source_ids if doc_id not in shadow_ids]
+        removed = [doc_id for doc_id in shadow_ids if doc_id not in source_ids]
+        self._progress["total"] = len(source_ids)
+
+        for start in range(0, len(missing), self.batch_size):
+            if self._stop.is_set():
+                break
+            batch_ids = missing[start:start + self.batch_size]
+            page = self.source.collection.get(
+                ids=batch_ids,
+                include=["metadatas"] if self.source.external_documents else ["documents", "metadatas"]
+            )
+            documents = (
+                self.source.fetch_documents(page["ids"]) if self.source.external_documents else page["documents"]
+            )
+            self._migrate(page["ids"], documents, page["metadatas"])
+
+        if removed:
+            self.shadow.delete_documents(removed)
+            self._progress["deleted"] += len(removed)
+
+        logger.info(f"迁移追赶第 {self._progress['passes']} 轮: 补写 {len(missing)} 个，删除 {len(removed)} 个")
+        return len(missing) + len(removed)
+
+    def _migrate(self, ids: List[str], documents: List[str], metadatas: List[Dict]) -> None:
+        """用新模型嵌入一批文档并写入影子集合，按速率上限等待"""
+        batch_start = time.perf_counter()
+        with priority(BULK):
+            embeddings = self.target_embedding.get_embeddings(documents)
+        self.shadow.upsert_documents(documents, embeddings, metadatas, ids)
+
+        self._progress["migrated"] += len(ids)
+        self._progress["elapsed"] = time.perf_counter() - self._start_time
+        if self._progress["elapsed"] > 0:
+            self._progress["docs_per_second"] = self._progress["migrated"] / self._progress["elapsed"]
+
+        if self.max_docs_per_second > 0:
+            # 限速，给在线请求留出嵌入API的配额
+            delay = len(ids) / self.max_docs_per_second - (time.perf_counter() - batch_start)
+            if delay > 0:
+                self._stop.wait(delay)
+
+    def _switch(self) -> None:
+        """持有写锁做最后一次追赶，然后原子切换集合和嵌入客户端"""
+        with self.rag_system.write_lock:
+            self._catch_up()
+            name = self.source.collection_name
+            self.source.rename(f"{name}_pre_{int(time.time())}")
+            self.shadow.rename(name)
+            # 写入方在持有写锁时读取这两个属性，因此切换对它们是原子的
+            self.rag_system.db_manager = self.shadow
+            self.rag_system.embedding_client = self.target_embedding
+            if self.rag_system.tenant is not None:
+                # 句柄池中的旧管理器已指向重命名后的集合，同时记录租户的新模型，之后创建的视图都使用它
+                self.rag_system.pool.switch(self.rag_system.tenant, self.shadow, self.target_embedding)
+        self._progress["elapsed"] = time.perf_counter() - self._start_time
+
+    def _set_state(self, state: str) -> None:
+        self._progress["state"] = state
+
+    def _stopped(self) -> bool:
+        """检查是否被请求停止"""
+        if self._stop.is_set():
+            self._set_state("stopped")
+            logger.warning(f"迁移已停止，已重新嵌入 {self._progress['migrated']} 个文档，旧集合继续提供服务")
+            return True
+        return False
+
+    def __repr__(self) -> str:
+        return f"EmbeddingMigration(source='{self.source.collection_name}', state='{self._progress['state']}')"
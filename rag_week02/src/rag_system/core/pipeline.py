@@ -0,0 +1,158 @@
+"""
+流水线模块
+提供由有界队列连接的多阶段并发处理流水线
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+from .logger import logger
+
+
+@dataclass
+class Stage:
+    """流水线阶段配置"""
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+class _StageError:
+    """在队列中向下游传递的阶段异常"""
+
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+_SENTINEL = object()
+
+
+class StagedPipeline:
+    """
+    多阶段并发流水线
+
+    各阶段运行在独立的工作线程中，阶段之间通过有界队列连接。
+    下游处理不过来时上游的put会阻塞，从而形成反压，内存中同时存在的数据项数量有上限。
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4):
+        """
+        初始化流水线
+
+        Args:
+            stages: 按执行顺序排列的阶段列表
+            queue_size: 阶段之间队列的最大长度
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        if queue_size <= 0:
+            raise ValueError("queue_size必须大于0")
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        运行流水线
+
+        Args:
+            items: 输入数据迭代器，由独立线程按需读取
+
+        Yields:
+            最后一个阶段的输出（多工作线程时不保证顺序）
+        """
+        self._stop.clear()
+        self.stats = {stage.name: {"items": 0, "busy_seconds": 0.0} for stage in self.stages}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), daemon=True)]
+
+        for index, stage in enumerate(self.stages):
+            remaining = [max(1, stage.workers)]
+            for _ in range(max(1, stage.workers)):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[index], queues[index + 1], remaining),
+                    daemon=True
+                ))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _SENTINEL:
+                    break
+                if isinstance(item, _StageError):
+                    raise RuntimeError(f"流水线阶段 {item.stage} 失败: {str(item.error)}") from item.error
+                yield item
+        finally:
+            # 消费者提前退出或出错时通知所有线程停止
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=1.0)
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """向队列放入数据，在流水线停止时放弃"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        """从队列取出数据，在流水线停止时返回结束标记"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _SENTINEL
+
+    def _feed(self, items: Iterable[Any], out_queue: queue.Queue) -> None:
+        """读取输入数据"""
+        try:
+            for item in items:
+                if not self._put(out_queue, item):
+                    return
+        except Exception as e:
+            logger.error(f"流水线输入读取失败: {str(e)}")
+            self._put(out_queue, _StageError("input", e))
+        self._put(out_queue, _SENTINEL)
+
+    def _work(self, stage: Stage, in_queue: queue.Queue, out_queue: queue.Queue, remaining: List[int]) -> None:
+        """阶段工作线程"""
+        while True:
+            item = self._get(in_queue)
+            if item is _SENTINEL:
+                # 把结束标记放回去通知同阶段的其他线程，最后一个线程负责传给下游
+                with self._stats_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    self._put(out_queue, _SENTINEL)
+                else:
+                    self._put(in_queue, _SENTINEL)
+                return
+
+            if not isinstance(item, _StageError):
+                start_time = time.perf_counter()
+                try:
+                    item = stage.func(item)
+                except Exception as e:
+                    logger.error(f"流水线阶段 {stage.name} 失败: {str(e)}")
+                    item = _StageError(stage.name, e)
+                with self._stats_lock:
+                    self.stats[stage.name]["items"] += 1
+                    self.stats[stage.name]["busy_seconds"] += time.perf_counter() - start_time
+
+            if not self._put(out_queue, item):
+                return
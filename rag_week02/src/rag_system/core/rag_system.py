@@ -3,19 +3,29 @@ RAG系统主框架模块
 集成嵌入、检索、重排序和生成功能的完整RAG系统
 """
 
-import uuid
-from typing import List, Dict, Optional, Any
+import threading
+from itertools import islice
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, Callable, Union
 from ..embeddings.custom_embedding import CustomEmbedding
 from ..database.chroma_manager import ChromaDBManager
+from ..database.collection_pool import CollectionPool
+from ..database.manifest import IngestManifest, content_hash, assign_document_ids
 from ..reranker.custom_reranker import CustomReranker
 from ..llm.custom_llm import CustomLLM
+from ..ingestion import DataLoader, FinancialTermStandardizer, TextChunker, count_tokens, load_term_mapping
 from ..core.logger import logger, log_function_call
 from ..core.config import config
+from ..core.documents import Document, unpack_documents
+from ..core.pipeline import Stage, StagedPipeline
+from ..core.scheduler import priority, BULK
 
 
 class RAGSystem:
     """RAG系统主类"""
     
+    # 大语言模型不可用时，回答中位于检索段落之前的说明
+    PASSAGES_ONLY_ANSWER = "大语言模型暂时不可用，以下是检索到的相关内容："
+    
     def __init__(self):
         """初始化RAG系统"""
         logger.info("正在初始化RAG系统...")
@@ -28,18 +38,65 @@ class RAGSystem:
         self.db_manager = ChromaDBManager(embedding_function=self.embedding_client.get_embeddings)
         self.reranker = CustomReranker()
         self.llm_client = CustomLLM()
+        self._manifest: Optional[IngestManifest] = None
+        self._pool: Optional[CollectionPool] = None
+        self._standardizer: Optional[FinancialTermStandardizer] = None
+        self.tenant: Optional[str] = None
+        # 写入方持有此锁完成嵌入和写入；嵌入模型迁移在同一把锁内切换集合管理器和嵌入客户端
+        self.write_lock = threading.RLock()
         
         logger.info("RAG系统初始化完成")
     
+    @property
+    def pool(self) -> CollectionPool:
+        """多租户集合句柄池（首次使用时创建，与默认集合共享Chroma客户端）"""
+        if self._pool is None:
+            self._pool = CollectionPool(
+                embedding_function=self.embedding_client.get_embeddings,
+                client=self.db_manager.client
+            )
+        return self._pool
+    
+    def for_tenant(self, tenant: str) -> 'RAGSystem':
+        """
+        获取绑定到租户集合的RAG系统视图
+        
+        视图与当前实例共享嵌入、重排序和大模型客户端，集合管理器和摄取清单从句柄池中取得，
+        租户迁移过嵌入模型时使用池中记录的新嵌入客户端。
+        预热后切换租户不需要重新创建任何连接。视图很轻量，可以每个请求创建一个。
+        
+        Args:
+            tenant: 租户ID，只允许字母、数字、下划线和连字符
+        
+        Returns:
+            绑定到租户集合的RAGSystem
+        """
+        view = object.__new__(RAGSystem)
+        view.__dict__.update(self.__dict__)
+        view._pool = self.pool
+        view.tenant = tenant
+        view.db_manager = self.pool.get(tenant)
+        view.embedding_client = self.pool.embedding(tenant) or self.embedding_client
+        view._manifest = self.pool.manifest(tenant)
+        view.write_lock = self.pool.write_lock(tenant)
+        return view
+    
     @log_function_call
-    def ingest_documents(self, documents: List[str], metadatas: Optional[List[Dict]] = None, ids: Optional[List[str]] = None) -> bool:
+    def ingest_documents(
+        self,
+        documents: List[Union[str, Document]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+        incremental: bool = False
+    ) -> bool:
         """
         摄取文档到向量数据库
         
         Args:
-            documents: 文档内容列表
-            metadatas: 文档元数据列表
-            ids: 文档ID列表
+            documents: 文档内容或Document列表
+            metadatas: 文档元数据列表，为空时使用Document中的元数据
+            ids: 文档ID列表，为空时使用Document中的ID，都没有时根据来源和内容哈希生成确定性ID
+            incremental: 是否增量摄取，只嵌入新增或变化的文档，并删除来源中已不存在的旧文档
         
         Returns:
             是否成功摄取
@@ -49,29 +106,409 @@ class RAGSystem:
             return False
         
         try:
+            documents, metadatas, ids = unpack_documents(documents, metadatas, ids)
+            
             # 自动生成元数据和ID（如果未提供）
             if metadatas is None:
                 metadatas = [{"source": "default"} for _ in documents]
             
             if ids is None:
-                ids = [str(uuid.uuid4()) for _ in documents]
+                ids = assign_document_ids(documents, metadatas)
             
-            # 获取文档的嵌入向量
-            embeddings = self.embedding_client.get_embeddings(documents)
+            # 摄取走批量通道，不与在线查询争抢模型端点
+            with self.write_lock, priority(BULK):
+                if incremental:
+                    return self._ingest_incremental(documents, metadatas, ids)
+                
+                # 获取文档的嵌入向量
+                embeddings = self.embedding_client.get_embeddings(documents)
+                
+                if not embeddings:
+                    logger.error("文档嵌入失败")
+                    return False
+                
+                # 将文档写入向量数据库（ID已存在时覆盖，复用上面的嵌入向量）
+                self.db_manager.upsert_documents(documents, embeddings, metadatas, ids)
+                
+                # 记录到摄取清单，之后的增量摄取不会重复嵌入这些文档；
+                # 文档已经写入，清单更新失败只记录警告
+                try:
+                    for source, entries in self._group_by_source(documents, metadatas, ids).items():
+                        self.manifest.update(source, {doc_id: digest for doc_id, (digest, _) in entries.items()})
+                    self.manifest.save()
+                except Exception as e:
+                    logger.warning(f"更新摄取清单失败: {str(e)}")
+            
+            logger.info(f"成功摄取 {len(documents)} 个文档")
+            return True
             
+        except Exception as e:
+            logger.error(f"文档摄取失败: {str(e)}")
+            return False
+    
+    @property
+    def manifest(self) -> IngestManifest:
+        """摄取清单（首次使用时加载）"""
+        if self._manifest is None:
+            self._manifest = IngestManifest(config.database.manifest_path)
+        return self._manifest
+    
+    @staticmethod
+    def _group_by_source(
+        documents: List[str], metadatas: List[Dict], ids: List[str]
+    ) -> Dict[str, Dict[str, Tuple[str, int]]]:
+        """按来源分组，返回文档ID到(内容哈希, 下标)的映射"""
+        groups: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        for index, (document, metadata, doc_id) in enumerate(zip(documents, metadatas, ids)):
+            source = (metadata or {}).get("source", "default")
+            groups.setdefault(source, {}).setdefault(doc_id, (content_hash(document), index))
+        return groups
+    
+    def _ingest_incremental(self, documents: List[str], metadatas: List[Dict], ids: List[str]) -> bool:
+        """按来源对比摄取清单，只写入变化的部分"""
+        # 以文档ID为键，重复出现的内容ID带出现序号，各自跟踪
+        current = self._group_by_source(documents, metadatas, ids)
+        
+        new_indices: List[int] = []
+        stale_ids: List[str] = []
+        unchanged = 0
+        for source, entries in current.items():
+            stored = self.manifest.get(source)
+            for doc_id, (digest, index) in entries.items():
+                if stored.get(doc_id) == digest:
+                    unchanged += 1
+                else:
+                    new_indices.append(index)
+            stale_ids.extend(doc_id for doc_id in stored if doc_id not in entries)
+        
+        if new_indices:
+            new_documents = [documents[i] for i in new_indices]
+            embeddings = self.embedding_client.get_embeddings(new_documents)
             if not embeddings:
                 logger.error("文档嵌入失败")
                 return False
+            self.db_manager.upsert_documents(
+                new_documents, embeddings, [metadatas[i] for i in new_indices], [ids[i] for i in new_indices]
+            )
+        
+        if stale_ids and not self.db_manager.delete_documents(stale_ids):
+            logger.error("删除过期文档失败")
+            return False
+        
+        for source, entries in current.items():
+            self.manifest.set(source, {doc_id: digest for doc_id, (digest, _) in entries.items()})
+        self.manifest.save()
+        
+        logger.info(f"增量摄取完成: 新增或更新 {len(new_indices)} 个，未变化 {unchanged} 个，删除 {len(stale_ids)} 个")
+        return True
+    
+    @property
+    def standardizer(self) -> Optional[FinancialTermStandardizer]:
+        """金融术语标准化器（首次使用时从INGEST_TERMS_PATH加载，未配置时为None）"""
+        if self._standardizer is None and config.ingest.terms_path:
+            mapping = load_term_mapping(config.ingest.terms_path)
+            self._standardizer = FinancialTermStandardizer(mapping)
+            logger.info(f"已加载 {len(mapping)} 个金融术语")
+        return self._standardizer
+    
+    def ingest_stream(
+        self,
+        records: Iterable[Union[Tuple[str, Optional[Dict], Optional[str]], Document]],
+        batch_size: Optional[int] = None,
+        chunker: Optional[Callable[[str, Dict], Iterable[Tuple[str, Dict]]]] = None,
+        skip_batch: Optional[Callable[[int, List[str]], bool]] = None,
+        standardizer: Optional[Callable[[str], str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        流式摄取文档
+        
+        读取、分块、嵌入和写入作为并发阶段运行，阶段之间通过有界队列连接，
+        输入按需读取，因此可以摄取超过内存大小的语料，同时保持嵌入API和数据库都处于忙碌状态。
+        
+        Args:
+            records: (文本, 元数据, ID)元组或Document的迭代器，元数据和ID可以为None
+            batch_size: 每批文档数量，默认使用配置值
+            chunker: 可选的分块函数，输入文本和元数据，返回(分块文本, 分块元数据)迭代器
+            skip_batch: 可选的过滤函数，输入批次序号和该批文档ID，返回True时跳过该批（用于断点续传）
+            standardizer: 可选的文本标准化函数，在分块之前执行
+        
+        Yields:
+            每批的处理结果，包含batch、count、ids、success和error字段
+        """
+        batch_size = batch_size or config.ingest.batch_size
+        if batch_size <= 0:
+            raise ValueError("batch_size必须大于0")
+        
+        batches = self._load_batches(records, batch_size)
+        if skip_batch is not None:
+            batches = (batch for batch in batches if not skip_batch(batch["batch"], batch["ids"]))
+        
+        yield from self._run_ingest_pipeline(batches, self._transform_stages(standardizer, chunker))
+    
+    def ingest_files(
+        self,
+        paths: Iterable[str],
+        files_per_batch: Optional[int] = None,
+        standardizer: Optional[FinancialTermStandardizer] = None,
+        chunker: Optional[TextChunker] = None,
+        loader: Optional[DataLoader] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        摄取文件
+        
+        加载、标准化、分块、嵌入和写入作为并发阶段运行，各阶段的并发数取自INGEST_*_WORKERS配置，
+        结束时在日志中输出各阶段耗时。分块的元数据包含source（文件路径）和分块位置，
+        ID为"{文件ID}_{分块序号}"，文件ID由路径和内容哈希确定。
+        CSV在组装批次时按行组流式读取，每个行组作为一个文档（元数据另含row_start和row_end），与其他文件一起计数。
+        
+        Args:
+            paths: 文件路径迭代器（支持txt、md、csv、pdf）
+            files_per_batch: 每批文件数量，默认使用配置值
+            standardizer: 术语标准化器，默认按INGEST_TERMS_PATH加载，未配置时跳过标准化
+            chunker: 分块器，默认按INGEST_CHUNK_*配置创建（按token计算长度时使用count_tokens估算）
+            loader: 文件加载器
+        
+        Yields:
+            每批的处理结果，字段同ingest_stream，另含failed字段列出读取失败的文件
+        """
+        files_per_batch = files_per_batch or config.ingest.files_per_batch
+        if files_per_batch <= 0:
+            raise ValueError("files_per_batch必须大于0")
+        
+        loader = loader or DataLoader()
+        standardizer = standardizer or self.standardizer
+        chunker = chunker or TextChunker(
+            config.ingest.chunk_size, config.ingest.chunk_overlap, config.ingest.chunk_method,
+            tokenizer=count_tokens if config.ingest.chunk_unit == "tokens" else None
+        )
+        
+        stages = [Stage("load", lambda batch: self._load_files(batch, loader), workers=config.ingest.load_workers)]
+        stages.extend(self._transform_stages(standardizer.standardize if standardizer else None, chunker))
+        yield from self._run_ingest_pipeline(self._file_batches(paths, files_per_batch, loader), stages)
+        
+        pdf_stats = loader.pdf_parser.stats()
+        if pdf_stats["pages"] or pdf_stats["cached_pages"]:
+            logger.info(
+                f"PDF解析 {int(pdf_stats['pages'])} 页（缓存命中 {int(pdf_stats['cached_pages'])} 页）: "
+                f"文本 {pdf_stats['text_seconds']:.2f}s，"
+                f"表格 {pdf_stats['table_seconds']:.2f}s/{int(pdf_stats['table_pages'])}页，"
+                f"图片 {pdf_stats['image_seconds']:.2f}s"
+            )
+    
+    def _transform_stages(
+        self,
+        standardizer: Optional[Callable[[str], str]],
+        chunker: Optional[Callable[[str, Dict], Iterable[Tuple[str, Dict]]]]
+    ) -> List[Stage]:
+        """嵌入之前的标准化和分块阶段"""
+        stages = []
+        if standardizer is not None:
+            stages.append(Stage(
+                "standardize", lambda batch: self._standardize_batch(batch, standardizer),
+                workers=config.ingest.standardize_workers
+            ))
+        if chunker is not None:
+            stages.append(Stage(
+                "chunk", lambda batch: self._chunk_batch(batch, chunker), workers=config.ingest.chunk_workers
+            ))
+        return stages
+    
+    def _run_ingest_pipeline(self, batches: Iterable[Dict[str, Any]], stages: List[Stage]) -> Iterator[Dict[str, Any]]:
+        """在给定阶段之后接上嵌入和写入阶段运行流水线"""
+        stages = stages + [
+            Stage("embed", self._embed_batch, workers=config.ingest.embed_workers),
+            Stage("store", self._store_batch, workers=config.ingest.store_workers)
+        ]
+        pipeline = StagedPipeline(stages, queue_size=config.ingest.queue_size)
+        
+        total = 0
+        for batch in pipeline.run(batches):
+            if batch["error"] is None:
+                total += len(batch["ids"])
+            result = {
+                "batch": batch["batch"],
+                "count": len(batch["ids"]),
+                "ids": batch["ids"],
+                "success": batch["error"] is None,
+                "error": batch["error"]
+            }
+            if "failed" in batch:
+                result["failed"] = batch["failed"]
+            yield result
+        
+        timings = ", ".join(
+            f"{name}: {stat['busy_seconds']:.2f}s/{int(stat['items'])}批" for name, stat in pipeline.stats.items()
+        )
+        logger.info(f"流式摄取完成，共写入 {total} 个文档（{timings}）")
+    
+    @staticmethod
+    def _load_batches(
+        records: Iterable[Union[Tuple[str, Optional[Dict], Optional[str]], Document]],
+        batch_size: int
+    ) -> Iterator[Dict[str, Any]]:
+        """将输入记录按批次组装，缺失的元数据和ID自动生成"""
+        record_iter = iter(records)
+        occurrences: Dict[Tuple[str, str], int] = {}
+        index = 0
+        while True:
+            batch_records = list(islice(record_iter, batch_size))
+            if not batch_records:
+                return
             
-            # 将文档添加到向量数据库
-            self.db_manager.add_documents(documents, metadatas, ids)
+            batch = {
+                "batch": index, "documents": [], "metadatas": [], "ids": [],
+                "embeddings": None, "embedder": None, "error": None
+            }
+            for record in batch_records:
+                if isinstance(record, Document):
+                    text, metadata, doc_id = record.text, record.metadata, record.id
+                else:
+                    text, metadata, doc_id = record
+                if not text:
+                    continue
+                metadata = metadata or {"source": "default"}
+                if not doc_id:
+                    doc_id = assign_document_ids([text], [metadata], occurrences)[0]
+                batch["documents"].append(text)
+                batch["metadatas"].append(metadata)
+                batch["ids"].append(doc_id)
             
-            logger.info(f"成功摄取 {len(documents)} 个文档")
-            return True
+            yield batch
+            index += 1
+    
+    @staticmethod
+    def _file_batches(paths: Iterable[str], files_per_batch: int, loader: DataLoader) -> Iterator[Dict[str, Any]]:
+        """
+        将文件路径按批次组装，文本由加载阶段填充
+        
+        按行组流式读取的文件（CSV）在这里展开，每个行组作为一个已加载的文档放入批次，
+        与待加载的文件一起按files_per_batch计数，大文件分散到多个批次中，不会整体读入内存。
+        """
+        def new_batch(index: int) -> Dict[str, Any]:
+            return {
+                "batch": index, "paths": [], "failed": [], "documents": [], "metadatas": [], "ids": [],
+                "embeddings": None, "embedder": None, "error": None
+            }
+        
+        def full(batch: Dict[str, Any]) -> bool:
+            return len(batch["paths"]) + len(batch["documents"]) >= files_per_batch
+        
+        batch = new_batch(0)
+        for path in paths:
+            if not loader.is_streamed(path):
+                batch["paths"].append(path)
+            else:
+                occurrences: Dict[Tuple[str, str], int] = {}
+                try:
+                    for document in loader.iter_documents(path):
+                        if not document.text.strip():
+                            continue
+                        metadata = {"source": path, **document.metadata}
+                        batch["documents"].append(document.text)
+                        batch["metadatas"].append(metadata)
+                        batch["ids"].extend(assign_document_ids([document.text], [metadata], occurrences))
+                        if full(batch):
+                            yield batch
+                            batch = new_batch(batch["batch"] + 1)
+                except Exception as e:
+                    logger.error(f"读取文件 {path} 失败: {str(e)}")
+                    batch["failed"].append(path)
             
+            if full(batch):
+                yield batch
+                batch = new_batch(batch["batch"] + 1)
+        
+        if batch["paths"] or batch["documents"] or batch["failed"]:
+            yield batch
+    
+    @staticmethod
+    def _load_files(batch: Dict[str, Any], loader: DataLoader) -> Dict[str, Any]:
+        """流水线加载阶段，读取失败的文件记录在failed中，不影响同批其他文件"""
+        start = len(batch["documents"])
+        for path in batch["paths"]:
+            try:
+                text = loader.load(path)
+            except Exception as e:
+                logger.error(f"读取文件 {path} 失败: {str(e)}")
+                batch["failed"].append(path)
+                continue
+            if not text.strip():
+                logger.warning(f"文件 {path} 为空")
+                continue
+            batch["documents"].append(text)
+            batch["metadatas"].append({"source": path})
+        
+        batch["ids"].extend(assign_document_ids(batch["documents"][start:], batch["metadatas"][start:]))
+        return batch
+    
+    @staticmethod
+    def _standardize_batch(batch: Dict[str, Any], standardizer: Callable[[str], str]) -> Dict[str, Any]:
+        """流水线标准化阶段"""
+        if batch["error"] is not None:
+            return batch
+        
+        try:
+            batch["documents"] = [standardizer(document) for document in batch["documents"]]
         except Exception as e:
-            logger.error(f"文档摄取失败: {str(e)}")
-            return False
+            logger.error(f"第 {batch['batch']} 批文档标准化失败: {str(e)}")
+            batch["error"] = str(e)
+        return batch
+    
+    @staticmethod
+    def _chunk_batch(batch: Dict[str, Any], chunker: Callable[[str, Dict], Iterable[Tuple[str, Dict]]]) -> Dict[str, Any]:
+        """流水线分块阶段"""
+        if batch["error"] is not None:
+            return batch
+        
+        documents, metadatas, ids = [], [], []
+        try:
+            for text, metadata, doc_id in zip(batch["documents"], batch["metadatas"], batch["ids"]):
+                for i, (chunk_text, chunk_metadata) in enumerate(chunker(text, metadata)):
+                    documents.append(chunk_text)
+                    metadatas.append({**metadata, **chunk_metadata})
+                    ids.append(f"{doc_id}_{i}")
+        except Exception as e:
+            logger.error(f"第 {batch['batch']} 批文档分块失败: {str(e)}")
+            batch["error"] = str(e)
+            return batch
+        
+        batch.update(documents=documents, metadatas=metadatas, ids=ids)
+        return batch
+    
+    def _embed_batch(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        """流水线嵌入阶段"""
+        if batch["error"] is not None or not batch["documents"]:
+            return batch
+        
+        try:
+            # 流水线阶段在工作线程中运行，需要在线程内进入批量通道
+            with priority(BULK):
+                batch["embedder"] = self.embedding_client
+                batch["embeddings"] = batch["embedder"].get_embeddings(batch["documents"])
+        except Exception as e:
+            logger.error(f"第 {batch['batch']} 批文档嵌入失败: {str(e)}")
+            batch["error"] = str(e)
+        return batch
+    
+    def _store_batch(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        """流水线写入阶段"""
+        if batch["error"] is not None or not batch["documents"]:
+            return batch
+        
+        try:
+            with self.write_lock, priority(BULK):
+                if batch["embedder"] is not self.embedding_client:
+                    # 嵌入后集合已切换到新模型，按新模型重新嵌入
+                    batch["embeddings"] = self.embedding_client.get_embeddings(batch["documents"])
+                self.db_manager.upsert_documents(
+                    batch["documents"], batch["embeddings"], batch["metadatas"], batch["ids"]
+                )
+        except Exception as e:
+            logger.error(f"第 {batch['batch']} 批文档写入失败: {str(e)}")
+            batch["error"] = str(e)
+        # 写入完成后释放文本和向量，结果中只保留ID
+        batch["documents"] = batch["embeddings"] = None
+        return batch
     
     @log_function_call
     def query(self, question: str, use_rerank: bool = True, n_results: int = 5, top_n: int = 3) -> Dict[str, Any]:
@@ -85,7 +522,8 @@ class RAGSystem:
             top_n: 重排序后返回的结果数量
         
         Returns:
-            包含问题、上下文和答案的字典
+            包含问题、上下文和答案的字典；重排序或大语言模型不可用时跳过该阶段，
+            degraded字段列出被跳过的阶段（rerank、llm）
         """
         if not question:
             logger.warning("问题为空")
@@ -97,11 +535,19 @@ class RAGSystem:
                 "reranked_documents": []
             }
         
+        # 因服务故障被跳过的阶段
+        degraded: List[str] = []
         try:
             logger.info(f"正在处理问题: {question[:50]}...")
             
             # 步骤1：检索相关文档
-            retrieved_docs = self.db_manager.query(question, n_results=n_results)
+            if self.db_manager.external_documents:
+                # 文本保存在本地文档存储中，检索时不取文本，只为后续用到的结果取回
+                retrieved_docs = self.db_manager.query(
+                    question, n_results=n_results, include=("metadatas", "distances")
+                )
+            else:
+                retrieved_docs = self.db_manager.query(question, n_results=n_results)
             
             if not retrieved_docs:
                 logger.warning("未检索到相关文档")
@@ -117,8 +563,16 @@ class RAGSystem:
             
             # 步骤2：如果启用重排序，对文档进行重排序
             if use_rerank:
+                # 重排序需要全部候选文档的文本
+                self._attach_documents(retrieved_docs)
                 doc_texts = [doc["document"] for doc in retrieved_docs]
-                reranked_docs = self.reranker.rerank(question, doc_texts, top_n=top_n)
+                try:
+                    reranked_docs = self.reranker.rerank(question, doc_texts, top_n=top_n)
+                except Exception as e:
+                    # 重排序服务故障不影响查询，熔断器打开时这里立即返回
+                    logger.warning(f"重排序不可用: {str(e)}")
+                    degraded.append("rerank")
+                    reranked_docs = []
                 
                 if reranked_docs:
                     context = "\n".join([doc["document"] for doc in reranked_docs])
@@ -129,20 +583,28 @@ class RAGSystem:
                     logger.warning("重排序失败，使用原始检索结果")
                     reranked_docs = []
             else:
-                # 不使用重排序，直接使用检索结果
+                # 不使用重排序，直接使用检索结果，只取回进入上下文的文本
+                self._attach_documents(retrieved_docs[:top_n])
                 context = "\n".join([doc["document"] for doc in retrieved_docs[:top_n]])
                 reranked_docs = []
                 logger.info(f"使用原始检索结果，选择 {top_n} 个文档作为上下文")
             
             # 步骤3：使用LLM生成回答
-            answer = self.llm_client.generate_with_context(context, question)
+            try:
+                answer = self.llm_client.generate_with_context(context, question)
+            except Exception as e:
+                # 大语言模型不可用时只返回检索到的段落
+                logger.warning(f"大语言模型不可用，只返回检索结果: {str(e)}")
+                degraded.append("llm")
+                answer = f"{self.PASSAGES_ONLY_ANSWER}\n\n{context}"
             
             result = {
                 "question": question,
                 "context": context,
                 "answer": answer,
                 "retrieved_documents": retrieved_docs,
-                "reranked_documents": reranked_docs
+                "reranked_documents": reranked_docs,
+                "degraded": degraded
             }
             
             logger.info("问题处理完成")
@@ -158,6 +620,15 @@ class RAGSystem:
                 "reranked_documents": []
             }
     
+    def _attach_documents(self, hits: List[Any]) -> None:
+        """为未携带文本的检索结果从数据库取回文档内容"""
+        missing = [hit for hit in hits if hit["document"] is None]
+        if not missing:
+            return
+        texts = self.db_manager.fetch_documents([hit["id"] for hit in missing])
+        for hit, text in zip(missing, texts):
+            hit.document = text
+    
     def get_system_info(self) -> Dict[str, Any]:
         """
         获取系统信息
@@ -172,6 +643,11 @@ class RAGSystem:
                 "embedding_model": self.embedding_client.model_name,
                 "reranker_model": self.reranker.model_name,
                 "llm_model": self.llm_client.model_name,
+                "circuit_breakers": {
+                    "embedding": self.embedding_client.breaker.state,
+                    "reranker": self.reranker.breaker.state,
+                    "llm": self.llm_client.breaker.state
+                },
                 "collection_info": collection_info,
                 "config": config.to_dict()
             }
@@ -187,17 +663,16 @@ class RAGSystem:
             是否成功清空
         """
         try:
-            # 获取所有文档ID
-            collection_info = self.db_manager.get_collection_info()
-            if collection_info["count"] > 0:
-                # 这里需要实现获取所有文档ID的逻辑
-                # 由于ChromaDB的限制，我们重新创建集合
-                import chromadb
-                self.db_manager.client.delete_collection(name=config.database.collection_name)
-                self.db_manager = ChromaDBManager(embedding_function=self.embedding_client.get_embeddings)
-                logger.info("数据库已清空")
-            else:
-                logger.info("数据库已经是空的")
+            with self.write_lock:
+                collection_info = self.db_manager.get_collection_info()
+                if collection_info["count"] > 0:
+                    # 在原有客户端上重建集合，不重新创建管理器
+                    self.db_manager.reset()
+                    logger.info("数据库已清空")
+                else:
+                    logger.info("数据库已经是空的")
+                # 集合为空时清单也可能残留记录（如集合被外部删除），总是清空
+                self.manifest.clear()
             
             return True
         except Exception as e:
@@ -0,0 +1,468 @@
+"""
+模型调用调度模块
+按端点跟踪每分钟请求数（RPM）和每分钟token数（TPM）预算，在限额内排队发出远程模型调用
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional
+from .logger import logger
+from .config import config
+
+
+# 中日韩文字和全角标点，估算token数时按每字1个token计算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]')
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+# 优先级通道：交互查询优先于批量摄取
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+_current_lane: ContextVar[str] = ContextVar("rag_system_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(lane: str) -> Iterator[None]:
+    """
+    在上下文中指定模型调用的优先级通道
+
+    未指定时为INTERACTIVE。上下文变量不会自动传递到线程池的工作线程，
+    因此在线程中运行的批量任务需要在线程内部进入该上下文。
+
+    Args:
+        lane: INTERACTIVE或BULK
+    """
+    if lane not in LANES:
+        raise ValueError(f"未知的优先级通道: {lane}")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_priority() -> str:
+    """当前上下文的优先级通道"""
+    return _current_lane.get()
+
+
+class RateLimitError(RuntimeError):
+    """远程服务返回限流（HTTP 429）"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, headers: Optional[Mapping] = None):
+        super().__init__(message)
+        self.headers = headers or {}
+        self.retry_after = retry_after if retry_after is not None else _parse_seconds(_header(self.headers, "retry-after"))
+
+
+class CallResult(NamedTuple):
+    """一次远程调用的结果"""
+    value: Any
+    headers: Optional[Mapping] = None
+    tokens: Optional[int] = None
+
+
+def estimate_tokens(texts: Iterable[str]) -> int:
+    """
+    粗略估计文本的token数
+
+    中日韩字符按每字1个token计算，其余字符按每4个字符1个token计算。
+    只用于调用前预留预算，调用后以服务端返回的实际用量为准。
+    """
+    total = 0
+    for text in texts:
+        if not text:
+            continue
+        cjk = len(_CJK_PATTERN.findall(text))
+        total += cjk + (len(text) - cjk + 3) // 4
+    return max(1, total)
+
+
+def _header(headers: Optional[Mapping], name: str) -> Optional[str]:
+    """大小写不敏感地读取响应头"""
+    if not headers:
+        return None
+    try:
+        value = headers.get(name)
+        if value is None:
+            value = headers.get(name.title())
+    except Exception:
+        return None
+    return value if isinstance(value, str) else None
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    """解析秒数或"6m0s"、"120ms"形式的时长"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    调用方先按shortfall等待余额足够，再预留扣减。大于桶容量的请求在桶满时即可预留，
+    余额变为负数（欠额），之后的请求需要等欠额按速率补回。
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        """
+        初始化令牌桶
+
+        Args:
+            per_minute: 每分钟补充的令牌数
+            burst_seconds: 桶容量对应的补充时长，决定允许的突发量
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """预留令牌，返回需要等待的秒数"""
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def shortfall(self, amount: float, now: float) -> float:
+        """
+        距离可以预留amount个令牌还需等待的秒数
+
+        大于桶容量的请求只需等到桶满即可预留，超出部分记为欠额。
+        """
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return 0.0 if needed <= 0 else needed / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        """归还（amount为负时追加扣减）令牌"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def clamp(self, remaining: float, now: float) -> None:
+        """服务端报告的剩余额度小于本地余额时以服务端为准"""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+    def set_rate(self, per_minute: float) -> None:
+        self.rate = per_minute / 60.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.level = min(self.capacity, self.level + elapsed * self.rate)
+            self._updated = now
+
+
+class _EndpointState:
+    """单个端点的限流状态"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        # 速率系数，遇到限流时乘性降低，成功后缓慢恢复
+        self.factor = 1.0
+        self.paused_until = 0.0
+        # 各通道正在执行和正在排队的调用数
+        self.active = {lane: 0 for lane in LANES}
+        self.waiting = {lane: 0 for lane in LANES}
+        self.throttled = 0
+        # 连续被限流的次数，没有Retry-After时按它指数退避，收到正常响应后清零
+        self.consecutive_throttled = 0
+        self.calls = 0
+        self.waited_seconds = 0.0
+        self.lane_calls = {lane: 0 for lane in LANES}
+        self.lane_waited = {lane: 0.0 for lane in LANES}
+
+
+class RateLimitScheduler:
+    """
+    速率限制调度器
+
+    所有远程模型调用经过同一个调度器，按端点（API地址+模型）分别维护请求数和token数两个令牌桶。
+    调用前预留预算并在需要时等待，使发出的请求保持在限额之内；调用后按服务端返回的实际用量结算。
+    服务端返回429时按Retry-After暂停该端点并降低速率，返回x-ratelimit-remaining-*响应头时以其为准。
+
+    调用分为INTERACTIVE和BULK两个通道，每个通道在每个端点上有独立的并发上限。
+    排队时交互调用优先：只要同一端点上有交互调用在等待预算，批量调用就不会预留预算，
+    因此正在运行的批量摄取不会让在线查询排在大批量嵌入请求之后。
+    """
+
+    # 遇到限流后速率乘以该系数，之后每次成功恢复RECOVERY_STEP，直到恢复为配置值
+    BACKOFF_FACTOR = 0.8
+    RECOVERY_STEP = 0.01
+    MIN_FACTOR = 0.1
+
+    def __init__(
+        self,
+        headroom: float = 0.95,
+        interactive_concurrency: Optional[int] = None,
+        bulk_concurrency: Optional[int] = None
+    ):
+        """
+        初始化调度器
+
+        Args:
+            headroom: 实际使用的速率占配置限额的比例，留出余量避免贴线触发限流
+            interactive_concurrency: 每个端点上交互调用的并发上限，默认使用配置值，0表示不限制
+            bulk_concurrency: 每个端点上批量调用的并发上限，默认使用配置值，0表示不限制
+        """
+        self.headroom = headroom
+        self.lane_limits = {
+            INTERACTIVE: (config.scheduler.interactive_concurrency
+                          if interactive_concurrency is None else interactive_concurrency),
+            BULK: config.scheduler.bulk_concurrency if bulk_concurrency is None else bulk_concurrency
+        }
+        self._endpoints: Dict[str, _EndpointState] = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    def configure(self, endpoint: str, rpm: float = 0, tpm: float = 0) -> None:
+        """
+        设置端点的限额（0表示不限制），相同限额重复设置不会重置状态
+
+        Args:
+            endpoint: 端点标识
+            rpm: 每分钟请求数上限，非数值视为不限制
+            tpm: 每分钟token数上限，非数值视为不限制
+        """
+        rpm = float(rpm) * self.headroom if isinstance(rpm, (int, float)) and rpm > 0 else 0.0
+        tpm = float(tpm) * self.headroom if isinstance(tpm, (int, float)) and tpm > 0 else 0.0
+        with self._lock:
+            state = self._endpoints.get(endpoint)
+            if state is None or state.rpm != rpm or state.tpm != tpm:
+                self._endpoints[endpoint] = _EndpointState(rpm, tpm)
+
+    def acquire(self, endpoint: str, tokens: int = 0, lane: Optional[str] = None) -> float:
+        """
+        占用通道并预留一次调用的预算，必要时阻塞等待；调用结束后必须调用release
+
+        Args:
+            endpoint: 端点标识
+            tokens: 预计消耗的token数
+            lane: 优先级通道，默认使用当前上下文的通道
+
+        Returns:
+            实际等待的秒数
+        """
+        lane = lane or current_priority()
+        start = time.monotonic()
+        with self._cond:
+            state = self._state(endpoint)
+            state.waiting[lane] += 1
+            logged = False
+            try:
+                while True:
+                    wait = self._blocked(state, lane, tokens, time.monotonic())
+                    if wait == 0:
+                        break
+                    if not logged:
+                        logger.debug(f"端点 {endpoint} 的{lane}调用排队等待")
+                        logged = True
+                    # wait为None时等待其他调用结束或让出优先级后被唤醒
+                    self._cond.wait(wait)
+            finally:
+                state.waiting[lane] -= 1
+
+            now = time.monotonic()
+            if state.requests is not None:
+                state.requests.reserve(1, now)
+            if state.tokens is not None and tokens:
+                state.tokens.reserve(tokens, now)
+            state.active[lane] += 1
+            waited = now - start
+            state.calls += 1
+            state.waited_seconds += waited
+            state.lane_calls[lane] += 1
+            state.lane_waited[lane] += waited
+            # 交互调用离开队列后唤醒被它挡住的批量调用
+            self._cond.notify_all()
+        return waited
+
+    def release(self, endpoint: str, lane: Optional[str] = None) -> None:
+        """释放acquire占用的通道"""
+        lane = lane or current_priority()
+        with self._cond:
+            state = self._state(endpoint)
+            state.active[lane] = max(0, state.active[lane] - 1)
+            self._cond.notify_all()
+
+    def _blocked(self, state: _EndpointState, lane: str, tokens: int, now: float) -> Optional[float]:
+        """
+        判断调用是否需要继续等待（调用方持有锁）
+
+        Returns:
+            0表示可以发出；正数表示需要等待的秒数；None表示等待其他调用唤醒
+        """
+        limit = self.lane_limits.get(lane) or 0
+        if limit and state.active[lane] >= limit:
+            return None
+        if lane == BULK and state.waiting[INTERACTIVE] > 0:
+            return None
+        wait = max(0.0, state.paused_until - now)
+        if state.requests is not None:
+            wait = max(wait, state.requests.shortfall(1, now))
+        if state.tokens is not None and tokens:
+            wait = max(wait, state.tokens.shortfall(tokens, now))
+        return wait
+
+    def settle(self, endpoint: str, reserved: int, actual: Optional[int]) -> None:
+        """按实际token用量结算预留的预算"""
+        if actual is None or actual == reserved:
+            return
+        with self._cond:
+            state = self._state(endpoint)
+            if state.tokens is not None:
+                state.tokens.refund(reserved - actual, time.monotonic())
+            self._cond.notify_all()
+
+    def observe(self, endpoint: str, headers: Optional[Mapping], throttled: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        """
+        根据响应更新端点状态
+
+        Args:
+            endpoint: 端点标识
+            headers: 响应头
+            throttled: 是否被限流（HTTP 429）
+            retry_after: 服务端要求的等待秒数
+        """
+        now = time.monotonic()
+        remaining_requests = _parse_int(_header(headers, "x-ratelimit-remaining-requests"))
+        remaining_tokens = _parse_int(_header(headers, "x-ratelimit-remaining-tokens"))
+        with self._cond:
+            state = self._state(endpoint)
+            if remaining_requests is not None and state.requests is not None:
+                state.requests.clamp(remaining_requests, now)
+            if remaining_tokens is not None and state.tokens is not None:
+                state.tokens.clamp(remaining_tokens, now)
+
+            pause = None
+            if throttled:
+                state.throttled += 1
+                state.consecutive_throttled += 1
+                state.factor = max(self.MIN_FACTOR, state.factor * self.BACKOFF_FACTOR)
+                if retry_after is None:
+                    retry_after = min(60.0, 2.0 ** min(state.consecutive_throttled, 6))
+                pause = retry_after
+            elif remaining_requests == 0 or remaining_tokens == 0:
+                state.consecutive_throttled = 0
+                # 额度已用完，暂停到服务端报告的重置时间
+                reset = (_parse_seconds(_header(headers, "x-ratelimit-reset-requests"))
+                         if remaining_requests == 0 else None)
+                reset_tokens = (_parse_seconds(_header(headers, "x-ratelimit-reset-tokens"))
+                                if remaining_tokens == 0 else None)
+                pause = max(reset or 0.0, reset_tokens or 0.0) or None
+            else:
+                state.consecutive_throttled = 0
+                state.factor = min(1.0, state.factor + self.RECOVERY_STEP)
+
+            if pause:
+                state.paused_until = max(state.paused_until, now + pause)
+            if state.requests is not None:
+                state.requests.set_rate(state.rpm * state.factor)
+            if state.tokens is not None:
+                state.tokens.set_rate(state.tpm * state.factor)
+
+        if throttled:
+            logger.warning(f"端点 {endpoint} 被限流，暂停 {pause:.2f} 秒，速率降为 {state.factor:.0%}")
+
+    def call(
+        self,
+        endpoint: str,
+        func: Callable[[], CallResult],
+        tokens: int = 0,
+        max_retries: int = 3,
+        lane: Optional[str] = None
+    ) -> Any:
+        """
+        在预算内执行一次远程调用，被限流时按服务端要求等待后重试
+
+        Args:
+            endpoint: 端点标识
+            func: 执行请求的函数，返回CallResult；被限流时抛出RateLimitError
+            tokens: 预计消耗的token数
+            max_retries: 被限流时的最大重试次数
+            lane: 优先级通道，默认使用当前上下文的通道
+
+        Returns:
+            CallResult.value
+        """
+        lane = lane or current_priority()
+        for attempt in range(max_retries + 1):
+            self.acquire(endpoint, tokens, lane)
+            try:
+                result = func()
+            except RateLimitError as e:
+                self.settle(endpoint, tokens, 0)
+                self.observe(endpoint, e.headers, throttled=True, retry_after=e.retry_after)
+                if attempt == max_retries:
+                    raise
+                continue
+            finally:
+                self.release(endpoint, lane)
+            self.observe(endpoint, result.headers)
+            self.settle(endpoint, tokens, result.tokens)
+            return result.value
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点的统计信息
+
+        Returns:
+            端点到统计信息的映射，包含calls、throttled、waited_seconds、rate_factor和lanes字段，
+            lanes中按通道给出calls、waited_seconds、active和waiting
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    "calls": state.calls,
+                    "throttled": state.throttled,
+                    "waited_seconds": state.waited_seconds,
+                    "rate_factor": state.factor,
+                    "lanes": {
+                        lane: {
+                            "calls": state.lane_calls[lane],
+                            "waited_seconds": state.lane_waited[lane],
+                            "active": state.active[lane],
+                            "waiting": state.waiting[lane]
+                        }
+                        for lane in LANES
+                    }
+                }
+                for endpoint, state in self._endpoints.items()
+            }
+
+    def _state(self, endpoint: str) -> _EndpointState:
+        """获取端点状态，未配置的端点不限额（调用方持有锁）"""
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            state = self._endpoints[endpoint] = _EndpointState(0, 0)
+        return state
+
+
+# 全局调度器实例，所有模型客户端共享
+scheduler = RateLimitScheduler()
@@ -2,6 +2,9 @@
 数据库模块
 """
 
-from .chroma_manager import ChromaDBManager
+from .chroma_manager import ChromaDBManager, QueryHit
+from .document_store import DocumentStore
+from .collection_pool import CollectionPool
+from .manifest import IngestManifest, content_hash, make_document_id, assign_document_ids
 
-__all__ = ['ChromaDBManager']
\ No newline at end of file
+__all__ = ['ChromaDBManager', 'QueryHit', 'DocumentStore', 'CollectionPool', 'IngestManifest', 'content_hash', 'make_document_id', 'assign_document_ids']
\ No newline at end of file
@@ -3,34 +3,119 @@ ChromaDB数据库管理模块
 提供向量数据库的增删改查功能
 """
 
-from typing import List, Dict, Optional, Callable
+import gzip
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Optional, Callable, Iterable, Iterator, Sequence, Tuple, Any, Union
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from ..core.logger import logger, log_function_call
 from ..core.config import config
+from ..core.documents import Document, unpack_documents
+from .metadata_index import MetadataIndex
+from .document_store import DocumentStore
+
+
+# 快照目录中的文件
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_INFO = "snapshot.json"
+SNAPSHOT_IDS = "ids.jsonl"
+SNAPSHOT_DOCUMENTS = "documents.jsonl.gz"
+SNAPSHOT_METADATAS = "metadatas.jsonl"
+SNAPSHOT_EMBEDDINGS = "embeddings.npy"
+
+
+# 查询结果可以投影的字段（与Chroma的include取值一致）
+QUERY_FIELDS = ("documents", "metadatas", "distances")
+
+
+class QueryHit:
+    """
+    单条查询结果
+    
+    使用__slots__减少每条结果的内存分配，同时支持hit["document"]和hit.get("metadata")形式的访问，
+    与之前返回字典的调用方式兼容。未在include中请求的字段为None。
+    """
+    
+    __slots__ = ("id", "document", "metadata", "distance")
+    
+    def __init__(
+        self,
+        id: str,
+        document: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        distance: Optional[float] = None
+    ):
+        self.id = id
+        self.document = document
+        self.metadata = metadata
+        self.distance = distance
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """按字段名取值，字段不存在或未请求时返回默认值"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {key: getattr(self, key) for key in self.__slots__}
+    
+    def __repr__(self) -> str:
+        return f"QueryHit(id='{self.id}', distance={self.distance})"
 
 
 class ChromaDBManager:
     """ChromaDB管理器"""
     
-    def __init__(self, collection_name: Optional[str] = None, embedding_function: Optional[Callable] = None):
+    def __init__(
+        self,
+        collection_name: Optional[str] = None,
+        embedding_function: Optional[Callable] = None,
+        external_documents: Optional[bool] = None,
+        client: Optional[Any] = None
+    ):
         """
         初始化ChromaDB管理器
         
         Args:
             collection_name: 集合名称
             embedding_function: 嵌入函数
+            external_documents: 是否将文档文本保存在本地压缩存储中，Chroma只保存向量、ID和元数据，
+                默认使用配置值
+            client: 共享的Chroma客户端，为空时新建
         """
         self.collection_name = collection_name or config.database.collection_name
         self.embedding_function = embedding_function
+        self.external_documents = (
+            config.database.external_documents if external_documents is None else external_documents
+        )
         
-        # 配置ChromaDB客户端
-        chroma_settings = Settings()
-        if config.database.persist_directory:
-            chroma_settings.persist_directory = config.database.persist_directory
+        if client is None:
+            # 配置ChromaDB客户端
+            chroma_settings = Settings()
+            if config.database.persist_directory:
+                chroma_settings.persist_directory = config.database.persist_directory
+            client = chromadb.Client(settings=chroma_settings)
         
-        self.client = chromadb.Client(settings=chroma_settings)
+        self.client = client
         self.collection = self._get_or_create_collection()
+        self._metadata_index: Optional[MetadataIndex] = None
+        # 索引与集合是否一致的缓存结果，None表示需要重新比对文档数量
+        self._index_synced: Optional[bool] = None
+        self._document_store: Optional[DocumentStore] = None
         
         logger.info(f"初始化ChromaDB管理器，集合名称: {self.collection_name}")
     
@@ -48,56 +133,193 @@ class ChromaDBManager:
         return collection
     
     @log_function_call
-    def add_documents(self, documents: List[str], metadatas: Optional[List[Dict]] = None, ids: Optional[List[str]] = None):
+    def add_documents(
+        self,
+        documents: List[Union[str, Document]],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None
+    ):
         """
         添加文档到集合
         
         Args:
-            documents: 文档内容列表
-            metadatas: 文档元数据列表
-            ids: 文档ID列表
+            documents: 文档内容或Document列表
+            metadatas: 文档元数据列表，为空时使用Document中的元数据
+            ids: 文档ID列表，为空时使用Document中的ID
         """
         if not documents:
             logger.warning("文档列表为空")
             return
         
+        documents, metadatas, ids = unpack_documents(documents, metadatas, ids)
+        
         # 自动生成元数据和ID（如果未提供）
         if metadatas is None:
             metadatas = [{"source": "default"} for _ in documents]
         
         if ids is None:
-            import uuid
             ids = [str(uuid.uuid4()) for _ in documents]
         
         try:
             # 如果有嵌入函数，先生成嵌入向量
-            if self.embedding_function:
-                embeddings = self.embedding_function(documents)
-                self.collection.add(
-                    documents=documents,
-                    embeddings=embeddings,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-            else:
-                self.collection.add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
+            embeddings = self.embedding_function(documents) if self.embedding_function else None
+            self._write(self.collection.add, documents, embeddings, metadatas, ids)
             logger.info(f"成功添加 {len(documents)} 个文档到集合")
         except Exception as e:
             logger.error(f"添加文档失败: {str(e)}")
             raise RuntimeError(f"添加文档失败: {str(e)}") from e
     
+    def upsert_documents(
+        self,
+        documents: List[Union[str, Document]],
+        embeddings: Optional[List[List[float]]] = None,
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None
+    ) -> int:
+        """
+        写入或更新一批文档（ID已存在时覆盖）
+        
+        Args:
+            documents: 文档内容或Document列表
+            embeddings: 预先计算好的嵌入向量，为空时使用嵌入函数生成
+            metadatas: 文档元数据列表，为空时使用Document中的元数据
+            ids: 文档ID列表，为空时使用Document中的ID
+        
+        Returns:
+            写入的文档数量
+        """
+        if not documents:
+            return 0
+        
+        documents, metadatas, ids = unpack_documents(documents, metadatas, ids)
+        
+        if metadatas is None:
+            metadatas = [{"source": "default"} for _ in documents]
+        
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+        
+        if embeddings is None and self.embedding_function:
+            embeddings = self.embedding_function(documents)
+        
+        self._write(self.collection.upsert, documents, embeddings, metadatas, ids)
+        return len(documents)
+    
+    def _write(
+        self,
+        write: Callable,
+        documents: List[str],
+        embeddings: Optional[List[List[float]]],
+        metadatas: List[Dict],
+        ids: List[str]
+    ) -> None:
+        """调用集合的add或upsert写入文档，并同步本地索引和文档存储"""
+        if self.external_documents:
+            if embeddings is None:
+                raise ValueError("外部文档存储模式需要嵌入函数或预先计算的嵌入向量")
+            # 先写文本再写向量，保证集合中的ID总能取到文本
+            self.document_store.put(ids, documents)
+            write(embeddings=embeddings, metadatas=metadatas, ids=ids)
+        elif embeddings is not None:
+            write(documents=documents, embeddings=embeddings, metadatas=metadatas, ids=ids)
+        else:
+            write(documents=documents, metadatas=metadatas, ids=ids)
+        self.metadata_index.add(ids, metadatas)
+        self._index_synced = None
+    
     @log_function_call
-    def query(self, query_text: str, n_results: int = 5) -> List[Dict]:
+    def upsert_many(
+        self,
+        documents: Iterable[Union[str, Document]],
+        metadatas: Optional[Iterable[Dict]] = None,
+        ids: Optional[Iterable[str]] = None,
+        batch_size: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        分批流式写入大量文档
+        
+        输入可以是任意迭代器，每次只在内存中保留当前批次和正在写入的上一批次。
+        第N批写入数据库的同时会计算第N+1批的嵌入向量。
+        
+        Args:
+            documents: 文档内容或Document迭代器
+            metadatas: 文档元数据迭代器，需与documents一一对应，为空时使用Document中的元数据
+            ids: 文档ID迭代器，需与documents一一对应，为空时使用Document中的ID
+            batch_size: 每批文档数量，默认使用配置值，且不超过Chroma允许的最大批次
+            progress_callback: 每批写入完成后调用，参数为当前统计信息
+        
+        Returns:
+            包含count、batches、elapsed和docs_per_second的统计信息
+        """
+        batch_size = min(batch_size or config.database.batch_size, self._get_max_batch_size())
+        if batch_size <= 0:
+            raise ValueError("batch_size必须大于0")
+        
+        stats = {"count": 0, "batches": 0, "elapsed": 0.0, "docs_per_second": 0.0}
+        start_time = time.perf_counter()
+        
+        def _commit(future) -> None:
+            stats["count"] += future.result()
+            stats["batches"] += 1
+            stats["elapsed"] = time.perf_counter() - start_time
+            stats["docs_per_second"] = stats["count"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+            logger.info(
+                f"已写入 {stats['count']} 个文档（{stats['batches']} 批），"
+                f"吞吐量: {stats['docs_per_second']:.1f} docs/s"
+            )
+            if progress_callback:
+                progress_callback(dict(stats))
+        
+        try:
+            pending = None
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                for batch_docs, batch_metas, batch_ids in _iter_batches(documents, metadatas, ids, batch_size):
+                    # 在后台写入上一批的同时计算当前批次的嵌入向量
+                    embeddings = self.embedding_function(batch_docs) if self.embedding_function else None
+                    if pending is not None:
+                        _commit(pending)
+                    pending = writer.submit(self.upsert_documents, batch_docs, embeddings, batch_metas, batch_ids)
+                
+                if pending is not None:
+                    _commit(pending)
+        except Exception as e:
+            logger.error(f"批量写入文档失败（已写入 {stats['count']} 个）: {str(e)}")
+            raise RuntimeError(f"批量写入文档失败: {str(e)}") from e
+        
+        logger.info(f"批量写入完成，共 {stats['count']} 个文档，耗时 {stats['elapsed']:.2f} 秒")
+        return stats
+    
+    def _get_max_batch_size(self) -> int:
+        """获取Chroma单次写入允许的最大文档数"""
+        try:
+            max_batch_size = int(self.client.get_max_batch_size())
+            if max_batch_size > 0:
+                return max_batch_size
+        except Exception:
+            pass
+        return config.database.batch_size
+    
+    @log_function_call
+    def query(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        where_document: Optional[Dict] = None,
+        include: Sequence[str] = QUERY_FIELDS
+    ) -> List[QueryHit]:
         """
         查询相似文档
         
         Args:
             query_text: 查询文本
             n_results: 返回结果数量
+            where: 元数据过滤条件（Chroma where格式），例如 {"source": "a.pdf"}
+            where_document: 文档内容过滤条件（Chroma where_document格式），例如 {"$contains": "利率"}
+            include: 需要返回的字段，取值为documents、metadatas、distances；ID总是返回。
+                只需要ID和距离时（去重、评估、融合排序）传入("distances",)，可减少反序列化开销。
+                外部文档存储模式下documents从本地存储读取
         
         Returns:
             查询结果列表
@@ -106,28 +328,55 @@ class ChromaDBManager:
             logger.warning("查询文本为空")
             return []
         
+        unknown = set(include) - set(QUERY_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的include字段: {sorted(unknown)}")
+        if where_document and self.external_documents:
+            raise ValueError("外部文档存储模式下Chroma中没有文档文本，不支持where_document过滤")
+        include = list(include)
+        chroma_include = [field for field in include if field != "documents"] if self.external_documents else include
+        
         try:
+            # 本地索引只作为数量预过滤：匹配数少于n_results时收紧n_results，
+            # 候选范围和结果始终以Chroma的where过滤为准
+            equality_filters = _equality_filters(where)
+            if equality_filters is not None and self.metadata_index.covers(equality_filters) and self._index_in_sync():
+                matched = self.metadata_index.lookup(**equality_filters)
+                if matched:
+                    n_results = min(n_results, len(matched))
+            
+            filter_params = {}
+            if where:
+                filter_params["where"] = _to_chroma_where(where)
+            if where_document:
+                filter_params["where_document"] = where_document
+            
             # 如果有嵌入函数，先生成查询向量
             if self.embedding_function:
                 query_embedding = self.embedding_function([query_text])[0]
                 results = self.collection.query(
                     query_embeddings=[query_embedding],
-                    n_results=n_results
+                    n_results=n_results,
+                    include=chroma_include,
+                    **filter_params
                 )
             else:
                 results = self.collection.query(
                     query_texts=[query_text],
-                    n_results=n_results
+                    n_results=n_results,
+                    include=chroma_include,
+                    **filter_params
                 )
             
-            formatted_results = []
-            if results['ids'][0]:  # 检查是否有结果
-                for i in range(len(results['ids'][0])):
-                    formatted_results.append({
-                        "document": results['documents'][0][i],
-                        "metadata": results['metadatas'][0][i],
-                        "distance": results['distances'][0][i] if results['distances'] else 0.0
-                    })
+            ids = results['ids'][0]
+            # 未请求的字段用None填充，按列组装结果
+            columns = [
+                results[field][0] if field in include and results.get(field) else [None] * len(ids)
+                for field in QUERY_FIELDS
+            ]
+            if self.external_documents and "documents" in include:
+                columns[0] = self.document_store.get(ids)
+            formatted_results = [QueryHit(*row) for row in zip(ids, *columns)]
             
             logger.info(f"查询成功，返回 {len(formatted_results)} 个结果")
             return formatted_results
@@ -136,6 +385,29 @@ class ChromaDBManager:
             logger.error(f"查询失败: {str(e)}")
             raise RuntimeError(f"查询失败: {str(e)}") from e
     
+    def fetch_documents(self, ids: Sequence[str]) -> List[Optional[str]]:
+        """
+        按ID获取文档内容，用于只查询了ID和距离的结果按需取回文本
+        
+        Args:
+            ids: 文档ID列表
+        
+        Returns:
+            与ids顺序一致的文档内容列表，不存在的ID对应None
+        """
+        if not ids:
+            return []
+        
+        try:
+            if self.external_documents:
+                return self.document_store.get(ids)
+            results = self.collection.get(ids=list(ids), include=["documents"])
+            documents = dict(zip(results["ids"], results["documents"]))
+            return [documents.get(doc_id) for doc_id in ids]
+        except Exception as e:
+            logger.error(f"获取文档失败: {str(e)}")
+            raise RuntimeError(f"获取文档失败: {str(e)}") from e
+    
     @log_function_call
     def delete_documents(self, ids: List[str]) -> bool:
         """
@@ -153,12 +425,284 @@ class ChromaDBManager:
         
         try:
             self.collection.delete(ids=ids)
+            self.metadata_index.remove(ids)
+            self._index_synced = None
+            if self.external_documents:
+                self.document_store.remove(ids)
             logger.info(f"成功删除 {len(ids)} 个文档")
             return True
         except Exception as e:
             logger.error(f"删除文档失败: {str(e)}")
             return False
     
+    @log_function_call
+    def delete_where(self, where: Optional[Dict] = None, **filters) -> int:
+        """
+        按元数据条件删除文档
+        
+        等值条件的字段都已建立索引时直接从本地索引得到文档ID，开销只与匹配数量有关；
+        否则退回到Chroma的where过滤。
+        
+        Args:
+            where: 元数据过滤条件（Chroma where格式）
+            **filters: 字段名到取值的等值条件，例如 source="a.pdf"
+        
+        Returns:
+            删除的文档数量
+        """
+        if not where and not filters:
+            logger.warning("删除条件为空")
+            return 0
+        
+        try:
+            ids = None
+            if filters and not where and self.metadata_index.covers(filters):
+                # 索引与集合不一致（例如有其他写入方）时先重建，保证不会漏删
+                if not self._index_in_sync():
+                    self.rebuild_metadata_index()
+                ids = self.metadata_index.lookup(**filters)
+            
+            if ids is None:
+                conditions = dict(filters)
+                if where:
+                    conditions = {"$and": [_to_chroma_where(conditions), where]} if conditions else where
+                ids = self.collection.get(where=_to_chroma_where(conditions), include=[])["ids"]
+            
+            ids = list(ids)
+            if not ids:
+                logger.info("没有匹配删除条件的文档")
+                return 0
+            
+            max_batch_size = self._get_max_batch_size()
+            for start in range(0, len(ids), max_batch_size):
+                self.collection.delete(ids=ids[start:start + max_batch_size])
+            self.metadata_index.remove(ids)
+            self._index_synced = None
+            if self.external_documents:
+                self.document_store.remove(ids)
+            
+            logger.info(f"按条件成功删除 {len(ids)} 个文档")
+            return len(ids)
+        except Exception as e:
+            logger.error(f"按条件删除文档失败: {str(e)}")
+            raise RuntimeError(f"按条件删除文档失败: {str(e)}") from e
+    
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        """元数据二级索引（首次使用时从索引文件加载，不扫描集合）"""
+        if self._metadata_index is None:
+            path = None
+            if config.database.index_directory:
+                path = os.path.join(config.database.index_directory, f"{self.collection_name}.metadata_index.jsonl")
+            self._metadata_index = MetadataIndex(config.database.index_fields, path)
+        return self._metadata_index
+    
+    @property
+    def document_store(self) -> DocumentStore:
+        """外部文档存储（首次使用时加载）"""
+        if self._document_store is None:
+            path = None
+            if config.database.document_store_directory:
+                path = os.path.join(config.database.document_store_directory, f"{self.collection_name}.documents")
+            self._document_store = DocumentStore(
+                path,
+                block_size=config.database.document_block_size,
+                cache_blocks=config.database.document_cache_blocks
+            )
+        return self._document_store
+    
+    def rebuild_metadata_index(self) -> int:
+        """从集合重建元数据索引，返回索引的文档数量"""
+        count = self.metadata_index.rebuild(self.collection, batch_size=config.database.batch_size)
+        self._index_synced = None
+        return count
+    
+    def _index_in_sync(self) -> bool:
+        """
+        索引中的文档数量与集合一致时才认为索引可信
+        
+        比对结果缓存到下一次通过本管理器写入或删除为止，过滤查询不会每次都多一次count调用；
+        其他写入方修改集合后应调用rebuild_metadata_index。
+        """
+        if self._index_synced is None:
+            self._index_synced = len(self.metadata_index) == self._collection_count()
+        return self._index_synced
+    
+    def _collection_count(self) -> int:
+        """获取集合中的文档数量，失败时返回0"""
+        try:
+            return int(self.collection.count())
+        except Exception:
+            return 0
+    
+    def reset(self) -> None:
+        """
+        快速清空集合
+        
+        在同一个客户端上删除并重建集合，同时清空元数据索引，不需要重新创建管理器。
+        """
+        try:
+            self.client.delete_collection(name=self.collection_name)
+        except Exception as e:
+            logger.warning(f"删除集合失败，可能集合不存在: {str(e)}")
+        self.collection = self.client.create_collection(name=self.collection_name)
+        self.metadata_index.clear()
+        self._index_synced = None
+        if self.external_documents:
+            self.document_store.clear()
+        logger.info(f"集合已重置: {self.collection_name}")
+    
+    def rename(self, new_name: str) -> None:
+        """
+        重命名集合，同时移动本地的元数据索引和文档存储文件
+        
+        Args:
+            new_name: 新的集合名称
+        """
+        old_index_path = self.metadata_index.path
+        old_store_path = self.document_store.path if self.external_documents else None
+        self.collection.modify(name=new_name)
+        self.collection_name = new_name
+        
+        if old_index_path:
+            new_index_path = os.path.join(os.path.dirname(old_index_path), f"{new_name}.metadata_index.jsonl")
+            if os.path.exists(old_index_path):
+                os.replace(old_index_path, new_index_path)
+            self.metadata_index.path = new_index_path
+        if old_store_path:
+            new_store_path = os.path.join(os.path.dirname(old_store_path), f"{new_name}.documents")
+            if os.path.exists(old_store_path):
+                os.replace(old_store_path, new_store_path)
+            self.document_store.path = new_store_path
+        logger.info(f"集合已重命名为: {new_name}")
+    
+    @log_function_call
+    def snapshot(self, path: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        将集合导出为快照目录
+        
+        快照包含ID（ids.jsonl）、压缩的文档（documents.jsonl.gz）、元数据（metadatas.jsonl）
+        和float32向量（embeddings.npy），分页流式写出，内存占用与批次大小相关。
+        
+        Args:
+            path: 快照目录
+            batch_size: 每页读取的文档数量
+        
+        Returns:
+            快照信息，包含count和dimension字段
+        """
+        batch_size = min(batch_size or config.database.batch_size, self._get_max_batch_size())
+        os.makedirs(path, exist_ok=True)
+        total = self._collection_count()
+        start_time = time.perf_counter()
+        
+        try:
+            written = 0
+            dimension = 0
+            vectors = None
+            with open(os.path.join(path, SNAPSHOT_IDS), 'w', encoding='utf-8') as ids_file, \
+                    gzip.open(os.path.join(path, SNAPSHOT_DOCUMENTS), 'wt', encoding='utf-8') as documents_file, \
+                    open(os.path.join(path, SNAPSHOT_METADATAS), 'w', encoding='utf-8') as metadatas_file:
+                while written < total:
+                    page = self.collection.get(
+                        include=["metadatas", "embeddings"] if self.external_documents
+                        else ["documents", "metadatas", "embeddings"],
+                        limit=min(batch_size, total - written),
+                        offset=written
+                    )
+                    if len(page["ids"]) == 0:
+                        break
+                    if self.external_documents:
+                        page["documents"] = self.document_store.get(page["ids"])
+                    
+                    embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                    if vectors is None:
+                        dimension = embeddings.shape[1]
+                        vectors = np.lib.format.open_memmap(
+                            os.path.join(path, SNAPSHOT_EMBEDDINGS), mode='w+', dtype=np.float32, shape=(total, dimension)
+                        )
+                    vectors[written:written + len(page["ids"])] = embeddings
+                    
+                    for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                        ids_file.write(json.dumps(doc_id, ensure_ascii=False) + "\n")
+                        documents_file.write(json.dumps(document, ensure_ascii=False) + "\n")
+                        metadatas_file.write(json.dumps(metadata, ensure_ascii=False) + "\n")
+                    written += len(page["ids"])
+            
+            if vectors is None:
+                np.save(os.path.join(path, SNAPSHOT_EMBEDDINGS), np.zeros((0, 0), dtype=np.float32))
+            else:
+                vectors.flush()
+                del vectors
+            
+            info = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "collection_name": self.collection_name,
+                "count": written,
+                "dimension": dimension,
+                "created_at": time.time()
+            }
+            with open(os.path.join(path, SNAPSHOT_INFO), 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False, indent=2)
+            
+            logger.info(f"快照导出完成: {path}，共 {written} 个文档，耗时 {time.perf_counter() - start_time:.2f} 秒")
+            return info
+        except Exception as e:
+            logger.error(f"快照导出失败: {str(e)}")
+            raise RuntimeError(f"快照导出失败: {str(e)}") from e
+    
+    @log_function_call
+    def restore(self, path: str, batch_size: Optional[int] = None, reset: bool = True) -> int:
+        """
+        从快照目录批量导入集合，直接使用快照中的向量，不调用嵌入API
+        
+        Args:
+            path: 快照目录
+            batch_size: 每批写入的文档数量
+            reset: 导入前是否清空当前集合
+        
+        Returns:
+            导入的文档数量
+        """
+        info_path = os.path.join(path, SNAPSHOT_INFO)
+        if not os.path.exists(info_path):
+            raise FileNotFoundError(f"快照不存在: {path}")
+        
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if info.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"不支持的快照格式版本: {info.get('format_version')}")
+        
+        batch_size = min(batch_size or config.database.batch_size, self._get_max_batch_size())
+        count = info["count"]
+        start_time = time.perf_counter()
+        
+        try:
+            if reset:
+                self.reset()
+            
+            vectors = np.load(os.path.join(path, SNAPSHOT_EMBEDDINGS), mmap_mode='r')
+            restored = 0
+            with open(os.path.join(path, SNAPSHOT_IDS), 'r', encoding='utf-8') as ids_file, \
+                    gzip.open(os.path.join(path, SNAPSHOT_DOCUMENTS), 'rt', encoding='utf-8') as documents_file, \
+                    open(os.path.join(path, SNAPSHOT_METADATAS), 'r', encoding='utf-8') as metadatas_file:
+                while restored < count:
+                    size = min(batch_size, count - restored)
+                    ids = [json.loads(line) for line in islice(ids_file, size)]
+                    documents = [json.loads(line) for line in islice(documents_file, size)]
+                    metadatas = [json.loads(line) for line in islice(metadatas_file, size)]
+                    if not ids:
+                        break
+                    embeddings = np.asarray(vectors[restored:restored + len(ids)])
+                    self.upsert_documents(documents, embeddings, metadatas, ids)
+                    restored += len(ids)
+            
+            logger.info(f"快照导入完成: {path}，共 {restored} 个文档，耗时 {time.perf_counter() - start_time:.2f} 秒")
+            return restored
+        except Exception as e:
+            logger.error(f"快照导入失败: {str(e)}")
+            raise RuntimeError(f"快照导入失败: {str(e)}") from e
+    
     def get_collection_info(self) -> Dict:
         """获取集合信息"""
         try:
@@ -173,4 +717,53 @@ class ChromaDBManager:
             return {"name": self.collection_name, "count": 0, "error": str(e)}
     
     def __repr__(self) -> str:
-        return f"ChromaDBManager(collection_name='{self.collection_name}')"
\ No newline at end of file
+        return f"ChromaDBManager(collection_name='{self.collection_name}')"
+
+
+def _equality_filters(where: Optional[Dict]) -> Optional[Dict]:
+    """如果where只包含简单的等值条件，返回字段到取值的映射，否则返回None"""
+    if not where:
+        return None
+    for key, value in where.items():
+        if key.startswith("$") or isinstance(value, (dict, list)):
+            return None
+    return dict(where)
+
+
+def _to_chroma_where(where: Dict) -> Dict:
+    """将多个字段的等值条件转换为Chroma要求的$and形式"""
+    if len(where) <= 1:
+        return where
+    return {"$and": [{key: value} for key, value in where.items()]}
+
+
+def _iter_batches(
+    documents: Iterable[Union[str, Document]],
+    metadatas: Optional[Iterable[Dict]],
+    ids: Optional[Iterable[str]],
+    batch_size: int
+) -> Iterator[Tuple[List[str], List[Dict], List[str]]]:
+    """将文档、元数据和ID迭代器按批次切分，Document按批拆分，缺失的元数据和ID自动生成"""
+    doc_iter = iter(documents)
+    meta_iter = iter(metadatas) if metadatas is not None else None
+    id_iter = iter(ids) if ids is not None else None
+    
+    while True:
+        batch_docs = list(islice(doc_iter, batch_size))
+        if not batch_docs:
+            return
+        
+        batch_metas = list(islice(meta_iter, len(batch_docs))) if meta_iter is not None else None
+        batch_ids = list(islice(id_iter, len(batch_docs))) if id_iter is not None else None
+        batch_docs, batch_metas, batch_ids = unpack_documents(batch_docs, batch_metas, batch_ids)
+        
+        if batch_metas is None:
+            batch_metas = [{"source": "default"} for _ in batch_docs]
+        
+        if batch_ids is None:
+            batch_ids = [str(uuid.uuid4()) for _ in batch_docs]
+        
+        if len(batch_metas) != len(batch_docs) or len(batch_ids) != len(batch_docs):
+            raise ValueError("documents、metadatas和ids的长度不一致")
+        
+        yield batch_docs, batch_metas, batch_ids
\ No newline at end of file
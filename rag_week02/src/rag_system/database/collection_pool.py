@@ -0,0 +1,206 @@
+"""
+集合句柄池模块
+为多租户服务缓存每个租户的ChromaDBManager，按LRU和空闲时间淘汰
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from ..core.logger import logger
+from ..core.config import config
+from .chroma_manager import ChromaDBManager
+from .manifest import IngestManifest
+
+# Chroma集合名称只允许字母、数字、下划线、连字符和点
+_TENANT_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+
+
+@dataclass
+class _PoolEntry:
+    """池中的一个租户句柄"""
+    manager: ChromaDBManager
+    manifest: IngestManifest
+    last_used: float
+
+
+class CollectionPool:
+    """
+    集合句柄池
+
+    每个租户对应一个独立的集合，首次访问时打开ChromaDBManager并缓存，之后的访问直接复用。
+    所有句柄共享同一个Chroma客户端和嵌入函数（迁移过嵌入模型的租户使用自己的嵌入客户端）；
+    超过容量时淘汰最久未使用的句柄，空闲超过idle_timeout秒的句柄在下次访问池时淘汰。
+    """
+
+    def __init__(
+        self,
+        embedding_function: Optional[Callable] = None,
+        client: Optional[Any] = None,
+        max_size: Optional[int] = None,
+        idle_timeout: Optional[float] = None
+    ):
+        """
+        初始化集合句柄池
+
+        Args:
+            embedding_function: 所有租户共享的嵌入函数
+            client: 共享的Chroma客户端，为空时由第一个打开的句柄创建
+            max_size: 最多缓存的句柄数量，默认使用配置值
+            idle_timeout: 句柄空闲多少秒后淘汰，默认使用配置值，0表示不按空闲时间淘汰
+        """
+        self.embedding_function = embedding_function
+        self.client = client
+        self.max_size = max_size or config.database.pool_size
+        self.idle_timeout = config.database.pool_idle_seconds if idle_timeout is None else idle_timeout
+        if self.max_size <= 0:
+            raise ValueError("max_size必须大于0")
+
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        # 租户写锁不随句柄淘汰，保证同一租户的所有视图使用同一把锁
+        self._write_locks: Dict[str, threading.RLock] = {}
+        # 迁移过嵌入模型的租户的嵌入客户端，同样不随句柄淘汰
+        self._embeddings: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def collection_name_for(tenant: str) -> str:
+        """租户对应的集合名称"""
+        if not tenant or not _TENANT_PATTERN.match(tenant):
+            raise ValueError(f"无效的租户ID: {tenant!r}，只允许字母、数字、下划线和连字符")
+        return f"{config.database.collection_name}_{tenant}"
+
+    def get(self, tenant: str) -> ChromaDBManager:
+        """获取租户的集合管理器，不存在时打开"""
+        return self._entry(tenant).manager
+
+    def manifest(self, tenant: str) -> IngestManifest:
+        """获取租户的摄取清单（不计入请求次数）"""
+        return self._entry(tenant, count=False).manifest
+
+    def write_lock(self, tenant: str) -> threading.RLock:
+        """获取租户的写锁"""
+        with self._lock:
+            return self._write_locks.setdefault(tenant, threading.RLock())
+
+    def embedding(self, tenant: str) -> Optional[Any]:
+        """获取租户迁移后的嵌入客户端，未迁移过时返回None"""
+        with self._lock:
+            return self._embeddings.get(tenant)
+
+    def switch(self, tenant: str, manager: ChromaDBManager, embedding_client: Any) -> None:
+        """
+        嵌入模型迁移完成后切换租户的集合管理器和嵌入客户端
+
+        已缓存的句柄原地替换管理器，保留摄取清单；之后重新打开的句柄也使用新的嵌入客户端。
+
+        Args:
+            tenant: 租户ID
+            manager: 指向迁移后集合的管理器
+            embedding_client: 新的嵌入模型客户端
+        """
+        with self._lock:
+            self._embeddings[tenant] = embedding_client
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                entry.manager = manager
+
+    def evict(self, tenant: str) -> bool:
+        """从池中移除租户的句柄，返回是否存在"""
+        with self._lock:
+            entry = self._entries.pop(tenant, None)
+            if entry is not None:
+                self._stats[tenant]["evictions"] += 1
+        return entry is not None
+
+    def evict_idle(self) -> int:
+        """淘汰空闲超时的句柄，返回淘汰数量"""
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取每个租户的统计信息
+
+        Returns:
+            租户到统计信息的映射，包含requests、opens、evictions、open和idle_seconds字段
+        """
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for tenant, stat in self._stats.items():
+                entry = self._entries.get(tenant)
+                result[tenant] = {
+                    "requests": stat["requests"],
+                    "opens": stat["opens"],
+                    "evictions": stat["evictions"],
+                    "open": entry is not None,
+                    "idle_seconds": now - entry.last_used if entry is not None else None
+                }
+            return result
+
+    def _entry(self, tenant: str, count: bool = True) -> _PoolEntry:
+        """取得租户的句柄，按需打开并维护LRU顺序"""
+        collection_name = self.collection_name_for(tenant)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            stat = self._stats.setdefault(tenant, {"requests": 0, "opens": 0, "evictions": 0})
+            if count:
+                stat["requests"] += 1
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                entry.last_used = now
+                self._entries.move_to_end(tenant)
+                return entry
+
+            # 在锁内打开，避免同一租户并发打开两次；打开集合只是本地操作
+            embedding_client = self._embeddings.get(tenant)
+            manager = ChromaDBManager(
+                collection_name=collection_name,
+                embedding_function=(
+                    embedding_client.get_embeddings if embedding_client is not None else self.embedding_function
+                ),
+                client=self.client
+            )
+            if self.client is None:
+                self.client = manager.client
+            entry = _PoolEntry(manager, IngestManifest(self._manifest_path(tenant)), last_used=now)
+            self._entries[tenant] = entry
+            stat["opens"] += 1
+
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._stats[evicted]["evictions"] += 1
+                logger.info(f"集合句柄池已满，淘汰租户: {evicted}")
+            return entry
+
+    def _evict_idle(self, now: float) -> int:
+        """淘汰空闲超时的句柄（调用方持有锁）"""
+        if not self.idle_timeout:
+            return 0
+        idle = [tenant for tenant, entry in self._entries.items() if now - entry.last_used > self.idle_timeout]
+        for tenant in idle:
+            del self._entries[tenant]
+            self._stats[tenant]["evictions"] += 1
+        if idle:
+            logger.info(f"淘汰 {len(idle)} 个空闲的集合句柄")
+        return len(idle)
+
+    @staticmethod
+    def _manifest_path(tenant: str) -> Optional[str]:
+        """租户的摄取清单路径"""
+        if not config.database.manifest_path:
+            return None
+        root, ext = os.path.splitext(config.database.manifest_path)
+        return f"{root}.{tenant}{ext}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"CollectionPool(size={len(self._entries)}, max_size={self.max_size})"
@@ -0,0 +1,294 @@
+"""
+外部文档存储模块
+将文档文本压缩后按块保存在本地，向量数据库中只保存向量、ID和元数据
+"""
+
+import json
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from ..core.logger import logger
+
+try:
+    import zstandard
+except ImportError:  # 未安装zstandard时使用标准库的zlib
+    zstandard = None
+
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("文档块使用zstd压缩，需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class DocumentStore:
+    """
+    块寻址的压缩文档存储
+
+    每次写入的文档按block_size分块，每块序列化为JSON数组后整体压缩，追加到数据文件（blocks.dat）；
+    块的位置和块内文档ID追加到索引日志（index.jsonl）。读取时按块解压，
+    最近使用的解压块保存在LRU缓存中，同一块内的相邻文档只需解压一次。
+    """
+
+    DATA_FILE = "blocks.dat"
+    INDEX_FILE = "index.jsonl"
+
+    # 日志中的文档数超过存活文档数的倍数时，needs_compaction返回True
+    COMPACT_RATIO = 2
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        block_size: int = 64,
+        cache_blocks: int = 32,
+        codec: Optional[str] = None
+    ):
+        """
+        初始化文档存储
+
+        Args:
+            path: 存储目录，为空时只保存在内存中
+            block_size: 每个压缩块包含的文档数量
+            cache_blocks: 缓存的解压块数量
+            codec: 压缩算法（zstd或zlib），默认在安装了zstandard时使用zstd
+        """
+        if block_size <= 0:
+            raise ValueError("block_size必须大于0")
+
+        self.path = path
+        self.block_size = block_size
+        self.cache_blocks = max(0, cache_blocks)
+        self.codec = codec or DEFAULT_CODEC
+        if self.codec not in ("zstd", "zlib"):
+            raise ValueError(f"不支持的压缩算法: {self.codec}")
+        if self.codec == "zstd" and zstandard is None:
+            raise ValueError("使用zstd压缩需要安装zstandard")
+
+        # 块编号 -> (偏移, 长度, 压缩算法)；内存模式下偏移为_memory中的下标
+        self._blocks: List[Tuple[int, int, str]] = []
+        # 文档ID -> (块编号, 块内位置)
+        self._locations: Dict[str, Tuple[int, int]] = {}
+        self._memory: List[bytes] = []
+        self._cache: "OrderedDict[int, List[str]]" = OrderedDict()
+        self._slots = 0
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(os.path.join(path, self.INDEX_FILE)):
+            self._load()
+
+    def put(self, ids: Sequence[str], documents: Sequence[str]) -> None:
+        """
+        写入或覆盖文档
+
+        Args:
+            ids: 文档ID列表
+            documents: 文档内容列表
+        """
+        if len(ids) != len(documents):
+            raise ValueError("ids和documents的长度不一致")
+
+        for start in range(0, len(ids), self.block_size):
+            block_ids = list(ids[start:start + self.block_size])
+            data = _compress(
+                json.dumps(list(documents[start:start + self.block_size]), ensure_ascii=False).encode('utf-8'),
+                self.codec
+            )
+            with self._lock:
+                offset = self._write_block(data)
+                self._apply_block(block_ids, offset, len(data), self.codec)
+                self._append({
+                    "op": "block", "offset": offset, "length": len(data), "codec": self.codec, "ids": block_ids
+                })
+
+    def get(self, ids: Sequence[str]) -> List[Optional[str]]:
+        """
+        按ID读取文档
+
+        Args:
+            ids: 文档ID列表
+
+        Returns:
+            与ids顺序一致的文档内容列表，不存在的ID对应None
+        """
+        with self._lock:
+            locations = [self._locations.get(doc_id) for doc_id in ids]
+
+        blocks: Dict[int, List[str]] = {}
+        for location in locations:
+            if location is not None and location[0] not in blocks:
+                blocks[location[0]] = self._read_block(location[0])
+        return [blocks[location[0]][location[1]] if location is not None else None for location in locations]
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """删除文档（空间在compact时回收）"""
+        ids = list(ids)
+        with self._lock:
+            for doc_id in ids:
+                self._locations.pop(doc_id, None)
+            self._append({"op": "remove", "ids": ids})
+
+    def clear(self) -> None:
+        """清空存储"""
+        with self._lock:
+            self._reset_state()
+            if self.path:
+                for name in (self.DATA_FILE, self.INDEX_FILE):
+                    file_path = os.path.join(self.path, name)
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+
+    def needs_compaction(self) -> bool:
+        """日志中的文档数超过存活文档数的COMPACT_RATIO倍时返回True，由调用方决定何时compact"""
+        with self._lock:
+            return self._slots > self.COMPACT_RATIO * max(1, len(self._locations)) and len(self._blocks) > 1
+
+    def compact(self) -> None:
+        """
+        重写存储，只保留存活的文档
+
+        按块的顺序逐块读取存活文档，攒够block_size个就写入新文件，
+        内存中只保留一个读取块和一个待写块，不会把所有文档同时读入内存。
+        """
+        with self._lock:
+            live: Dict[int, List[Tuple[int, str]]] = {}
+            for doc_id, (block, position) in self._locations.items():
+                live.setdefault(block, []).append((position, doc_id))
+
+        # 先写到临时目录，完成后再替换，中断时原有数据不受影响
+        tmp_path = f"{self.path}.compact" if self.path else None
+        if tmp_path and os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        fresh = DocumentStore(tmp_path, self.block_size, 0, self.codec)
+
+        pending_ids: List[str] = []
+        pending_documents: List[str] = []
+        count = 0
+        for block in sorted(live):
+            documents = self._read_block(block, use_cache=False)
+            for position, doc_id in sorted(live[block]):
+                pending_ids.append(doc_id)
+                pending_documents.append(documents[position])
+            while len(pending_ids) >= self.block_size:
+                fresh.put(pending_ids[:self.block_size], pending_documents[:self.block_size])
+                count += self.block_size
+                del pending_ids[:self.block_size], pending_documents[:self.block_size]
+        if pending_ids:
+            fresh.put(pending_ids, pending_documents)
+            count += len(pending_ids)
+
+        with self._lock:
+            if tmp_path:
+                for name in (self.DATA_FILE, self.INDEX_FILE):
+                    tmp_file = os.path.join(tmp_path, name)
+                    if os.path.exists(tmp_file):
+                        os.replace(tmp_file, os.path.join(self.path, name))
+                    elif os.path.exists(os.path.join(self.path, name)):
+                        os.remove(os.path.join(self.path, name))
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            self._blocks = fresh._blocks
+            self._locations = fresh._locations
+            self._memory = fresh._memory
+            self._slots = fresh._slots
+            self._cache = OrderedDict()
+        logger.info(f"文档存储压缩完成，共 {count} 个文档")
+
+    def _reset_state(self) -> None:
+        """清空内存状态（调用方持有锁）"""
+        self._blocks = []
+        self._locations = {}
+        self._memory = []
+        self._cache = OrderedDict()
+        self._slots = 0
+
+    def _apply_block(self, ids: Sequence[str], offset: int, length: int, codec: str) -> None:
+        """登记一个块（调用方持有锁）"""
+        block = len(self._blocks)
+        self._blocks.append((offset, length, codec))
+        for position, doc_id in enumerate(ids):
+            self._locations[doc_id] = (block, position)
+        self._slots += len(ids)
+
+    def _write_block(self, data: bytes) -> int:
+        """追加一个压缩块，返回偏移（调用方持有锁）"""
+        if not self.path:
+            self._memory.append(data)
+            return len(self._memory) - 1
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, self.DATA_FILE), 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        return offset
+
+    def _read_block(self, block: int, use_cache: bool = True) -> List[str]:
+        """读取并解压一个块，优先使用缓存；use_cache为False时不放入缓存（如compact的顺序读取）"""
+        with self._lock:
+            cached = self._cache.get(block)
+            if cached is not None:
+                self._cache.move_to_end(block)
+                return cached
+            offset, length, codec = self._blocks[block]
+            if not self.path:
+                data = self._memory[offset]
+            else:
+                with open(os.path.join(self.path, self.DATA_FILE), 'rb') as f:
+                    f.seek(offset)
+                    data = f.read(length)
+
+        documents = json.loads(_decompress(data, codec).decode('utf-8'))
+        if self.cache_blocks and use_cache:
+            with self._lock:
+                self._cache[block] = documents
+                self._cache.move_to_end(block)
+                while len(self._cache) > self.cache_blocks:
+                    self._cache.popitem(last=False)
+        return documents
+
+    def _append(self, record: Dict) -> None:
+        """追加一条索引日志（调用方持有锁）"""
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, self.INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _load(self) -> None:
+        """重放索引日志"""
+        with open(os.path.join(self.path, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record["op"] == "block":
+                    self._apply_block(record["ids"], record["offset"], record["length"], record["codec"])
+                elif record["op"] == "remove":
+                    for doc_id in record["ids"]:
+                        self._locations.pop(doc_id, None)
+
+        logger.info(f"加载文档存储: {self.path}，共 {len(self._locations)} 个文档")
+        if self.needs_compaction():
+            logger.info(f"文档存储 {self.path} 中已删除的文档较多，可以调用compact回收空间")
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._locations
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __repr__(self) -> str:
+        return f"DocumentStore(path='{self.path}', documents={len(self._locations)}, codec='{self.codec}')"
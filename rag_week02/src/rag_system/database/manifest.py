@@ -0,0 +1,153 @@
+"""
+摄取清单模块
+记录已写入向量数据库的(来源, 文档ID, 内容哈希)，用于增量摄取时的去重和变更检测
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..core.logger import logger
+
+
+def content_hash(text: str) -> str:
+    """计算文本内容的SHA-256哈希"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_document_id(source: str, text: str, occurrence: int = 0) -> str:
+    """
+    根据来源和内容生成确定性的文档ID
+
+    同一来源中的相同内容总是得到相同的ID，重复摄取时会覆盖而不是产生重复文档。
+    同一次摄取中重复出现的内容（如页眉页脚）通过出现序号区分。
+
+    Args:
+        source: 文档来源
+        text: 文档内容
+        occurrence: 该内容在同一来源中第几次出现，从0开始
+
+    Returns:
+        文档ID
+    """
+    key = f"{source}\0{content_hash(text)}"
+    if occurrence:
+        key = f"{key}\0{occurrence}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def assign_document_ids(
+    documents: Iterable[str],
+    metadatas: Iterable[Dict],
+    occurrences: Optional[Dict[Tuple[str, str], int]] = None
+) -> List[str]:
+    """
+    为一组文档生成确定性ID，同一来源中重复的内容按出现顺序编号
+
+    Args:
+        documents: 文档内容
+        metadatas: 文档元数据，使用其中的source字段
+        occurrences: 跨批次共享的出现次数计数，流式摄取时传入同一个字典
+
+    Returns:
+        文档ID列表
+    """
+    if occurrences is None:
+        occurrences = {}
+    ids = []
+    for document, metadata in zip(documents, metadatas):
+        source = (metadata or {}).get("source", "default")
+        key = (source, content_hash(document))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        ids.append(make_document_id(source, document, occurrence))
+    return ids
+
+
+class IngestManifest:
+    """
+    摄取清单，按来源保存文档ID到内容哈希的映射
+
+    以文档ID为键，同一来源中重复出现的内容（ID带出现序号）各占一条记录。
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化摄取清单
+
+        Args:
+            path: 清单文件路径，为空时只保存在内存中
+        """
+        self.path = path
+        self._sources: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self._sources = data["sources"]
+            else:
+                # 旧格式按内容哈希保存文档ID，反转为文档ID到内容哈希
+                self._sources = {
+                    source: {doc_id: digest for digest, doc_id in entries.items()}
+                    for source, entries in data.items()
+                }
+            logger.info(f"加载摄取清单: {path}，共 {len(self._sources)} 个来源")
+
+    def get(self, source: str) -> Dict[str, str]:
+        """获取某个来源已写入的文档ID到内容哈希的映射"""
+        with self._lock:
+            return dict(self._sources.get(source, {}))
+
+    def set(self, source: str, entries: Dict[str, str]) -> None:
+        """替换某个来源的全部记录"""
+        with self._lock:
+            if entries:
+                self._sources[source] = dict(entries)
+            else:
+                self._sources.pop(source, None)
+
+    def update(self, source: str, entries: Dict[str, str]) -> None:
+        """合并某个来源的记录，保留其他文档ID"""
+        if not entries:
+            return
+        with self._lock:
+            self._sources.setdefault(source, {}).update(entries)
+
+    def sources(self) -> List[str]:
+        """获取所有来源"""
+        with self._lock:
+            return list(self._sources)
+
+    def clear(self) -> None:
+        """清空清单"""
+        with self._lock:
+            self._sources = {}
+        self.save()
+
+    def save(self) -> None:
+        """将清单写入文件（先写临时文件再替换，避免中断时损坏）"""
+        if not self.path:
+            return
+
+        with self._lock:
+            data = json.dumps({"version": self.VERSION, "sources": self._sources}, ensure_ascii=False)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._sources.values())
+
+    def __repr__(self) -> str:
+        return f"IngestManifest(path='{self.path}', sources={len(self._sources)})"
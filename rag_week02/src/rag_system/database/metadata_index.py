@@ -0,0 +1,209 @@
+"""
+元数据二级索引模块
+在本地维护元数据字段取值到文档ID的映射，按来源删除和过滤时无需扫描整个集合
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+from ..core.logger import logger
+
+
+class MetadataIndex:
+    """
+    元数据二级索引
+
+    索引在内存中保存 字段 -> 取值 -> 文档ID集合 的映射。
+    配置了路径时，每次变更以一行JSON追加到日志文件，加载时重放日志，
+    因此写入开销只与本次变更的文档数量有关。
+    """
+
+    # 日志行数超过存活文档数的倍数时，加载后自动压缩
+    COMPACT_RATIO = 2
+
+    def __init__(self, fields: Sequence[str] = ("source", "page", "method"), path: Optional[str] = None):
+        """
+        初始化元数据索引
+
+        Args:
+            fields: 需要索引的元数据字段
+            path: 索引日志文件路径，为空时只保存在内存中
+        """
+        self.fields = tuple(fields)
+        self.path = path
+        self._index: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.fields}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def add(self, ids: Sequence[str], metadatas: Sequence[Optional[Dict]]) -> None:
+        """
+        添加或更新文档的索引项
+
+        Args:
+            ids: 文档ID列表
+            metadatas: 文档元数据列表
+        """
+        entries = [
+            {field: metadata[field] for field in self.fields if metadata and field in metadata}
+            for metadata in metadatas
+        ]
+        with self._lock:
+            self._apply_add(ids, entries)
+        self._append({"op": "add", "ids": list(ids), "entries": entries})
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """删除文档的索引项"""
+        ids = list(ids)
+        with self._lock:
+            self._apply_remove(ids)
+        self._append({"op": "remove", "ids": ids})
+
+    def covers(self, filters: Dict[str, Any]) -> bool:
+        """判断过滤条件的所有字段是否都已建立索引"""
+        return bool(filters) and all(field in self._index for field in filters)
+
+    def lookup(self, **filters: Any) -> Optional[Set[str]]:
+        """
+        按字段取值查找文档ID（多个条件取交集）
+
+        Args:
+            **filters: 字段名到取值的等值条件
+
+        Returns:
+            匹配的文档ID集合；存在未索引的字段时返回None
+        """
+        if not self.covers(filters):
+            return None
+
+        with self._lock:
+            # 从匹配最少的条件开始求交集
+            candidates = sorted(
+                (self._index[field].get(value, set()) for field, value in filters.items()),
+                key=len
+            )
+            result = set(candidates[0])
+            for ids in candidates[1:]:
+                result &= ids
+                if not result:
+                    break
+            return result
+
+    def values(self, field: str) -> List[Any]:
+        """获取某个字段的所有取值"""
+        with self._lock:
+            return list(self._index.get(field, {}))
+
+    def clear(self) -> None:
+        """清空索引"""
+        with self._lock:
+            self._index = {field: {} for field in self.fields}
+            self._docs = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def rebuild(self, collection: Any, batch_size: int = 1000) -> int:
+        """
+        从Chroma集合分页读取元数据重建索引
+
+        Args:
+            collection: Chroma集合
+            batch_size: 每页读取的文档数量
+
+        Returns:
+            索引的文档数量
+        """
+        self.clear()
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if len(page["ids"]) == 0:
+                break
+            entries = [
+                {field: metadata[field] for field in self.fields if metadata and field in metadata}
+                for metadata in page["metadatas"]
+            ]
+            with self._lock:
+                self._apply_add(page["ids"], entries)
+            offset += len(page["ids"])
+            if len(page["ids"]) < batch_size:
+                break
+        self.compact()
+        logger.info(f"元数据索引重建完成，共 {len(self)} 个文档")
+        return len(self)
+
+    def compact(self) -> None:
+        """将日志重写为当前状态的单条记录"""
+        if not self.path:
+            return
+        with self._lock:
+            ids = list(self._docs)
+            entries = [self._docs[doc_id] for doc_id in ids]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"op": "add", "ids": ids, "entries": entries}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _apply_add(self, ids: Sequence[str], entries: Sequence[Dict[str, Any]]) -> None:
+        """在内存中添加索引项（调用方持有锁）"""
+        self._apply_remove(ids)
+        for doc_id, entry in zip(ids, entries):
+            self._docs[doc_id] = entry
+            for field, value in entry.items():
+                self._index[field].setdefault(value, set()).add(doc_id)
+
+    def _apply_remove(self, ids: Iterable[str]) -> None:
+        """在内存中删除索引项（调用方持有锁）"""
+        for doc_id in ids:
+            entry = self._docs.pop(doc_id, None)
+            if not entry:
+                continue
+            for field, value in entry.items():
+                bucket = self._index[field].get(value)
+                if bucket is not None:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self._index[field][value]
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """追加一条变更日志"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _load(self) -> None:
+        """重放日志文件"""
+        lines = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                lines += 1
+                if record["op"] == "add":
+                    # 只保留当前配置中的索引字段
+                    entries = [{k: v for k, v in entry.items() if k in self._index} for entry in record["entries"]]
+                    self._apply_add(record["ids"], entries)
+                elif record["op"] == "remove":
+                    self._apply_remove(record["ids"])
+
+        logger.info(f"加载元数据索引: {self.path}，共 {len(self._docs)} 个文档")
+        if lines > self.COMPACT_RATIO * max(1, len(self._docs)) and lines > 1:
+            self.compact()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __repr__(self) -> str:
+        return f"MetadataIndex(fields={list(self.fields)}, documents={len(self._docs)})"
@@ -4,9 +4,12 @@
 """
 
 from typing import List, Optional
-from openai import OpenAI
+from openai import OpenAI, APIStatusError, RateLimitError as OpenAIRateLimitError
 from ..core.logger import logger, log_function_call
 from ..core.config import config
+from ..core.scheduler import scheduler, CallResult, RateLimitError, estimate_tokens
+from ..core.endpoints import EndpointPool, Endpoint
+from ..core.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 
 class CustomEmbedding:
@@ -18,7 +21,7 @@ class CustomEmbedding:
         
         Args:
             api_key: API密钥
-            base_url: API基础URL
+            base_url: API基础URL，多个推理服务时用逗号分隔
             model_name: 模型名称
         """
         self.api_key = api_key or config.embedding.api_key
@@ -28,16 +31,24 @@ class CustomEmbedding:
         if not self.api_key:
             raise ValueError("API密钥不能为空")
         
-        # 延迟初始化客户端，避免测试时的问题
-        self._client = None
+        # 每个地址一个客户端，首次使用时创建（429由调度器处理，SDK不再自行重试）
+        self.endpoints = EndpointPool(
+            self.base_url,
+            factory=lambda url: OpenAI(api_key=self.api_key, base_url=url, max_retries=0),
+            health_check=self._health_check
+        )
+        # 所有端点都不可用时快速失败，由后台探测恢复
+        self.breaker = CircuitBreaker("嵌入模型", probe=self.endpoints.probe)
+        # 限流由共享的调度器按端点统一处理
+        for url in self.endpoints.urls:
+            scheduler.configure(self._rate_key(url), rpm=config.embedding.rpm, tpm=config.embedding.tpm)
+        
         logger.info(f"初始化嵌入模型: {self.model_name}")
     
     @property
     def client(self):
-        """延迟加载客户端"""
-        if self._client is None:
-            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-        return self._client
+        """第一个端点的客户端"""
+        return self.endpoints.endpoints[0].client
     
     @log_function_call
     def get_embeddings(self, texts: List[str]) -> List[List[float]]:
@@ -56,16 +67,44 @@ class CustomEmbedding:
         
         try:
             logger.debug(f"正在获取 {len(texts)} 个文本的嵌入向量")
-            response = self.client.embeddings.create(
-                input=texts,
-                model=self.model_name
-            )
-            embeddings = [item.embedding for item in response.data]
+            tokens = estimate_tokens(texts)
+            
+            def send(endpoint: Endpoint) -> List[List[float]]:
+                return scheduler.call(self._rate_key(endpoint.url), lambda: self._request(endpoint, texts), tokens=tokens)
+            
+            # 熔断器 -> 端点选择与故障切换 -> 限流调度 -> 请求
+            embeddings = self.breaker.call(lambda: self.endpoints.call(send, hedge=config.scheduler.hedge_requests))
             logger.debug(f"成功获取嵌入向量，维度: {len(embeddings[0]) if embeddings else 0}")
             return embeddings
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"获取嵌入向量失败: {str(e)}")
             raise RuntimeError(f"获取嵌入向量失败: {str(e)}") from e
     
+    def _rate_key(self, url: str) -> str:
+        """调度器中的端点标识"""
+        return f"{url}#{self.model_name}"
+    
+    def _health_check(self, endpoint: Endpoint) -> bool:
+        """探测端点是否可用，服务返回4xx也说明服务在线"""
+        try:
+            endpoint.client.models.list()
+        except APIStatusError as e:
+            return e.status_code < 500
+        return True
+    
+    def _request(self, endpoint: Endpoint, texts: List[str]) -> CallResult:
+        """向指定端点发送一次嵌入请求"""
+        try:
+            raw = endpoint.client.embeddings.with_raw_response.create(input=texts, model=self.model_name)
+        except OpenAIRateLimitError as e:
+            raise RateLimitError(str(e), headers=e.response.headers) from e
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        return CallResult(
+            [item.embedding for item in response.data], raw.headers, getattr(usage, "total_tokens", None)
+        )
+    
     def __repr__(self) -> str:
         return f"CustomEmbedding(model_name='{self.model_name}', base_url='{self.base_url}')"
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+文档处理模块
+提供文件加载、解析缓存、PDF解析、金融术语标准化和文本分块
+"""
+
+from .loader import DataLoader
+from .parse_cache import ParseCache, file_hash
+from .pdf_parser import PDFParser, PDFDocument, PDFPage
+from .standardizer import FinancialTermStandardizer, load_term_mapping
+from .chunker import TextChunker, count_tokens
+
+__all__ = ['DataLoader', 'ParseCache', 'file_hash', 'PDFParser', 'PDFDocument', 'PDFPage', 'FinancialTermStandardizer', 'load_term_mapping', 'TextChunker', 'count_tokens']
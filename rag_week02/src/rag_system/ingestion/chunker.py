@@ -0,0 +1,281 @@
+"""
+文本分块模块
+将长文本切分为适合嵌入的分块
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import IO, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from ..core.documents import Chunk
+from ..core.scheduler import estimate_tokens
+
+
+def count_tokens(text: str) -> int:
+    """按调度器的估算规则计算token数（中日韩字符每字1个，其余每4个字符1个）"""
+    return estimate_tokens([text]) if text else 0
+
+
+class TextChunker:
+    """
+    文本分块器
+
+    - fixed：按固定字符数切分，相邻分块重叠overlap个字符；
+    - recursive：依次按段落、换行、中英文句末标点、逗号、空格和单个字符递归切分，
+      再把片段合并为不超过chunk_size的分块，相邻分块重叠约overlap。
+
+    recursive的长度默认按字符计算，传入tokenizer后按token计算（如count_tokens或模型自带的分词器）。
+    两种方法的元数据都记录分块在原文中的start和end位置。
+    分块为Chunk对象，只保存原文的引用和位置，访问content时才切片，同时兼容chunk["content"]形式的访问。
+    实例可以直接作为RAGSystem.ingest_stream的chunker参数使用；超过内存大小的文本用chunk_stream按窗口读取。
+    """
+
+    METHODS = ("fixed", "recursive")
+    # 递归切分使用的分隔符，按优先级排列，空字符串表示按单个字符切分
+    SEPARATORS = ("\n\n", "\n", "。", "！", "？", "；", ". ", "! ", "? ", "; ", "，", ", ", " ", "")
+    # chunk_stream默认每次读取的字符数
+    WINDOW_SIZE = 1 << 20
+    # 片段长度缓存的容量
+    CACHE_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        overlap: int = 50,
+        method: str = "fixed",
+        tokenizer: Optional[Callable[[str], int]] = None
+    ):
+        """
+        初始化分块器
+
+        Args:
+            chunk_size: 分块大小（recursive传入tokenizer时为token数，否则为字符数）
+            overlap: 相邻分块的重叠大小，单位同chunk_size
+            method: 默认分块方法
+            tokenizer: 计算文本token数的函数，只用于recursive
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size必须大于0")
+        if not 0 <= overlap < chunk_size:
+            raise ValueError("overlap必须大于等于0且小于chunk_size")
+        if method not in self.METHODS:
+            raise ValueError(f"未知的分块方法: {method}")
+
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.method = method
+        self.tokenizer = tokenizer
+        # 同一片段（常见于单字符和重复的短句）只计算一次
+        self._length = lru_cache(maxsize=self.CACHE_SIZE)(tokenizer) if tokenizer else len
+
+    def chunk(self, text: str, method: Optional[str] = None) -> List[Chunk]:
+        """
+        切分文本
+
+        Args:
+            text: 输入文本
+            method: 分块方法，默认使用初始化时指定的方法
+
+        Returns:
+            分块列表，每个分块包含content和metadata字段（Chunk）
+        """
+        method = method or self.method
+        if method == "fixed":
+            return self._chunk_fixed(text)
+        if method == "recursive":
+            return self._chunk_recursive(text)
+        raise ValueError(f"未知的分块方法: {method}")
+
+    def chunk_stream(
+        self,
+        source: Union[IO[str], Iterable[str]],
+        method: Optional[str] = None,
+        window_size: Optional[int] = None
+    ) -> Iterator[Chunk]:
+        """
+        流式切分文本
+
+        从文件对象（按window_size读取）或字符串迭代器（如按行迭代的文件）读取文本，边读边输出分块，
+        内存中只保留当前窗口，start和end为在整个文本中的位置。fixed方法的结果与chunk完全一致；
+        recursive方法在窗口内最后一个换行处截断，窗口的最后一个分块留到下一个窗口重新切分，
+        因此窗口边界处的分块和重叠与chunk一致（窗口内选用的分隔符与全文相同时）。
+
+        Args:
+            source: 文件对象或字符串迭代器
+            method: 分块方法，默认使用初始化时指定的方法
+            window_size: 每次读取的字符数，不能小于chunk_size
+
+        Yields:
+            分块，格式与chunk相同
+        """
+        method = method or self.method
+        if method not in self.METHODS:
+            raise ValueError(f"未知的分块方法: {method}")
+        window_size = window_size or self.WINDOW_SIZE
+        if window_size < self.chunk_size:
+            raise ValueError("window_size不能小于chunk_size")
+
+        pieces = self._read_pieces(source, window_size)
+        if method == "fixed":
+            yield from self._stream_fixed(pieces)
+        else:
+            yield from self._stream_windows(pieces, method, window_size)
+
+    @staticmethod
+    def _read_pieces(source: Union[IO[str], Iterable[str]], window_size: int) -> Iterator[str]:
+        if not hasattr(source, "read"):
+            yield from source
+            return
+        while True:
+            piece = source.read(window_size)
+            if not piece:
+                return
+            yield piece
+
+    def _stream_fixed(self, pieces: Iterator[str]) -> Iterator[Chunk]:
+        """按固定长度流式切分，缓冲区只保留下一个分块起点之后的文本"""
+        step = self.chunk_size - self.overlap
+        buffer = ""
+        offset = 0  # buffer[0]在全文中的位置
+        start = 0
+        last_end = 0
+        for piece in pieces:
+            buffer += piece
+            while offset + len(buffer) - start >= self.chunk_size:
+                end = start + self.chunk_size
+                yield Chunk(buffer, start, end, "fixed", offset)
+                last_end = end
+                start += step
+            buffer = buffer[start - offset:]
+            offset = start
+
+        # 文本结束，输出不足chunk_size的尾部（已被上一个分块完整覆盖时不再输出）
+        total = offset + len(buffer)
+        while start < total and last_end < total:
+            end = min(start + self.chunk_size, total)
+            yield Chunk(buffer, start, end, "fixed", offset)
+            last_end = end
+            start += step
+
+    def _stream_windows(self, pieces: Iterator[str], method: str, window_size: int) -> Iterator[Chunk]:
+        """
+        攒够一个窗口的新文本后在最后一个换行处截断，按窗口分块
+
+        窗口的最后一个分块可能还要和后面的文本合并，不立即输出：从它的起点开始的文本（包含与前一个分块
+        重叠的部分）保留到下一个窗口开头重新切分，offset随之前移到保留文本的起点。
+        """
+        parts: List[str] = []
+        carried = 0  # parts[0]中从上一个窗口保留的字符数
+        length = 0
+        offset = 0  # parts中第一个字符在全文中的位置
+        for piece in pieces:
+            parts.append(piece)
+            length += len(piece)
+            if length - carried < window_size:
+                continue
+            buffer = ''.join(parts)
+            cut = buffer.rfind('\n') + 1 or len(buffer)
+            chunks = self.chunk(buffer[:cut], method)
+            keep = chunks[-1].start if chunks else cut
+            yield from self._shift(chunks[:-1], offset)
+            offset += keep
+            parts = [buffer[keep:]]
+            carried = length = len(parts[0])
+
+        if length:
+            yield from self._shift(self.chunk(''.join(parts), method), offset)
+
+    @staticmethod
+    def _shift(chunks: List[Chunk], offset: int) -> Iterator[Chunk]:
+        """把窗口内的位置换算为全文位置"""
+        for chunk in chunks:
+            chunk.start += offset
+            chunk.end += offset
+            chunk.base += offset
+            yield chunk
+
+    def __call__(self, text: str, metadata: Optional[Dict] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """按ingest_stream的分块函数约定返回(分块文本, 分块元数据)"""
+        for chunk in self.chunk(text):
+            yield chunk.content, chunk.metadata
+
+    def _chunk_fixed(self, text: str) -> List[Chunk]:
+        chunks = []
+        step = self.chunk_size - self.overlap
+        for start in range(0, len(text), step):
+            end = min(start + self.chunk_size, len(text))
+            chunks.append(Chunk(text, start, end, "fixed"))
+            if end == len(text):
+                break
+        return chunks
+
+    def _chunk_recursive(self, text: str) -> List[Chunk]:
+        pieces = self._split(text, 0, len(text), self.SEPARATORS) if text else []
+        return self._merge(text, pieces)
+
+    def _split(self, text: str, start: int, end: int, separators: Tuple[str, ...]) -> List[Tuple[int, int, int]]:
+        """
+        把text[start:end]切分为不超过chunk_size的片段
+
+        使用区间中出现的第一个分隔符切分，分隔符留在前一个片段末尾，片段首尾相接覆盖整个区间；
+        仍然过长的片段用后面的分隔符继续切分。每层只扫描一遍区间，总耗时与文本长度成正比。
+
+        Returns:
+            (起始位置, 结束位置, 长度)列表
+        """
+        index = 0
+        while separators[index] and text.find(separators[index], start, end) == -1:
+            index += 1
+        separator = separators[index]
+        rest = separators[index + 1:]
+
+        if separator:
+            spans = []
+            position = start
+            while position < end:
+                found = text.find(separator, position, end)
+                split_at = end if found == -1 else found + len(separator)
+                spans.append((position, split_at))
+                position = split_at
+        else:
+            spans = [(i, i + 1) for i in range(start, end)]
+
+        pieces = []
+        for piece_start, piece_end in spans:
+            length = self._length(text[piece_start:piece_end])
+            if length <= self.chunk_size or not rest:
+                pieces.append((piece_start, piece_end, length))
+            else:
+                pieces.extend(self._split(text, piece_start, piece_end, rest))
+        return pieces
+
+    def _merge(self, text: str, pieces: List[Tuple[int, int, int]]) -> List[Chunk]:
+        """按顺序合并片段，分块满后从头部丢弃片段直到剩余部分不超过overlap，作为下一个分块的开头"""
+        chunks: List[Chunk] = []
+        window: Deque[Tuple[int, int, int]] = deque()
+        total = 0
+        for piece in pieces:
+            length = piece[2]
+            if window and total + length > self.chunk_size:
+                self._emit(text, window[0][0], window[-1][1], chunks)
+                while window and (total > self.overlap or total + length > self.chunk_size):
+                    total -= window.popleft()[2]
+            window.append(piece)
+            total += length
+
+        if window:
+            self._emit(text, window[0][0], window[-1][1], chunks)
+        return chunks
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, chunks: List[Chunk]) -> None:
+        """去掉首尾空白后记录分块，只移动位置，不复制文本"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            chunks.append(Chunk(text, start, end, "recursive"))
+
+    def __repr__(self) -> str:
+        unit = "tokens" if self.tokenizer else "chars"
+        return f"TextChunker(chunk_size={self.chunk_size}, overlap={self.overlap}, method='{self.method}', unit='{unit}')"
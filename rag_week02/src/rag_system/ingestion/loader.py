@@ -0,0 +1,165 @@
+"""
+文件加载模块
+按文件类型读取文本、CSV和PDF文件，CSV按行组流式读取
+"""
+
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from ..core.config import config
+from ..core.documents import Document
+from .parse_cache import ParseCache, default_parse_cache, file_hash
+from .pdf_parser import PDFParser
+
+
+class DataLoader:
+    """
+    文件加载器
+
+    根据扩展名（或指定的file_type）选择读取方式，返回可直接标准化和分块的文本。
+    CSV依赖pandas，PDF依赖pdfplumber，都在首次读取对应类型时导入。
+
+    CSV用pandas按csv_rows行一组分块读取，每组渲染为一个文档：每行一段，每个非空单元格一行"列名: 取值"，
+    元数据中的row_start和row_end为该组的数据行范围（从0开始，不含表头，不含row_end）。
+    iter_documents逐组产出Document，内存中只保留当前组；load把所有组拼接为一个文本。
+
+    使用解析缓存时，CSV按行组、PDF按页缓存解析结果；文本文件直接读取，不经过缓存。
+    """
+
+    SUPPORTED_TYPES = ("txt", "md", "csv", "pdf")
+    # 按行组流式读取的文件类型
+    STREAMED_TYPES = ("csv",)
+    # CSV转换逻辑的版本，修改输出格式时递增，使解析缓存中的旧记录失效
+    CSV_VERSION = 2
+    # 流式读取CSV时每攒够多少组写一次解析缓存
+    CACHE_FLUSH_GROUPS = 16
+
+    def __init__(
+        self,
+        pdf_parser: Optional[PDFParser] = None,
+        cache: Optional[ParseCache] = None,
+        csv_rows: Optional[int] = None
+    ):
+        """
+        初始化文件加载器
+
+        Args:
+            pdf_parser: PDF解析器，默认按配置创建并使用同一个解析缓存
+            cache: 解析缓存，默认按INGEST_PARSE_CACHE_PATH打开，未配置时不缓存
+            csv_rows: CSV每个文档包含的行数，默认使用配置值
+        """
+        self.csv_rows = csv_rows or config.ingest.csv_rows
+        if self.csv_rows <= 0:
+            raise ValueError("csv_rows必须大于0")
+        self.cache = cache if cache is not None else default_parse_cache()
+        self.pdf_parser = pdf_parser or PDFParser(cache=self.cache)
+
+    def file_type(self, file_path: str, file_type: Optional[str] = None) -> str:
+        """返回文件类型，默认取扩展名（小写）"""
+        return (file_type or os.path.splitext(file_path)[1].lstrip('.')).lower()
+
+    def is_streamed(self, file_path: str, file_type: Optional[str] = None) -> bool:
+        """判断文件是否按多个文档流式读取"""
+        return self.file_type(file_path, file_type) in self.STREAMED_TYPES
+
+    def load(self, file_path: str, file_type: Optional[str] = None) -> str:
+        """
+        读取文件内容
+
+        Args:
+            file_path: 文件路径
+            file_type: 文件类型，默认取扩展名
+
+        Returns:
+            文件文本
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        file_type = self.file_type(file_path, file_type)
+        if file_type in ("txt", "md"):
+            return self._load_txt(file_path)
+        if file_type == "csv":
+            return "\n\n".join(document.text for document in self._iter_csv(file_path))
+        if file_type == "pdf":
+            return self._load_pdf(file_path)
+        raise ValueError(f"不支持的文件类型: {file_type}")
+
+    def iter_documents(self, file_path: str, file_type: Optional[str] = None) -> Iterator[Document]:
+        """
+        按文档逐个读取文件
+
+        CSV每个行组产出一个文档，其他类型整个文件为一个文档。
+
+        Args:
+            file_path: 文件路径
+            file_type: 文件类型，默认取扩展名
+
+        Yields:
+            文档（可以按(文本, 元数据)解包），元数据不含来源，由调用方补充
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        if self.file_type(file_path, file_type) == "csv":
+            yield from self._iter_csv(file_path)
+        else:
+            yield Document(self.load(file_path, file_type))
+
+    def _load_txt(self, path: str) -> str:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _iter_csv(self, path: str) -> Iterator[Document]:
+        """
+        按行组读取CSV
+
+        解析缓存中第1到n页为各行组，0号记录保存组数，在所有行组写入之后写入，
+        因此只要0号记录存在，缓存中的行组就是完整的。
+        """
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise RuntimeError("读取CSV文件需要安装pandas: pip install rag-system[ingest]") from e
+
+        version = f"csv-{self.CSV_VERSION}/pandas-{pd.__version__}"
+        profile = f"rows={self.csv_rows}"
+        key = file_hash(path) if self.cache is not None else None
+        if key is not None:
+            count = self.cache.get(key, 0, version, profile)
+            if count is not None:
+                for group in range(1, count["groups"] + 1):
+                    record = self.cache.get(key, group, version, profile)
+                    yield Document(record["text"], record["metadata"])
+                return
+
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        group = 0
+        row_start = 0
+        # 全部按字符串读取，保留原文写法（如前导零），空单元格为空字符串
+        for frame in pd.read_csv(path, chunksize=self.csv_rows, dtype=str, keep_default_na=False):
+            columns = [str(column).strip() for column in frame.columns]
+            text = self._render_rows(columns, frame.itertuples(index=False, name=None))
+            metadata = {"row_start": row_start, "row_end": row_start + len(frame)}
+            row_start += len(frame)
+            group += 1
+            if key is not None:
+                pending.append((group, {"text": text, "metadata": metadata}))
+                if len(pending) >= self.CACHE_FLUSH_GROUPS:
+                    self.cache.put_pages(key, version, pending, profile)
+                    pending = []
+            yield Document(text, metadata)
+
+        if key is not None:
+            pending.append((0, {"groups": group}))
+            self.cache.put_pages(key, version, pending, profile)
+
+    @staticmethod
+    def _render_rows(columns: List[str], rows) -> str:
+        """每行渲染为"列名: 取值"的多行文本，行之间空一行，省略空单元格"""
+        return "\n\n".join(
+            "\n".join(f"{column}: {value}" for column, value in zip(columns, row) if value != "")
+            for row in rows
+        )
+
+    def _load_pdf(self, path: str) -> str:
+        return self.pdf_parser.parse(path).text
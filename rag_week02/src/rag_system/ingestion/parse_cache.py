@@ -0,0 +1,151 @@
+"""
+解析缓存模块
+按(文件内容哈希, 页码, 提取器版本, 提取范围)在本地SQLite中缓存解析结果，重复摄取时跳过未变化的文件和页面
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+from ..core.logger import logger
+from ..core.config import config
+
+
+def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """按块读取文件，计算内容的SHA-256哈希"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    解析结果缓存
+
+    每条记录为一页（或一个不分页的文件，页码为0）的解析结果，序列化为JSON后用zlib压缩保存。
+    键中包含提取器版本和提取范围，升级解析逻辑或改变提取范围后旧记录自然失效。
+    一个连接在线程间共享，读写都在锁内进行，可以在摄取流水线的多个加载线程中使用。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化解析缓存
+
+        Args:
+            path: SQLite数据库文件路径，所在目录不存在时自动创建
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parses ("
+            "file_hash TEXT NOT NULL, page INTEGER NOT NULL, version TEXT NOT NULL, profile TEXT NOT NULL, "
+            "data BLOB NOT NULL, PRIMARY KEY (file_hash, version, profile, page))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def get(self, file_hash: str, page: int, version: str, profile: str = '') -> Optional[Any]:
+        """
+        读取一条缓存
+
+        Args:
+            file_hash: 文件内容哈希
+            page: 页码，不分页的文件为0
+            version: 提取器版本
+            profile: 提取范围
+
+        Returns:
+            缓存的解析结果，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM parses WHERE file_hash = ? AND version = ? AND profile = ? AND page = ?",
+                (file_hash, version, profile, page)
+            ).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def get_pages(self, file_hash: str, version: str, profile: str = '') -> Dict[int, Any]:
+        """读取一个文件的所有缓存页，返回页码到解析结果的映射"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, data FROM parses WHERE file_hash = ? AND version = ? AND profile = ?",
+                (file_hash, version, profile)
+            ).fetchall()
+        return {page: self._decode(data) for page, data in rows}
+
+    def put(self, file_hash: str, page: int, version: str, value: Any, profile: str = '') -> None:
+        """写入一条缓存"""
+        self.put_pages(file_hash, version, [(page, value)], profile)
+
+    def put_pages(self, file_hash: str, version: str, pages: Iterable[Tuple[int, Any]], profile: str = '') -> None:
+        """
+        在一个事务中写入多页
+
+        Args:
+            file_hash: 文件内容哈希
+            version: 提取器版本
+            pages: (页码, 解析结果)迭代器
+            profile: 提取范围
+        """
+        rows = [(file_hash, page, version, profile, self._encode(value)) for page, value in pages]
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO parses VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            # 缓存写入失败不影响解析结果
+            logger.warning(f"写入解析缓存失败: {str(e)}")
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM parses")
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM parses").fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f"ParseCache(path='{self.path}')"
+
+
+_default_caches: Dict[str, ParseCache] = {}
+_default_lock = threading.Lock()
+
+
+def default_parse_cache() -> Optional[ParseCache]:
+    """
+    获取按INGEST_PARSE_CACHE_PATH配置的解析缓存
+
+    同一路径在进程内只打开一次，由默认创建的加载器和PDF解析器共享；未配置路径时返回None。
+    """
+    path = config.ingest.parse_cache_path
+    if not path:
+        return None
+    with _default_lock:
+        if path not in _default_caches:
+            _default_caches[path] = ParseCache(path)
+        return _default_caches[path]
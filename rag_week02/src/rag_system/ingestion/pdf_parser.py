@@ -0,0 +1,330 @@
+"""
+PDF解析模块
+使用pdfplumber逐页提取文本、表格和图片元数据，大文件可按页段在多个进程中并行解析，
+配置了解析缓存时，内容未变化的页面直接从缓存读取
+"""
+
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..core.logger import logger
+from ..core.config import config
+from .parse_cache import ParseCache, default_parse_cache, file_hash
+
+
+@dataclass
+class PDFPage:
+    """PDF单页的解析结果"""
+    page_number: int
+    text: str
+    tables: List[List[List[Optional[str]]]] = field(default_factory=list)
+    images: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+@dataclass
+class PDFDocument:
+    """PDF文件的解析结果"""
+    file_path: str
+    pages: List[PDFPage]
+
+    @property
+    def text(self) -> str:
+        """按页拼接的全文"""
+        return "\n".join(page.text for page in self.pages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"file_path": self.file_path, "pages": [page.to_dict() for page in self.pages]}
+
+    def to_json(self) -> str:
+        """转换为JSON字符串"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+# 提取范围：只提取文本、文本和表格、文本表格和图片
+TEXT = "text"
+TABLES = "tables"
+FULL = "full"
+PROFILES = (TEXT, TABLES, FULL)
+
+# 提取逻辑的版本，修改提取结果的格式或内容时递增，使解析缓存中的旧记录失效
+PARSER_VERSION = 1
+
+# 各提取步骤的耗时统计项
+_STAT_KEYS = (
+    "pages", "cached_pages", "table_pages", "skipped_table_pages", "text_seconds", "table_seconds", "image_seconds"
+)
+
+
+def _new_stats() -> Dict[str, float]:
+    return {key: 0 for key in _STAT_KEYS}
+
+
+def _pdfplumber():
+    try:
+        import pdfplumber
+    except ImportError as e:
+        raise RuntimeError("解析PDF需要安装pdfplumber: pip install rag-system[ingest]") from e
+    return pdfplumber
+
+
+def _open_pdf(file_path: str):
+    return _pdfplumber().open(file_path)
+
+
+def extractor_version() -> str:
+    """解析缓存使用的提取器版本，包含pdfplumber的版本"""
+    return f"pdf-{PARSER_VERSION}/pdfplumber-{_pdfplumber().__version__}"
+
+
+def _image_metadata(image: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留图片的位置和尺寸等标量字段，去掉无法序列化的数据流对象"""
+    return {key: value for key, value in image.items() if isinstance(value, (int, float, str))}
+
+
+def _has_rulings(page) -> bool:
+    """
+    判断页面上是否有直线或矩形
+
+    pdfplumber默认按页面上的直线和矩形边框识别表格，没有这些图形的页面不可能识别出表格，
+    页面对象在提取文本时已经解析，这个判断几乎没有额外开销。
+    """
+    objects = page.objects
+    return bool(objects.get("line") or objects.get("rect"))
+
+
+def _extract_pages(pdf, page_numbers: Iterable[int], profile: str, stats: Dict[str, float]) -> Iterator[PDFPage]:
+    """解析已打开PDF中的指定页（从1开始编号），每页解析后释放pdfplumber的页面缓存"""
+    for page_number in page_numbers:
+        page = pdf.pages[page_number - 1]
+        try:
+            start_time = time.perf_counter()
+            result = PDFPage(page_number=page_number, text=page.extract_text() or "")
+            stats["text_seconds"] += time.perf_counter() - start_time
+
+            if profile != TEXT:
+                if _has_rulings(page):
+                    start_time = time.perf_counter()
+                    result.tables = page.extract_tables()
+                    stats["table_seconds"] += time.perf_counter() - start_time
+                    stats["table_pages"] += 1
+                else:
+                    stats["skipped_table_pages"] += 1
+
+            if profile == FULL:
+                start_time = time.perf_counter()
+                result.images = [_image_metadata(image) for image in page.images]
+                stats["image_seconds"] += time.perf_counter() - start_time
+
+            stats["pages"] += 1
+            yield result
+        finally:
+            page.close()
+
+
+def _parse_range(file_path: str, page_numbers: List[int], profile: str) -> Tuple[List[PDFPage], Dict[str, float]]:
+    """工作进程入口：解析指定页，同时返回耗时统计"""
+    stats = _new_stats()
+    with _open_pdf(file_path) as pdf:
+        return list(_extract_pages(pdf, page_numbers, profile, stats)), stats
+
+
+class PDFParser:
+    """
+    PDF解析器（依赖pdfplumber，首次解析时导入）
+
+    iter_pages逐页产出结果，内存中只保留当前页；parse返回整个文件的结构化结果，
+    页数超过pages_per_task且workers大于1时，按页段分发到进程池并行解析。
+    进程池首次使用时创建并在多次解析之间复用，使用spawn方式启动，可以安全地在摄取流水线的线程中调用。
+
+    提取范围（profile）：
+    - text：只提取文本；
+    - tables：提取文本和表格，表格只在页面上有直线或矩形时提取；
+    - full：在tables基础上提取图片位置和尺寸。
+
+    使用解析缓存时，按(文件内容哈希, 页码, 提取器版本, 提取范围)查找已解析的页面，
+    只解析缺失的页面，文件未变化时完全不打开PDF。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        pages_per_task: Optional[int] = None,
+        profile: Optional[str] = None,
+        cache: Optional[ParseCache] = None
+    ):
+        """
+        初始化PDF解析器
+
+        Args:
+            workers: 并行解析的进程数，默认使用配置值，1表示在当前进程中解析
+            pages_per_task: 每个任务解析的页数，默认使用配置值
+            profile: 提取范围（text、tables或full），默认使用配置值
+            cache: 解析缓存，默认按INGEST_PARSE_CACHE_PATH打开，未配置时不缓存
+        """
+        self.workers = workers or config.ingest.pdf_workers
+        self.pages_per_task = pages_per_task or config.ingest.pdf_pages_per_task
+        self.profile = profile or config.ingest.pdf_profile
+        self.cache = cache if cache is not None else default_parse_cache()
+        if self.workers <= 0 or self.pages_per_task <= 0:
+            raise ValueError("workers和pages_per_task必须大于0")
+        if self.profile not in PROFILES:
+            raise ValueError(f"未知的PDF提取范围: {self.profile}")
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = _new_stats()
+
+    def iter_pages(self, file_path: str, page_numbers: Optional[Iterable[int]] = None) -> Iterator[PDFPage]:
+        """
+        逐页解析PDF
+
+        Args:
+            file_path: PDF文件路径
+            page_numbers: 要解析的页码（从1开始），默认全部页
+
+        Yields:
+            每页的解析结果
+        """
+        stats = _new_stats()
+        try:
+            key, page_count, cached = self._cached_pages(file_path)
+            if page_numbers is None and page_count is not None and self._complete(cached, page_count):
+                stats["cached_pages"] += page_count
+                yield from (cached[number] for number in range(1, page_count + 1))
+                return
+
+            with _open_pdf(file_path) as pdf:
+                page_count = len(pdf.pages)
+                self._store(key, page_count, [])
+                if page_numbers is None:
+                    page_numbers = range(1, page_count + 1)
+                for page_number in page_numbers:
+                    if page_number in cached:
+                        stats["cached_pages"] += 1
+                        yield cached[page_number]
+                        continue
+                    for page in _extract_pages(pdf, [page_number], self.profile, stats):
+                        self._store(key, None, [page])
+                        yield page
+        finally:
+            self._record(stats)
+
+    def parse(self, file_path: str) -> PDFDocument:
+        """
+        解析整个PDF文件
+
+        Args:
+            file_path: PDF文件路径
+
+        Returns:
+            包含每页文本、表格和图片元数据的解析结果
+        """
+        stats = _new_stats()
+        try:
+            key, page_count, cached = self._cached_pages(file_path)
+            if page_count is not None and self._complete(cached, page_count):
+                stats["cached_pages"] += page_count
+                return PDFDocument(file_path, [cached[number] for number in range(1, page_count + 1)])
+
+            parsed = None
+            with _open_pdf(file_path) as pdf:
+                page_count = len(pdf.pages)
+                missing = [number for number in range(1, page_count + 1) if number not in cached]
+                if self.workers == 1 or len(missing) <= self.pages_per_task:
+                    parsed = list(_extract_pages(pdf, missing, self.profile, stats))
+
+            if parsed is None:
+                groups = [missing[i:i + self.pages_per_task] for i in range(0, len(missing), self.pages_per_task)]
+                logger.debug(f"并行解析PDF {file_path}: {len(missing)} 页，{len(groups)} 个任务")
+                executor = self._get_executor()
+                parsed = []
+                count = len(groups)
+                for chunk, chunk_stats in executor.map(_parse_range, [file_path] * count, groups, [self.profile] * count):
+                    parsed.extend(chunk)
+                    for name, value in chunk_stats.items():
+                        stats[name] += value
+
+            self._store(key, page_count, parsed)
+            stats["cached_pages"] += page_count - len(missing)
+            for page in parsed:
+                cached[page.page_number] = page
+            return PDFDocument(file_path, [cached[number] for number in range(1, page_count + 1)])
+        finally:
+            self._record(stats)
+            logger.debug(
+                f"解析PDF {file_path}: {stats['pages']} 页（缓存 {stats['cached_pages']} 页），文本 {stats['text_seconds']:.2f}s，"
+                f"表格 {stats['table_seconds']:.2f}s/{stats['table_pages']}页"
+                f"（跳过 {stats['skipped_table_pages']} 页），图片 {stats['image_seconds']:.2f}s"
+            )
+
+    def _cached_pages(self, file_path: str) -> Tuple[Optional[str], Optional[int], Dict[int, PDFPage]]:
+        """
+        读取文件的缓存页
+
+        Returns:
+            (文件内容哈希, 缓存的总页数, 页码到缓存页的映射)，未使用缓存时哈希为None
+        """
+        if self.cache is None:
+            return None, None, {}
+        key = file_hash(file_path)
+        records = self.cache.get_pages(key, extractor_version(), self.profile)
+        # 0号记录保存文件的总页数
+        page_count = records.pop(0, {}).get("page_count")
+        return key, page_count, {number: PDFPage(**record) for number, record in records.items()}
+
+    @staticmethod
+    def _complete(cached: Dict[int, PDFPage], page_count: int) -> bool:
+        return all(number in cached for number in range(1, page_count + 1))
+
+    def _store(self, key: Optional[str], page_count: Optional[int], pages: List[PDFPage]) -> None:
+        """把解析的页面（以及总页数）写入缓存"""
+        if key is None:
+            return
+        records = [(page.page_number, page.to_dict()) for page in pages]
+        if page_count is not None:
+            records.append((0, {"page_count": page_count}))
+        self.cache.put_pages(key, extractor_version(), records, self.profile)
+
+    def _record(self, stats: Dict[str, float]) -> None:
+        with self._lock:
+            for key, value in stats.items():
+                self._stats[key] += value
+
+    def stats(self) -> Dict[str, float]:
+        """
+        获取累计的解析统计
+
+        Returns:
+            包含pages（解析页数）、cached_pages（从缓存读取的页数）、table_pages（提取了表格的页数）、skipped_table_pages（没有直线或矩形、
+            跳过表格提取的页数）以及text_seconds、table_seconds、image_seconds（各提取步骤耗时，
+            并行解析时为各进程耗时之和）的字典
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __repr__(self) -> str:
+        return f"PDFParser(workers={self.workers}, pages_per_task={self.pages_per_task}, profile='{self.profile}')"
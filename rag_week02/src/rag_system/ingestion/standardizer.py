@@ -0,0 +1,198 @@
+"""
+金融术语标准化模块
+使用Aho-Corasick自动机单遍扫描文本，把术语别名替换为标准写法
+"""
+
+import csv
+from typing import Dict, List, Optional, Tuple
+
+
+def load_term_mapping(csv_path: str, column: str = 'A') -> Dict[str, str]:
+    """
+    从术语表CSV加载别名映射
+
+    每个标准术语以小写形式作为别名映射到自身，例如"a round financing" -> "A Round Financing"。
+
+    Args:
+        csv_path: 术语表路径（如万条金融标准术语.csv）
+        column: 术语所在列，不存在时使用第一列
+
+    Returns:
+        别名到标准术语的映射
+    """
+    mapping: Dict[str, str] = {}
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return mapping
+        index = header.index(column) if column in header else 0
+        for row in reader:
+            term = row[index].strip() if index < len(row) else ""
+            if term:
+                mapping[term.lower()] = term
+    return mapping
+
+
+class FinancialTermStandardizer:
+    """
+    金融术语标准化器
+
+    所有别名编译进同一棵不区分大小写的字典树，无论术语有多少，文本只扫描一遍。
+    重叠的匹配按最左最长规则取舍，别名只在不处于单词内部时替换（如Deposit中的POS不替换）。
+    """
+
+    def __init__(self, term_mapping: Optional[Dict[str, str]] = None):
+        """
+        初始化标准化器
+
+        Args:
+            term_mapping: 别名到标准术语的映射
+        """
+        self.term_mapping: Dict[str, str] = {}
+        # 字典树按节点编号存放在并列的列表中，0号节点为根
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        self._output: List[Optional[str]] = [None]  # 在该节点结束的别名对应的标准术语
+        self._dict_link: List[int] = [0]  # 最近的带输出的真后缀节点
+        self._dirty = False
+        for alias, canonical in (term_mapping or {}).items():
+            self.add_term(alias, canonical)
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        """逐字符转小写，保证与原文的位置一一对应（如'İ'.lower()有两个字符）"""
+        return ''.join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+    @staticmethod
+    def _is_word_char(ch: str) -> bool:
+        return ch.isalnum() or ch == '_'
+
+    def add_term(self, alias: str, canonical: str) -> None:
+        """
+        添加或覆盖一个别名
+
+        只把别名插入字典树，失败链接在下一次扫描前统一重建。
+
+        Args:
+            alias: 别名
+            canonical: 标准术语
+        """
+        self.term_mapping[alias] = canonical
+        # 单个字符（如a、i）误匹配太多，不参与替换
+        if len(alias) < 2:
+            return
+
+        node = 0
+        for ch in self._fold(alias):
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._depth.append(self._depth[node] + 1)
+                self._output.append(None)
+                self._dict_link.append(0)
+                self._goto[node][ch] = child
+                self._dirty = True
+            node = child
+
+        if self._output[node] is None:
+            # 新增输出会改变更深节点的字典链接
+            self._dirty = True
+        self._output[node] = canonical
+
+    def compile(self) -> None:
+        """立即构建自动机链接，而不是等到下一次扫描（如在启动工作进程之前）"""
+        if self._dirty:
+            self._build()
+
+    def _build(self) -> None:
+        """按广度优先重建失败链接和字典链接"""
+        queue = list(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+            self._dict_link[child] = 0
+
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                state = self._fail[node]
+                while state and ch not in self._goto[state]:
+                    state = self._fail[state]
+                fail = self._goto[state].get(ch, 0)
+                self._fail[child] = fail
+                self._dict_link[child] = fail if self._output[fail] is not None else self._dict_link[fail]
+                queue.append(child)
+
+        self._dirty = False
+
+    def _boundary_ok(self, text: str, start: int, end: int) -> bool:
+        """别名首尾是单词字符时，要求相邻字符不是单词字符"""
+        if start > 0 and self._is_word_char(text[start]) and self._is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and self._is_word_char(text[end - 1]) and self._is_word_char(text[end]):
+            return False
+        return True
+
+    def find_matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        查找文本中的术语
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            互不重叠的(起始位置, 结束位置, 标准术语)列表，按最左最长规则选取
+        """
+        self.compile()
+
+        goto, fail, depth = self._goto, self._fail, self._depth
+        output, dict_link = self._output, self._dict_link
+
+        longest: Dict[int, Tuple[int, int]] = {}  # 起始位置 -> 最长有效匹配的(结束位置, 节点)
+        node = 0
+        for i, ch in enumerate(self._fold(text)):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            match = node if output[node] is not None else dict_link[node]
+            while match:
+                end = i + 1
+                start = end - depth[match]
+                if end > longest.get(start, (start,))[0] and self._boundary_ok(text, start, end):
+                    longest[start] = (end, match)
+                match = dict_link[match]
+
+        matches = []
+        position = 0
+        for start in sorted(longest):
+            if start < position:
+                continue
+            end, match = longest[start]
+            matches.append((start, end, output[match]))
+            position = end
+        return matches
+
+    def standardize(self, text: str) -> str:
+        """
+        把文本中的术语别名替换为标准术语
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            标准化后的文本
+        """
+        pieces = []
+        position = 0
+        for start, end, canonical in self.find_matches(text):
+            pieces.append(text[position:start])
+            pieces.append(canonical)
+            position = end
+        pieces.append(text[position:])
+        return ''.join(pieces)
+
+    def __repr__(self) -> str:
+        return f"FinancialTermStandardizer(terms={len(self.term_mapping)})"
@@ -4,14 +4,20 @@
 """
 
 from typing import Optional
-from openai import OpenAI
+from openai import OpenAI, APIStatusError, RateLimitError as OpenAIRateLimitError
 from ..core.logger import logger, log_function_call
 from ..core.config import config
+from ..core.scheduler import scheduler, CallResult, RateLimitError, estimate_tokens
+from ..core.endpoints import EndpointPool, Endpoint
+from ..core.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 
 class CustomLLM:
     """自定义大语言模型类"""
     
+    # 未指定max_tokens时为生成内容预留的token数
+    DEFAULT_COMPLETION_TOKENS = 512
+    
     def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model_name: Optional[str] = None):
         """
         初始化大语言模型客户端
@@ -28,16 +34,24 @@ class CustomLLM:
         if not self.api_key:
             raise ValueError("API密钥不能为空")
         
-        # 延迟初始化客户端，避免测试时的问题
-        self._client = None
+        # 每个地址一个客户端，首次使用时创建（429由调度器处理，SDK不再自行重试）
+        self.endpoints = EndpointPool(
+            self.base_url,
+            factory=lambda url: OpenAI(api_key=self.api_key, base_url=url, max_retries=0),
+            health_check=self._health_check
+        )
+        # 所有端点都不可用时快速失败，由后台探测恢复
+        self.breaker = CircuitBreaker("大语言模型", probe=self.endpoints.probe)
+        # 限流由共享的调度器按端点统一处理
+        for url in self.endpoints.urls:
+            scheduler.configure(self._rate_key(url), rpm=config.llm.rpm, tpm=config.llm.tpm)
+        
         logger.info(f"初始化大语言模型: {self.model_name}")
     
     @property
     def client(self):
-        """延迟加载客户端"""
-        if self._client is None:
-            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-        return self._client
+        """第一个端点的客户端"""
+        return self.endpoints.endpoints[0].client
     
     @log_function_call
     def generate(self, prompt: str, max_tokens: Optional[int] = None, temperature: float = 0.7) -> str:
@@ -71,12 +85,23 @@ class CustomLLM:
             if max_tokens:
                 request_params["max_tokens"] = max_tokens
             
-            response = self.client.chat.completions.create(**request_params)
+            # 预留提示词和生成长度的token预算，调用后按实际用量结算
+            tokens = estimate_tokens([prompt]) + (max_tokens or self.DEFAULT_COMPLETION_TOKENS)
+            # 只有温度为0的生成结果是确定的，重复发送不改变结果，可以对冲
+            hedge = config.scheduler.hedge_requests and temperature == 0
             
-            result = response.choices[0].message.content
+            def send(endpoint: Endpoint) -> str:
+                return scheduler.call(
+                    self._rate_key(endpoint.url), lambda: self._request(endpoint, request_params), tokens=tokens
+                )
+            
+            # 熔断器 -> 端点选择与故障切换 -> 限流调度 -> 请求
+            result = self.breaker.call(lambda: self.endpoints.call(send, hedge=hedge))
             logger.debug(f"文本生成成功，长度: {len(result)} 字符")
             return result
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"文本生成失败: {str(e)}")
             raise RuntimeError(f"文本生成失败: {str(e)}") from e
@@ -111,5 +136,27 @@ class CustomLLM:
         
         return self.generate(prompt, max_tokens, temperature)
     
+    def _rate_key(self, url: str) -> str:
+        """调度器中的端点标识"""
+        return f"{url}#{self.model_name}"
+    
+    def _health_check(self, endpoint: Endpoint) -> bool:
+        """探测端点是否可用，服务返回4xx也说明服务在线"""
+        try:
+            endpoint.client.models.list()
+        except APIStatusError as e:
+            return e.status_code < 500
+        return True
+    
+    def _request(self, endpoint: Endpoint, request_params: dict) -> CallResult:
+        """向指定端点发送一次对话补全请求"""
+        try:
+            raw = endpoint.client.chat.completions.with_raw_response.create(**request_params)
+        except OpenAIRateLimitError as e:
+            raise RateLimitError(str(e), headers=e.response.headers) from e
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        return CallResult(response.choices[0].message.content, raw.headers, getattr(usage, "total_tokens", None))
+    
     def __repr__(self) -> str:
         return f"CustomLLM(model_name='{self.model_name}', base_url='{self.base_url}')"
\ No newline at end of file
@@ -7,6 +7,9 @@ from typing import List, Dict, Optional
 import requests
 from ..core.logger import logger, log_function_call
 from ..core.config import config
+from ..core.scheduler import scheduler, CallResult, RateLimitError, estimate_tokens
+from ..core.endpoints import EndpointPool, Endpoint, EndpointError
+from ..core.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 
 class CustomReranker:
@@ -18,7 +21,7 @@ class CustomReranker:
         
         Args:
             api_key: API密钥
-            base_url: API基础URL
+            base_url: API基础URL，多个推理服务时用逗号分隔
             model_name: 模型名称
         """
         self.api_key = api_key or config.reranker.api_key
@@ -28,6 +31,14 @@ class CustomReranker:
         if not self.api_key:
             raise ValueError("API密钥不能为空")
         
+        self.timeout = config.reranker.timeout
+        self.endpoints = EndpointPool(self.base_url, health_check=self._health_check)
+        # 所有端点都不可用时快速失败，查询退回原始检索顺序，由后台探测恢复
+        self.breaker = CircuitBreaker("重排序模型", probe=self.endpoints.probe)
+        # 限流由共享的调度器按端点统一处理
+        for url in self.endpoints.urls:
+            scheduler.configure(self._rate_key(url), rpm=config.reranker.rpm, tpm=config.reranker.tpm)
+        
         logger.info(f"初始化重排序模型: {self.model_name}")
     
     @log_function_call
@@ -68,12 +79,16 @@ class CustomReranker:
             }
             
             logger.debug(f"发送重排序请求，文档数量: {len(documents)}, top_n: {top_n}")
-            response = requests.post(
-                f"{self.base_url}/rerank",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            # 每个文档都与查询拼接后计算，token预算按查询长度乘以文档数估计
+            tokens = estimate_tokens(documents) + estimate_tokens([query]) * len(documents)
+            
+            def send(endpoint: Endpoint):
+                return scheduler.call(
+                    self._rate_key(endpoint.url), lambda: self._request(endpoint, headers, payload), tokens=tokens
+                )
+            
+            # 熔断器 -> 端点选择与故障切换 -> 限流调度 -> 请求
+            response = self.breaker.call(lambda: self.endpoints.call(send, hedge=config.scheduler.hedge_requests))
             
             if response.status_code == 200:
                 results = response.json()["results"]
@@ -93,6 +108,8 @@ class CustomReranker:
                 logger.error(f"重排序API请求失败，状态码: {response.status_code}")
                 raise RuntimeError(f"重排序API请求失败，状态码: {response.status_code}")
                 
+        except CircuitOpenError:
+            raise
         except requests.exceptions.Timeout:
             logger.error("重排序请求超时")
             raise RuntimeError("重排序请求超时")
@@ -103,5 +120,33 @@ class CustomReranker:
             logger.error(f"重排序过程中发生错误: {str(e)}")
             raise RuntimeError(f"重排序过程中发生错误: {str(e)}") from e
     
+    def _rate_key(self, url: str) -> str:
+        """调度器中的端点标识"""
+        return f"{url}#{self.model_name}"
+    
+    def _request(self, endpoint: Endpoint, headers: Dict, payload: Dict) -> CallResult:
+        """向指定端点发送一次重排序请求"""
+        response = requests.post(
+            f"{endpoint.url}/rerank",
+            headers=headers,
+            json=payload,
+            timeout=self.timeout
+        )
+        if response.status_code == 429:
+            raise RateLimitError("重排序API请求被限流", headers=response.headers)
+        if response.status_code >= 500:
+            # 服务端错误由端点池换一个端点重试
+            raise EndpointError(f"重排序API请求失败，状态码: {response.status_code}", response.status_code)
+        return CallResult(response, response.headers)
+    
+    def _health_check(self, endpoint: Endpoint) -> bool:
+        """探测端点是否恢复"""
+        response = requests.get(
+            f"{endpoint.url}/models",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=5
+        )
+        return response.status_code < 500
+    
     def __repr__(self) -> str:
         return f"CustomReranker(model_name='{self.model_name}', base_url='{self.base_url}')"
\ No newline at end of file
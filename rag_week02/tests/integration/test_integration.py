@@ -14,6 +14,7 @@ class TestIntegration:
     def test_full_rag_workflow(self, mock_config):
         """测试完整的RAG工作流程"""
         mock_config.validate_config.return_value = True
+        mock_config.database.manifest_path = None
         
         # 模拟各个组件
         with patch('src.rag_system.core.rag_system.CustomEmbedding') as mock_embedding_class:
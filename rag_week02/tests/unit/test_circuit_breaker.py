@@ -0,0 +1,90 @@
+"""
+熔断器测试
+"""
+
+import time
+import pytest
+from unittest.mock import Mock
+from src.rag_system.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.rag_system.core.endpoints import EndpointError
+
+
+def fail():
+    raise ConnectionError("连接失败")
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def test_opens_after_consecutive_failures(self):
+        """测试连续失败达到阈值后打开并快速失败"""
+        breaker = CircuitBreaker("测试", failure_threshold=2, recovery_timeout=60)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        func = Mock()
+        with pytest.raises(CircuitOpenError):
+            breaker.call(func)
+        func.assert_not_called()
+        assert breaker.stats()["rejected"] == 1
+
+    def test_success_resets_failure_count(self):
+        """测试成功调用清零连续失败次数"""
+        breaker = CircuitBreaker("测试", failure_threshold=2, recovery_timeout=60)
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.call(lambda: "ok") == "ok"
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_client_errors_not_counted(self):
+        """测试4xx错误不计入失败次数"""
+        breaker = CircuitBreaker("测试", failure_threshold=1, recovery_timeout=60)
+
+        def bad_request():
+            raise EndpointError("请求错误", 400)
+
+        with pytest.raises(EndpointError):
+            breaker.call(bad_request)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_trial_after_timeout(self):
+        """测试未提供探测函数时，超时后由下一个请求试探，成功则关闭"""
+        breaker = CircuitBreaker("测试", failure_threshold=1, recovery_timeout=0.05)
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        time.sleep(0.06)
+
+        assert breaker.call(lambda: "ok") == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        """测试试探请求失败后重新打开"""
+        breaker = CircuitBreaker("测试", failure_threshold=1, recovery_timeout=0.05)
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        time.sleep(0.06)
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "ok")
+
+    def test_background_probe_moves_to_half_open(self):
+        """测试后台探测成功后进入半开状态"""
+        probe = Mock(side_effect=[False, True])
+        breaker = CircuitBreaker("测试", failure_threshold=1, recovery_timeout=0.02, probe=probe)
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+        deadline = time.monotonic() + 2
+        while breaker.state == CircuitBreaker.OPEN and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.call(lambda: "ok") == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
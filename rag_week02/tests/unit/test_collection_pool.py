@@ -0,0 +1,67 @@
+"""
+集合句柄池测试
+"""
+
+import pytest
+from unittest.mock import patch
+from src.rag_system.database.collection_pool import CollectionPool
+
+
+class TestCollectionPool:
+    """集合句柄池测试类"""
+    
+    @patch('src.rag_system.database.collection_pool.ChromaDBManager')
+    def test_reuses_handles_and_shares_client(self, mock_manager_class):
+        """测试同一租户复用句柄，所有租户共享客户端"""
+        client = object()
+        pool = CollectionPool(embedding_function=len, client=client, max_size=4, idle_timeout=0)
+        
+        first = pool.get("acme")
+        assert pool.get("acme") is first
+        pool.get("beta")
+        
+        assert mock_manager_class.call_count == 2
+        kwargs = mock_manager_class.call_args.kwargs
+        assert kwargs["client"] is client
+        assert kwargs["embedding_function"] is len
+        assert kwargs["collection_name"].endswith("_beta")
+        assert pool.stats()["acme"]["requests"] == 2
+        assert pool.stats()["acme"]["opens"] == 1
+    
+    @patch('src.rag_system.database.collection_pool.ChromaDBManager')
+    def test_lru_eviction(self, mock_manager_class):
+        """测试超过容量时淘汰最久未使用的句柄"""
+        pool = CollectionPool(max_size=2, idle_timeout=0)
+        pool.get("a")
+        pool.get("b")
+        pool.get("a")
+        pool.get("c")
+        
+        stats = pool.stats()
+        assert len(pool) == 2
+        assert stats["b"]["open"] is False
+        assert stats["b"]["evictions"] == 1
+        assert stats["a"]["open"] is True
+    
+    @patch('src.rag_system.database.collection_pool.time')
+    @patch('src.rag_system.database.collection_pool.ChromaDBManager')
+    def test_idle_eviction(self, mock_manager_class, mock_time):
+        """测试空闲超时的句柄被淘汰"""
+        mock_time.monotonic.return_value = 100.0
+        pool = CollectionPool(max_size=4, idle_timeout=10)
+        pool.get("a")
+        pool.get("b")
+        
+        mock_time.monotonic.return_value = 105.0
+        pool.get("b")
+        mock_time.monotonic.return_value = 112.0
+        
+        assert pool.evict_idle() == 1
+        assert pool.stats()["a"]["open"] is False
+        assert pool.stats()["b"]["open"] is True
+    
+    def test_invalid_tenant(self):
+        """测试非法租户ID"""
+        pool = CollectionPool()
+        with pytest.raises(ValueError):
+            pool.get("../other")
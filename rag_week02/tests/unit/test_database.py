@@ -5,6 +5,7 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from src.rag_system.database.chroma_manager import ChromaDBManager
+from src.rag_system.core.documents import Document
 
 
 class TestChromaDBManager:
@@ -118,4 +119,325 @@ class TestChromaDBManager:
             info = manager.get_collection_info()
             
             assert info['count'] == 5
-            assert info['name'] == 'rag_collection'  # 默认名称
\ No newline at end of file
+            assert info['name'] == 'rag_collection'  # 默认名称
+    
+    def test_upsert_many_streams_in_batches(self):
+        """测试分批流式写入"""
+        mock_collection = Mock()
+        embedding_function = Mock(side_effect=lambda docs: [[0.1, 0.2] for _ in docs])
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            mock_client.return_value.get_max_batch_size.return_value = 1000
+            
+            manager = ChromaDBManager(embedding_function=embedding_function)
+            documents = (f"文档{i}" for i in range(5))
+            ids = (f"id{i}" for i in range(5))
+            progress = []
+            stats = manager.upsert_many(documents, ids=ids, batch_size=2, progress_callback=progress.append)
+            
+            assert stats['count'] == 5
+            assert stats['batches'] == 3
+            assert mock_collection.upsert.call_count == 3
+            assert [len(call.args[0]) for call in embedding_function.call_args_list] == [2, 2, 1]
+            assert mock_collection.upsert.call_args_list[-1].kwargs['ids'] == ['id4']
+            assert [p['count'] for p in progress] == [2, 4, 5]
+    
+    def test_upsert_many_accepts_documents(self):
+        """测试流式写入时按批拆分Document"""
+        mock_collection = Mock()
+        embedding_function = Mock(side_effect=lambda docs: [[0.1, 0.2] for _ in docs])
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            mock_client.return_value.get_max_batch_size.return_value = 1000
+            
+            manager = ChromaDBManager(embedding_function=embedding_function)
+            documents = (Document(f"文档{i}", {"source": "a.txt"}, id=f"id{i}") for i in range(3))
+            stats = manager.upsert_many(documents, batch_size=2)
+            
+            assert stats['count'] == 3
+            assert embedding_function.call_args_list[0].args[0] == ["文档0", "文档1"]
+            last = mock_collection.upsert.call_args_list[-1].kwargs
+            assert last['ids'] == ['id2']
+            assert last['metadatas'] == [{"source": "a.txt"}]
+    
+    def test_upsert_many_respects_max_batch_size(self):
+        """测试批次大小不超过Chroma上限"""
+        mock_collection = Mock()
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            mock_client.return_value.get_max_batch_size.return_value = 3
+            
+            manager = ChromaDBManager()
+            stats = manager.upsert_many([f"文档{i}" for i in range(7)], batch_size=100)
+            
+            assert stats['batches'] == 3
+            assert [len(call.kwargs['documents']) for call in mock_collection.upsert.call_args_list] == [3, 3, 1]
+    
+    def test_upsert_many_write_error(self):
+        """测试批量写入失败"""
+        mock_collection = Mock()
+        mock_collection.upsert.side_effect = Exception("写入错误")
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            mock_client.return_value.get_max_batch_size.return_value = 1000
+            
+            manager = ChromaDBManager()
+            
+            with pytest.raises(RuntimeError, match="批量写入文档失败"):
+                manager.upsert_many(["文档1", "文档2"])
+
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_delete_where_uses_metadata_index(self, mock_logger):
+        """测试按来源删除时从本地索引取得ID"""
+        mock_collection = Mock()
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            mock_client.return_value.get_max_batch_size.return_value = 1000
+            
+            manager = ChromaDBManager()
+            manager.upsert_documents(["文档1", "文档2", "文档3"], [[0.1]] * 3,
+                                     [{"source": "a.pdf"}, {"source": "b.pdf"}, {"source": "a.pdf"}],
+                                     ["id1", "id2", "id3"])
+            mock_collection.count.return_value = 3
+            
+            deleted = manager.delete_where(source="a.pdf")
+            
+            assert deleted == 2
+            assert sorted(mock_collection.delete.call_args.kwargs['ids']) == ["id1", "id3"]
+            mock_collection.get.assert_not_called()
+            assert manager.metadata_index.lookup(source="a.pdf") == set()
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_delete_where_falls_back_to_chroma(self, mock_logger):
+        """测试未索引字段的删除条件交给Chroma过滤"""
+        mock_collection = Mock()
+        mock_collection.get.return_value = {"ids": ["id9"]}
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            mock_client.return_value.get_max_batch_size.return_value = 1000
+            
+            manager = ChromaDBManager()
+            deleted = manager.delete_where(author="张三", year=2024)
+            
+            assert deleted == 1
+            assert mock_collection.get.call_args.kwargs['where'] == {"$and": [{"author": "张三"}, {"year": 2024}]}
+            mock_collection.delete.assert_called_once_with(ids=["id9"])
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_query_with_filters(self, mock_logger):
+        """测试查询时下推元数据和文档内容过滤条件"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 0
+        mock_collection.query.return_value = {
+            'ids': [['id1']],
+            'documents': [['文档1']],
+            'metadatas': [[{'source': 'a.pdf', 'page': 1}]],
+            'distances': [[0.1]]
+        }
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            
+            manager = ChromaDBManager(embedding_function=lambda texts: [[0.1] for _ in texts])
+            results = manager.query("测试查询", where={"source": "a.pdf", "page": 1},
+                                    where_document={"$contains": "利率"})
+            
+            assert len(results) == 1
+            kwargs = mock_collection.query.call_args.kwargs
+            assert kwargs['where'] == {"$and": [{"source": "a.pdf"}, {"page": 1}]}
+            assert kwargs['where_document'] == {"$contains": "利率"}
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_query_does_not_trust_stale_index(self, mock_logger):
+        """测试索引与集合不一致时查询结果仍以Chroma为准"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 5
+        mock_collection.query.return_value = {
+            'ids': [['id1']],
+            'documents': [['文档1']],
+            'metadatas': [[{'source': 'a.pdf'}]],
+            'distances': [[0.1]]
+        }
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            
+            manager = ChromaDBManager(embedding_function=lambda texts: [[0.1] for _ in texts])
+            results = manager.query("测试查询", n_results=3, where={"source": "a.pdf"})
+            
+            assert len(results) == 1
+            assert mock_collection.query.call_args.kwargs['n_results'] == 3
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_query_caches_index_sync_until_write(self, mock_logger):
+        """测试过滤查询缓存索引一致性检查，写入后重新比对"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 0
+        mock_collection.query.return_value = {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            
+            manager = ChromaDBManager(embedding_function=lambda texts: [[0.1] for _ in texts])
+            for _ in range(3):
+                manager.query("测试查询", where={"source": "a.pdf"})
+            assert mock_collection.count.call_count == 1
+            
+            manager.upsert_documents(["文档1"], [[0.1]], [{"source": "a.pdf"}], ["id1"])
+            mock_collection.count.return_value = 1
+            manager.query("测试查询", n_results=5, where={"source": "a.pdf"})
+            assert mock_collection.count.call_count == 2
+            assert mock_collection.query.call_args.kwargs['n_results'] == 1
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_reset_recreates_collection(self, mock_logger):
+        """测试重置集合时在同一客户端上重建并清空索引"""
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_max_batch_size.return_value = 1000
+            manager = ChromaDBManager()
+            manager.upsert_documents(["文档1"], [[0.1]], [{"source": "a.pdf"}], ["id1"])
+            
+            manager.reset()
+            
+            mock_client.return_value.delete_collection.assert_called_once_with(name=manager.collection_name)
+            assert manager.collection == mock_client.return_value.create_collection.return_value
+            assert len(manager.metadata_index) == 0
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_snapshot_and_restore(self, mock_logger, tmp_path):
+        """测试快照导出后恢复时直接写入原有向量"""
+        source = Mock()
+        source.count.return_value = 3
+        source.get.side_effect = [
+            {"ids": ["id1", "id2"], "documents": ["文档1", "文档2"],
+             "metadatas": [{"source": "a.pdf"}, {"source": "b.pdf"}], "embeddings": [[0.1, 0.2], [0.3, 0.4]]},
+            {"ids": ["id3"], "documents": ["文档3"],
+             "metadatas": [{"source": "a.pdf"}], "embeddings": [[0.5, 0.6]]},
+        ]
+        target = Mock()
+        embedding_function = Mock()
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_max_batch_size.return_value = 2
+            mock_client.return_value.get_collection.return_value = source
+            info = ChromaDBManager().snapshot(str(tmp_path / "snap"))
+            
+            mock_client.return_value.create_collection.return_value = target
+            manager = ChromaDBManager(embedding_function=embedding_function)
+            restored = manager.restore(str(tmp_path / "snap"))
+        
+        assert info["count"] == 3 and info["dimension"] == 2
+        assert restored == 3
+        embedding_function.assert_not_called()
+        first, second = target.upsert.call_args_list
+        assert first.kwargs['ids'] == ["id1", "id2"]
+        assert second.kwargs['documents'] == ["文档3"]
+        assert second.kwargs['embeddings'][0] == pytest.approx([0.5, 0.6])
+        assert manager.metadata_index.lookup(source="a.pdf") == {"id1", "id3"}
+    
+    def test_restore_missing_snapshot(self, tmp_path):
+        """测试快照目录不存在"""
+        with patch('chromadb.Client'):
+            manager = ChromaDBManager()
+            with pytest.raises(FileNotFoundError):
+                manager.restore(str(tmp_path / "missing"))
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_query_with_projection(self, mock_logger):
+        """测试只请求距离时不返回文档和元数据"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 0
+        mock_collection.query.return_value = {
+            'ids': [['id1', 'id2']],
+            'documents': None,
+            'metadatas': None,
+            'distances': [[0.1, 0.2]]
+        }
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            
+            manager = ChromaDBManager(embedding_function=lambda texts: [[0.1] for _ in texts])
+            results = manager.query("测试查询", include=("distances",))
+            
+            assert mock_collection.query.call_args.kwargs['include'] == ["distances"]
+            assert [hit.id for hit in results] == ['id1', 'id2']
+            assert results[1]['distance'] == 0.2
+            assert results[0].document is None
+            assert results[0].get('metadata', {}) == {}
+            
+            with pytest.raises(ValueError):
+                manager.query("测试查询", include=("embeddings",))
+    
+    def test_fetch_documents_keeps_order(self):
+        """测试按ID取回文档时保持请求顺序"""
+        mock_collection = Mock()
+        mock_collection.get.return_value = {'ids': ['id2', 'id1'], 'documents': ['文档2', '文档1']}
+        
+        with patch('chromadb.Client') as mock_client:
+            mock_client.return_value.get_collection.return_value = mock_collection
+            
+            manager = ChromaDBManager()
+            assert manager.fetch_documents(['id1', 'id3', 'id2']) == ['文档1', None, '文档2']
+            assert mock_collection.get.call_args.kwargs['include'] == ["documents"]
+    
+    @patch('src.rag_system.database.chroma_manager.logger')
+    def test_external_documents_keep_text_out_of_chroma(self, mock_logger):
+        """测试外部文档存储模式下Chroma只保存向量，查询时从本地存储读取文本"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 0
+        mock_collection.query.return_value = {
+            'ids': [['id2', 'id1']],
+            'documents': None,
+            'metadatas': [[{'source': 'b.pdf'}, {'source': 'a.pdf'}]],
+            'distances': [[0.1, 0.2]]
+        }
+        
+        with patch('src.rag_system.database.chroma_manager.config') as mock_config, \
+                patch('chromadb.Client') as mock_client:
+            mock_config.database.document_store_directory = None
+            mock_config.database.document_block_size = 64
+            mock_config.database.document_cache_blocks = 4
+            mock_config.database.index_directory = None
+            mock_config.database.index_fields = ("source",)
+            mock_client.return_value.get_collection.return_value = mock_collection
+            
+            manager = ChromaDBManager(embedding_function=lambda texts: [[0.1] for _ in texts],
+                                      external_documents=True)
+            manager.upsert_documents(["文档1", "文档2"], [[0.1], [0.2]],
+                                     [{"source": "a.pdf"}, {"source": "b.pdf"}], ["id1", "id2"])
+            
+            assert 'documents' not in mock_collection.upsert.call_args.kwargs
+            
+            results = manager.query("测试查询")
+            assert "documents" not in mock_collection.query.call_args.kwargs['include']
+            assert [hit.document for hit in results] == ["文档2", "文档1"]
+            assert manager.fetch_documents(["id1"]) == ["文档1"]
+            mock_collection.get.assert_not_called()
+            
+            with pytest.raises(ValueError):
+                manager.query("测试查询", where_document={"$contains": "文档"})
+    
+    def test_rename_moves_index_file(self, tmp_path):
+        """测试重命名集合时移动元数据索引文件"""
+        with patch('src.rag_system.database.chroma_manager.config') as mock_config, \
+                patch('chromadb.Client') as mock_client:
+            mock_config.database.index_directory = str(tmp_path)
+            mock_config.database.index_fields = ("source",)
+            mock_config.database.collection_name = 'old_name'
+            mock_config.database.external_documents = False
+            manager = ChromaDBManager()
+            manager.upsert_documents(["文档1"], [[0.1]], [{"source": "a.pdf"}], ["id1"])
+            
+            manager.rename("new_name")
+            
+            mock_client.return_value.get_collection.return_value.modify.assert_called_once_with(name="new_name")
+            assert manager.collection_name == "new_name"
+            assert (tmp_path / "new_name.metadata_index.jsonl").exists()
+            assert not (tmp_path / "old_name.metadata_index.jsonl").exists()
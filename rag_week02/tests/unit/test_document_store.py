@@ -0,0 +1,85 @@
+"""
+外部文档存储测试
+"""
+
+import os
+from src.rag_system.database.document_store import DocumentStore
+
+
+class TestDocumentStore:
+    """外部文档存储测试类"""
+    
+    def test_put_and_get(self):
+        """测试按ID读取，跨块读取时保持请求顺序"""
+        store = DocumentStore(block_size=2)
+        store.put(["id1", "id2", "id3"], ["文档1", "文档2", "文档3"])
+        
+        assert store.get(["id3", "id1", "id9"]) == ["文档3", "文档1", None]
+        assert len(store) == 3
+    
+    def test_overwrite_and_remove(self):
+        """测试覆盖写入和删除"""
+        store = DocumentStore(block_size=2)
+        store.put(["id1", "id2"], ["旧文档", "文档2"])
+        store.put(["id1"], ["新文档"])
+        store.remove(["id2"])
+        
+        assert store.get(["id1", "id2"]) == ["新文档", None]
+        assert "id2" not in store
+    
+    def test_lru_cache_limits_decompressed_blocks(self):
+        """测试解压块缓存数量不超过上限"""
+        store = DocumentStore(block_size=1, cache_blocks=2)
+        store.put(["id1", "id2", "id3"], ["文档1", "文档2", "文档3"])
+        store.get(["id1", "id2", "id3"])
+        
+        assert list(store._cache) == [1, 2]
+    
+    def test_persistence_and_compact(self, tmp_path):
+        """测试重新加载日志以及压缩后只保留存活的文档"""
+        path = str(tmp_path / "docs")
+        store = DocumentStore(path, block_size=2)
+        store.put(["id1", "id2", "id3"], ["文档1", "文档2", "文档3"])
+        store.remove(["id1", "id2"])
+        size_before = os.path.getsize(os.path.join(path, DocumentStore.DATA_FILE))
+        
+        reloaded = DocumentStore(path, block_size=2)
+        assert reloaded.get(["id1", "id3"]) == [None, "文档3"]
+        
+        reloaded.compact()
+        assert os.path.getsize(os.path.join(path, DocumentStore.DATA_FILE)) < size_before
+        assert DocumentStore(path).get(["id3"]) == ["文档3"]
+    
+    def test_compact_streams_blocks(self, tmp_path, monkeypatch):
+        """测试加载时不自动压缩，压缩时逐块读取而不是一次取出全部文档"""
+        path = str(tmp_path / "docs")
+        store = DocumentStore(path, block_size=2)
+        ids = [f"id{i}" for i in range(10)]
+        store.put(ids, [f"文档{i}" for i in range(10)])
+        store.remove(ids[:7])
+        size_before = os.path.getsize(os.path.join(path, DocumentStore.DATA_FILE))
+        
+        reloaded = DocumentStore(path, block_size=2)
+        assert os.path.getsize(os.path.join(path, DocumentStore.DATA_FILE)) == size_before
+        assert reloaded.needs_compaction()
+        
+        def fail_get(ids):
+            raise AssertionError("compact不应一次读取全部文档")
+        
+        monkeypatch.setattr(reloaded, "get", fail_get)
+        reloaded.compact()
+        monkeypatch.undo()
+        
+        assert not reloaded.needs_compaction()
+        assert reloaded.get(ids) == [None] * 7 + ["文档7", "文档8", "文档9"]
+        assert DocumentStore(path).get(["id9"]) == ["文档9"]
+    
+    def test_clear(self, tmp_path):
+        """测试清空存储"""
+        path = str(tmp_path / "docs")
+        store = DocumentStore(path)
+        store.put(["id1"], ["文档1"])
+        store.clear()
+        
+        assert len(store) == 0
+        assert len(DocumentStore(path)) == 0
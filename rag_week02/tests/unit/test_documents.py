@@ -0,0 +1,60 @@
+"""
+文档模型测试
+"""
+
+import pytest
+from src.rag_system.core.documents import Chunk, Document, unpack_documents
+from src.rag_system.ingestion import TextChunker
+
+
+class TestDocument:
+    """文档测试类"""
+
+    def test_compatible_access(self):
+        """测试字段访问、元组解包和比较"""
+        document = Document("内容", {"source": "a.txt"}, id="doc-1")
+
+        assert document["text"] == "内容"
+        assert document.get("id") == "doc-1"
+        text, metadata = document
+        assert (text, metadata) == ("内容", {"source": "a.txt"})
+        assert document == ("内容", {"source": "a.txt"})
+        assert document.to_dict() == {"text": "内容", "metadata": {"source": "a.txt"}, "id": "doc-1"}
+        assert not hasattr(document, "__dict__")
+        with pytest.raises(KeyError):
+            document["content"]
+
+    def test_unpack_documents(self):
+        """测试把Document列表拆分为文本、元数据和ID"""
+        documents = [Document("a", {"source": "x"}, id="1"), Document("b", id="2")]
+
+        assert unpack_documents(documents) == (["a", "b"], [{"source": "x"}, {"source": "default"}], ["1", "2"])
+        # 显式传入的元数据优先，ID不全时交给调用方生成
+        texts, metadatas, ids = unpack_documents([Document("a"), "b"], [{"k": 1}, {"k": 2}])
+        assert (texts, metadatas, ids) == (["a", "b"], [{"k": 1}, {"k": 2}], None)
+        # 字符串列表原样返回
+        plain = ["a"]
+        assert unpack_documents(plain)[0] is plain
+
+
+class TestChunk:
+    """分块测试类"""
+
+    def test_view_into_source(self):
+        """测试分块只引用原文，按位置切片得到内容"""
+        text = "  第一段内容。\n\n第二段内容。  "
+        chunks = TextChunker(chunk_size=8, overlap=0, method="recursive").chunk(text)
+
+        assert all(chunk.source is text for chunk in chunks)
+        assert [chunk["content"] for chunk in chunks] == ["第一段内容。", "第二段内容。"]
+        assert chunks[0].metadata == {"start": 2, "end": 8, "method": "recursive"}
+        assert len(chunks[0]) == 6
+        assert not hasattr(chunks[0], "__dict__")
+
+    def test_equality_with_dict(self):
+        """测试与之前的字典格式比较"""
+        chunk = Chunk("xxabcd", 2, 4, "fixed")
+
+        assert chunk == {"content": "ab", "metadata": {"start": 2, "end": 4, "method": "fixed"}}
+        assert chunk == Chunk("ab", 2, 4, "fixed", base=2)
+        assert chunk != Chunk("xxabcd", 2, 5, "fixed")
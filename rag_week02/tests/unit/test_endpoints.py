@@ -0,0 +1,180 @@
+"""
+模型端点负载均衡测试
+"""
+
+import time
+import pytest
+from unittest.mock import Mock
+from src.rag_system.core.endpoints import EndpointPool, EndpointError, parse_urls
+from src.rag_system.core.scheduler import RateLimitError, priority, current_priority, BULK
+
+
+class TestEndpointPool:
+    """端点池测试类"""
+
+    def test_parse_urls(self):
+        """测试解析逗号分隔的地址"""
+        assert parse_urls("http://a/v1/, http://b/v1,") == ["http://a/v1", "http://b/v1"]
+        with pytest.raises(ValueError, match="至少需要一个端点地址"):
+            EndpointPool("")
+
+    def test_select_prefers_idle_and_fast_endpoints(self):
+        """测试按未完成请求数和延迟选择端点"""
+        pool = EndpointPool("http://a,http://b")
+        a, b = pool.endpoints
+        a.latency, b.latency = 0.1, 0.5
+
+        assert pool.select() is a
+        assert pool.select() is a  # (1+1)*0.1 < 0.5
+        assert pool.select() is a  # (2+1)*0.1 < 0.5
+        a.outstanding = 10
+        assert pool.select() is b
+
+    def test_untried_endpoint_probed_first(self):
+        """测试尚未测得延迟的端点优先试探"""
+        pool = EndpointPool("http://a,http://b")
+        pool.endpoints[0].latency = 0.01
+
+        assert pool.select() is pool.endpoints[1]
+
+    def test_complete_updates_latency_ewma(self):
+        """测试成功调用更新延迟EWMA"""
+        pool = EndpointPool("http://a")
+        endpoint = pool.select()
+        pool.complete(endpoint, 1.0)
+        endpoint = pool.select()
+        pool.complete(endpoint, 2.0)
+
+        assert endpoint.latency == pytest.approx(1.3)
+        assert endpoint.outstanding == 0
+
+    def test_call_fails_over_and_ejects(self):
+        """测试端点故障时切换端点，连续失败后摘除"""
+        pool = EndpointPool("http://a,http://b", failure_threshold=2, ejection_seconds=60)
+        a, b = pool.endpoints
+        a.latency, b.latency = 0.01, 1.0
+
+        def func(endpoint):
+            if endpoint is a:
+                raise EndpointError("服务端错误", 503)
+            return endpoint.url
+
+        assert pool.call(func) == "http://b"
+        assert pool.call(func) == "http://b"
+        stats = pool.stats()
+        assert stats["http://a"]["errors"] == 2
+        assert stats["http://a"]["ejected"] is True
+
+        # 摘除后不再选择该端点
+        assert pool.call(func) == "http://b"
+        assert pool.stats()["http://a"]["requests"] == 2
+
+    def test_client_errors_do_not_fail_over(self):
+        """测试4xx错误和限流直接抛出，不切换端点"""
+        pool = EndpointPool("http://a,http://b")
+        func = Mock(side_effect=EndpointError("请求错误", 400))
+        with pytest.raises(EndpointError):
+            pool.call(func)
+        assert func.call_count == 1
+
+        func = Mock(side_effect=RateLimitError("429"))
+        with pytest.raises(RateLimitError):
+            pool.call(func)
+        assert func.call_count == 1
+        assert all(stat["errors"] == 0 for stat in pool.stats().values())
+
+    def test_all_endpoints_failing_raises_last_error(self):
+        """测试所有端点都失败时抛出最后一个错误"""
+        pool = EndpointPool("http://a,http://b")
+        func = Mock(side_effect=ConnectionError("连接失败"))
+
+        with pytest.raises(ConnectionError):
+            pool.call(func)
+        assert func.call_count == 2
+
+    def test_check_health_recovers_endpoint(self):
+        """测试健康检查通过后恢复被摘除的端点"""
+        health_check = Mock(return_value=True)
+        pool = EndpointPool(
+            "http://a,http://b", health_check=health_check,
+            failure_threshold=1, ejection_seconds=60, health_check_interval=0
+        )
+        endpoint = pool.select()
+        pool.complete(endpoint, 0.1, ConnectionError("连接失败"))
+        assert pool.stats()[endpoint.url]["ejected"] is True
+
+        assert pool.check_health() == 1
+        health_check.assert_called_once_with(endpoint)
+        assert pool.stats()[endpoint.url]["ejected"] is False
+
+
+class TestHedgedRequests:
+    """对冲请求测试类"""
+
+    def make_pool(self):
+        pool = EndpointPool("http://slow,http://fast", hedge_percentile=95)
+        # 预置延迟样本，p95约为0.05秒
+        pool._latencies.extend([0.05] * 30)
+        return pool
+
+    def test_no_hedge_without_samples(self):
+        """测试延迟样本不足时不对冲"""
+        pool = EndpointPool("http://a,http://b", hedge_percentile=95)
+        assert pool.hedge_delay() is None
+        assert pool.call(lambda endpoint: endpoint.url, hedge=True) in pool.urls
+        assert pool.hedge_stats()["hedged"] == 0
+
+    def test_slow_request_is_hedged(self):
+        """测试主请求超过p95未返回时向另一个端点发出对冲请求"""
+        pool = self.make_pool()
+        slow, fast = pool.endpoints
+        slow.latency, fast.latency = 0.01, 0.02
+
+        def func(endpoint):
+            if endpoint is slow:
+                time.sleep(0.5)
+            return endpoint.url
+
+        start = time.perf_counter()
+        assert pool.call(func, hedge=True) == "http://fast"
+        assert time.perf_counter() - start < 0.4
+        stats = pool.hedge_stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        pool.close()
+
+    def test_no_hedge_without_alternative_endpoint(self):
+        """测试其他端点都被摘除时不向同一个端点发出对冲请求"""
+        pool = self.make_pool()
+        slow, fast = pool.endpoints
+        slow.latency = 0.01
+        fast.ejected_until = time.monotonic() + 60
+        calls = []
+
+        def func(endpoint):
+            calls.append(endpoint)
+            time.sleep(0.2)
+            return endpoint.url
+
+        assert pool.call(func, hedge=True) == "http://slow"
+        assert calls == [slow]
+        assert pool.hedge_stats()["hedged"] == 0
+        pool.close()
+
+    def test_fast_request_not_hedged(self):
+        """测试主请求在p95内返回时不发出对冲请求"""
+        pool = self.make_pool()
+        func = Mock(return_value="ok")
+
+        assert pool.call(func, hedge=True) == "ok"
+        assert func.call_count == 1
+        assert pool.hedge_stats()["hedged"] == 0
+
+    def test_hedge_keeps_priority_context(self):
+        """测试对冲调用在工作线程中保持调用方的优先级通道"""
+        pool = self.make_pool()
+        lanes = []
+
+        with priority(BULK):
+            pool.call(lambda endpoint: lanes.append(current_priority()), hedge=True)
+        assert lanes == [BULK]
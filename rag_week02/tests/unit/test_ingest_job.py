@@ -0,0 +1,143 @@
+"""
+可恢复摄取任务测试
+"""
+
+import pytest
+from itertools import islice
+from unittest.mock import Mock, patch
+from src.rag_system.core.ingest_job import IngestJob
+from src.rag_system.core.rag_system import RAGSystem
+
+
+def make_rag_system(fail_batches=None):
+    """构造一个按批次处理并可以模拟失败的RAG系统"""
+    fail_batches = fail_batches if fail_batches is not None else {}
+    rag_system = Mock()
+    rag_system.stored = []
+    
+    def ingest_stream(records, batch_size, skip_batch):
+        records = iter(records)
+        index = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            ids = [doc_id for _, _, doc_id in batch]
+            if not skip_batch(index, ids):
+                if fail_batches.get(index, 0) > 0:
+                    fail_batches[index] -= 1
+                    yield {"batch": index, "count": len(ids), "ids": ids, "success": False, "error": "嵌入失败"}
+                else:
+                    rag_system.stored.extend(ids)
+                    yield {"batch": index, "count": len(ids), "ids": ids, "success": True, "error": None}
+            index += 1
+    
+    rag_system.ingest_stream.side_effect = ingest_stream
+    return rag_system
+
+
+class TestIngestJob:
+    """可恢复摄取任务测试类"""
+    
+    def test_run_commits_all_batches(self, tmp_path):
+        """测试任务完成后日志记录所有批次"""
+        rag_system = make_rag_system()
+        job = IngestJob(rag_system, "job1", journal_dir=str(tmp_path), batch_size=2, max_retries=0)
+        
+        stats = job.run([f"文档{i}" for i in range(5)])
+        
+        assert stats["success"] is True
+        assert stats["committed"] == 3
+        assert len(rag_system.stored) == 5
+        assert sorted(job.completed_batches()) == [0, 1, 2]
+    
+    def test_resume_skips_committed_batches(self, tmp_path):
+        """测试重新运行时只处理未完成的批次"""
+        documents = [f"文档{i}" for i in range(6)]
+        first = make_rag_system(fail_batches={1: 10})
+        stats = IngestJob(first, "job2", journal_dir=str(tmp_path), batch_size=2, max_retries=0).run(documents)
+        
+        assert stats["success"] is False
+        assert stats["failed"] == [1]
+        
+        second = make_rag_system()
+        stats = IngestJob(second, "job2", journal_dir=str(tmp_path), batch_size=2, max_retries=0).run(documents)
+        
+        assert stats["success"] is True
+        assert stats["skipped"] == 2
+        assert stats["committed"] == 1
+        assert len(second.stored) == 2
+    
+    def test_retry_only_failed_batches(self, tmp_path):
+        """测试运行内重试只处理失败的批次"""
+        rag_system = make_rag_system(fail_batches={0: 1})
+        job = IngestJob(rag_system, "job3", journal_dir=str(tmp_path), batch_size=2, max_retries=2, retry_delay=0)
+        
+        stats = job.run([f"文档{i}" for i in range(4)])
+        
+        assert stats["success"] is True
+        assert stats["committed"] == 2
+        assert rag_system.ingest_stream.call_count == 2
+        assert len(rag_system.stored) == 4
+    
+    def test_same_error_twice_stops_retrying(self, tmp_path):
+        """测试同一批次重复出现相同错误时停止重试"""
+        rag_system = make_rag_system(fail_batches={0: 10})
+        job = IngestJob(rag_system, "job5", journal_dir=str(tmp_path), batch_size=2, max_retries=5, retry_delay=0)
+        
+        stats = job.run([f"文档{i}" for i in range(4)])
+        
+        assert stats["success"] is False
+        assert stats["failed"] == [0]
+        assert rag_system.ingest_stream.call_count == 2
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_resume_with_real_ingest_stream(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm, tmp_path):
+        """测试通过真实的ingest_stream流水线续传"""
+        mock_config.ingest.queue_size = 2
+        mock_config.ingest.embed_workers = 2
+        mock_config.ingest.store_workers = 1
+        
+        calls = {"failed": False}
+        
+        def get_embeddings(docs):
+            if "文档2" in docs and not calls["failed"]:
+                calls["failed"] = True
+                raise RuntimeError("嵌入API错误")
+            return [[0.1] for _ in docs]
+        
+        mock_embedding_class.return_value.get_embeddings.side_effect = get_embeddings
+        mock_db = mock_db_class.return_value
+        rag_system = RAGSystem()
+        documents = [f"文档{i}" for i in range(6)]
+        
+        stats = IngestJob(rag_system, "job6", journal_dir=str(tmp_path), batch_size=2, max_retries=0).run(documents)
+        assert stats["failed"] == [1]
+        assert mock_db.upsert_documents.call_count == 2
+        
+        mock_db.upsert_documents.reset_mock()
+        stats = IngestJob(rag_system, "job6", journal_dir=str(tmp_path), batch_size=2, max_retries=0).run(documents)
+        
+        assert stats["success"] is True
+        assert stats["skipped"] == 2
+        assert mock_db.upsert_documents.call_count == 1
+        assert mock_db.upsert_documents.call_args.args[0] == ["文档2", "文档3"]
+    
+    def test_changed_input_is_not_skipped(self, tmp_path):
+        """测试输入变化后对应批次重新摄取"""
+        IngestJob(make_rag_system(), "job4", journal_dir=str(tmp_path), batch_size=2).run(["a", "b"])
+        
+        rag_system = make_rag_system()
+        stats = IngestJob(rag_system, "job4", journal_dir=str(tmp_path), batch_size=2).run(["a", "c"])
+        
+        assert stats["skipped"] == 0
+        assert stats["committed"] == 1
+    
+    def test_empty_job_id(self):
+        """测试任务ID为空"""
+        with pytest.raises(ValueError, match="任务ID不能为空"):
+            IngestJob(Mock(), "")
@@ -0,0 +1,250 @@
+"""
+文档处理模块测试
+"""
+
+import io
+import pytest
+from src.rag_system.ingestion import (
+    DataLoader, FinancialTermStandardizer, ParseCache, TextChunker, count_tokens, file_hash, load_term_mapping
+)
+
+
+class TestFinancialTermStandardizer:
+    """金融术语标准化测试类"""
+
+    def make_standardizer(self):
+        return FinancialTermStandardizer({
+            "icbc": "Industrial and Commercial Bank of China",
+            "工行": "Industrial and Commercial Bank of China",
+            "a round financing": "A Round Financing",
+            "round": "Round",
+            "pos": "POS",
+            "a": "A"
+        })
+
+    def test_case_insensitive_replacement(self):
+        """测试不区分大小写替换"""
+        standardizer = self.make_standardizer()
+        assert standardizer.standardize("I went to ICBC.") == "I went to Industrial and Commercial Bank of China."
+        assert standardizer.standardize("工行 is a bank") == "Industrial and Commercial Bank of China is a bank"
+
+    def test_leftmost_longest_match(self):
+        """测试重叠时选择最左最长的术语"""
+        standardizer = self.make_standardizer()
+        assert standardizer.standardize("we need a round financing.") == "we need A Round Financing."
+        assert standardizer.standardize("one round") == "one Round"
+
+    def test_word_boundaries(self):
+        """测试不替换单词内部的别名"""
+        standardizer = self.make_standardizer()
+        assert standardizer.standardize("Deposit at pos") == "Deposit at POS"
+        assert standardizer.standardize("around") == "around"
+
+    def test_add_term_updates_automaton(self):
+        """测试构建后新增术语立即生效"""
+        standardizer = self.make_standardizer()
+        standardizer.standardize("icbc")
+        standardizer.add_term("ant group", "Ant Group")
+        standardizer.add_term("icb", "ICB")
+
+        assert standardizer.standardize("ant group and icbc") == "Ant Group and Industrial and Commercial Bank of China"
+        assert standardizer.find_matches("icb") == [(0, 3, "ICB")]
+
+    def test_load_term_mapping(self, tmp_path):
+        """测试从术语表CSV加载映射"""
+        path = tmp_path / "terms.csv"
+        path.write_text("A,FINTERM\nA Priori Probability,FINTERM\n,FINTERM\n", encoding="utf-8")
+
+        assert load_term_mapping(str(path)) == {"a priori probability": "A Priori Probability"}
+
+
+class TestTextChunker:
+    """文本分块测试类"""
+
+    def test_fixed_chunks_with_overlap(self):
+        """测试固定长度分块的位置和重叠"""
+        chunker = TextChunker(chunk_size=10, overlap=2)
+        chunks = chunker.chunk("abcdefghijklmnopqrst")
+
+        assert [(c["metadata"]["start"], c["metadata"]["end"]) for c in chunks] == [(0, 10), (8, 18), (16, 20)]
+        assert chunks[1]["content"] == "ijklmnopqr"
+
+    def test_recursive_chunks_by_line(self):
+        """测试按行合并分块"""
+        chunker = TextChunker(chunk_size=12, overlap=0, method="recursive")
+        chunks = chunker.chunk("第一行\n第二行\n很长的第三行内容\n")
+
+        assert [c["content"] for c in chunks] == ["第一行\n第二行", "很长的第三行内容"]
+
+    def test_recursive_splits_on_chinese_punctuation(self):
+        """测试没有换行时按中文句末标点切分，并记录分块位置"""
+        text = "第一句话。第二句话！第三句话？"
+        chunker = TextChunker(chunk_size=6, overlap=0, method="recursive")
+        chunks = chunker.chunk(text)
+
+        assert [c["content"] for c in chunks] == ["第一句话。", "第二句话！", "第三句话？"]
+        assert all(text[c["metadata"]["start"]:c["metadata"]["end"]] == c["content"] for c in chunks)
+
+    def test_recursive_token_sizes_and_overlap(self):
+        """测试按token计算长度，相邻分块重叠不超过overlap"""
+        text = " ".join(f"word{i:03d}" for i in range(200))
+        chunker = TextChunker(chunk_size=20, overlap=4, method="recursive", tokenizer=count_tokens)
+        chunks = chunker.chunk(text)
+
+        assert all(count_tokens(c["content"]) <= 20 for c in chunks)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert previous["metadata"]["start"] < current["metadata"]["start"] <= previous["metadata"]["end"]
+        assert chunks[-1]["content"].endswith("word199")
+
+    def test_tokenizer_results_are_cached(self):
+        """测试相同片段只调用一次分词器"""
+        calls = []
+
+        def tokenizer(text):
+            calls.append(text)
+            return len(text)
+
+        chunker = TextChunker(chunk_size=10, overlap=0, method="recursive", tokenizer=tokenizer)
+        chunker.chunk("重复的句子。" * 50)
+
+        assert len(calls) == len(set(calls))
+
+    def test_callable_for_ingest_stream(self):
+        """测试按ingest_stream分块函数约定返回"""
+        chunker = TextChunker(chunk_size=4, overlap=0)
+        assert list(chunker("abcdef", {})) == [
+            ("abcd", {"start": 0, "end": 4, "method": "fixed"}),
+            ("ef", {"start": 4, "end": 6, "method": "fixed"})
+        ]
+
+    def test_chunk_stream_matches_chunk(self):
+        """测试流式分块跨窗口保持全局位置和重叠，与一次性分块结果一致"""
+        text = "".join(f"第{i}行内容abc\n" for i in range(200))
+        chunker = TextChunker(chunk_size=30, overlap=7)
+
+        assert list(chunker.chunk_stream(io.StringIO(text), window_size=64)) == chunker.chunk(text)
+        # 按行迭代的文件
+        assert list(chunker.chunk_stream(iter(io.StringIO(text)))) == chunker.chunk(text)
+
+    def test_chunk_stream_is_lazy(self):
+        """测试流式分块按需读取输入"""
+        read = []
+
+        def pieces():
+            for i in range(1000):
+                read.append(i)
+                yield "x" * 10
+
+        stream = TextChunker(chunk_size=20, overlap=0).chunk_stream(pieces())
+        first = next(stream)
+
+        assert first["metadata"] == {"start": 0, "end": 20, "method": "fixed"}
+        assert len(read) == 2
+
+    def test_chunk_stream_recursive_windows(self):
+        """测试按行分块时在换行处截断窗口"""
+        text = "aaaa\nbbbb\ncccc\n"
+        chunker = TextChunker(chunk_size=10, overlap=0, method="recursive")
+
+        chunks = list(chunker.chunk_stream(io.StringIO(text), window_size=10))
+        assert [c["content"] for c in chunks] == ["aaaa\nbbbb", "cccc"]
+        with pytest.raises(ValueError):
+            list(chunker.chunk_stream(io.StringIO(text), window_size=5))
+
+    def test_chunk_stream_recursive_matches_chunk(self):
+        """测试按行分块跨多个窗口时，窗口边界处的分块和重叠与一次性分块一致"""
+        text = "".join(f"第{i}行，内容{'x' * (i % 7)}。\n" for i in range(300))
+        for chunker in (
+            TextChunker(chunk_size=40, overlap=12, method="recursive"),
+            TextChunker(chunk_size=20, overlap=5, method="recursive", tokenizer=count_tokens)
+        ):
+            expected = chunker.chunk(text)
+            streamed = list(chunker.chunk_stream(io.StringIO(text), window_size=100))
+
+            assert len(text) > 10 * 100
+            assert streamed == expected
+            assert all(text[c.start:c.end] == c.content for c in streamed)
+
+    def test_invalid_parameters(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            TextChunker(chunk_size=10, overlap=10)
+        with pytest.raises(ValueError):
+            TextChunker(method="unknown")
+
+
+class TestDataLoader:
+    """文件加载测试类"""
+
+    def test_load_text_file(self, tmp_path):
+        """测试读取文本文件"""
+        path = tmp_path / "doc.txt"
+        path.write_text("内容", encoding="utf-8")
+        assert DataLoader().load(str(path)) == "内容"
+
+    def test_missing_and_unsupported_files(self, tmp_path):
+        """测试文件不存在和不支持的类型"""
+        loader = DataLoader()
+        with pytest.raises(FileNotFoundError):
+            loader.load(str(tmp_path / "missing.txt"))
+
+        path = tmp_path / "doc.docx"
+        path.write_bytes(b"")
+        with pytest.raises(ValueError, match="不支持的文件类型"):
+            loader.load(str(path))
+
+    def test_csv_row_groups(self, tmp_path):
+        """测试CSV按行组产出文档，按列渲染并记录行范围"""
+        pytest.importorskip("pandas")
+        path = tmp_path / "data.csv"
+        path.write_text("code,name,note\n001,甲,\n002,乙,备注\n003,丙,\n", encoding="utf-8")
+        loader = DataLoader(csv_rows=2)
+
+        documents = list(loader.iter_documents(str(path)))
+        assert documents == [
+            ("code: 001\nname: 甲\n\ncode: 002\nname: 乙\nnote: 备注", {"row_start": 0, "row_end": 2}),
+            ("code: 003\nname: 丙", {"row_start": 2, "row_end": 3})
+        ]
+        assert loader.load(str(path)) == "\n\n".join(text for text, _ in documents)
+        assert loader.is_streamed(str(path)) and not loader.is_streamed("doc.txt")
+
+
+class TestParseCache:
+    """解析缓存测试类"""
+
+    def test_roundtrip_by_key(self, tmp_path):
+        """测试按文件哈希、页码、版本和提取范围读写"""
+        path = str(tmp_path / "parse.sqlite3")
+        cache = ParseCache(path)
+        cache.put_pages("h1", "v1", [(1, {"text": "第一页"}), (2, {"text": "第二页"})], "text")
+        cache.put("h1", 1, "v2", {"text": "新版本"}, "text")
+        cache.close()
+
+        cache = ParseCache(path)
+        assert cache.get("h1", 1, "v1", "text") == {"text": "第一页"}
+        assert cache.get("h1", 1, "v1", "tables") is None
+        assert cache.get_pages("h1", "v1", "text") == {1: {"text": "第一页"}, 2: {"text": "第二页"}}
+        assert len(cache) == 3
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_file_hash_by_content(self, tmp_path):
+        """测试哈希只取决于文件内容"""
+        first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+        first.write_bytes(b"same")
+        second.write_bytes(b"same")
+        assert file_hash(str(first)) == file_hash(str(second))
+
+    def test_loader_caches_csv(self, tmp_path, monkeypatch):
+        """测试CSV文件未变化时不再调用pandas读取"""
+        pd = pytest.importorskip("pandas")
+        path = tmp_path / "data.csv"
+        path.write_text("name,value\n甲,1\n乙,2\n丙,3\n", encoding="utf-8")
+        loader = DataLoader(cache=ParseCache(str(tmp_path / "parse.sqlite3")), csv_rows=2)
+        documents = list(loader.iter_documents(str(path)))
+
+        def fail_read(*args, **kwargs):
+            raise AssertionError("不应重新解析")
+
+        monkeypatch.setattr(pd, "read_csv", fail_read)
+        assert list(loader.iter_documents(str(path))) == documents
@@ -0,0 +1,67 @@
+"""
+摄取清单测试
+"""
+
+import json
+from src.rag_system.database.manifest import IngestManifest, assign_document_ids, content_hash, make_document_id
+
+
+class TestIngestManifest:
+    """摄取清单测试类"""
+    
+    def test_make_document_id_is_deterministic(self):
+        """测试文档ID只由来源和内容决定"""
+        assert make_document_id("a.txt", "内容") == make_document_id("a.txt", "内容")
+        assert make_document_id("a.txt", "内容") != make_document_id("b.txt", "内容")
+        assert make_document_id("a.txt", "内容") != make_document_id("a.txt", "内容2")
+    
+    def test_assign_document_ids_numbers_repeats(self):
+        """测试同一来源中重复内容按出现顺序编号"""
+        metadatas = [{"source": "a.pdf"}] * 3
+        ids = assign_document_ids(["页眉", "正文", "页眉"], metadatas)
+        
+        assert ids[0] == make_document_id("a.pdf", "页眉")
+        assert len(set(ids)) == 3
+        assert assign_document_ids(["页眉", "正文", "页眉"], metadatas) == ids
+        
+        # 跨批次共享计数
+        occurrences = {}
+        first = assign_document_ids(["页眉"], metadatas[:1], occurrences)
+        second = assign_document_ids(["页眉"], metadatas[:1], occurrences)
+        assert first != second
+    
+    def test_set_and_get(self):
+        """测试按来源记录"""
+        manifest = IngestManifest()
+        manifest.set("a.txt", {"id1": content_hash("x")})
+        
+        assert manifest.get("a.txt") == {"id1": content_hash("x")}
+        assert manifest.get("b.txt") == {}
+        assert len(manifest) == 1
+        
+        # update合并记录，不影响已有的文档ID
+        manifest.update("a.txt", {"id2": content_hash("x")})
+        assert manifest.get("a.txt") == {"id1": content_hash("x"), "id2": content_hash("x")}
+        
+        manifest.set("a.txt", {})
+        assert manifest.sources() == []
+    
+    def test_save_and_load(self, tmp_path):
+        """测试清单持久化"""
+        path = str(tmp_path / "manifest" / "ingest_manifest.json")
+        manifest = IngestManifest(path)
+        manifest.set("a.txt", {"id1": "h1", "id2": "h2"})
+        manifest.save()
+        
+        reloaded = IngestManifest(path)
+        assert reloaded.get("a.txt") == {"id1": "h1", "id2": "h2"}
+        
+        reloaded.clear()
+        assert len(IngestManifest(path)) == 0
+    
+    def test_load_legacy_format(self, tmp_path):
+        """测试加载按内容哈希保存的旧格式清单"""
+        path = tmp_path / "ingest_manifest.json"
+        path.write_text(json.dumps({"a.txt": {"h1": "id1"}}), encoding="utf-8")
+        
+        assert IngestManifest(str(path)).get("a.txt") == {"id1": "h1"}
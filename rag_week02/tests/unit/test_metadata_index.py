@@ -0,0 +1,71 @@
+"""
+元数据二级索引测试
+"""
+
+from unittest.mock import Mock
+from src.rag_system.database.metadata_index import MetadataIndex
+
+
+class TestMetadataIndex:
+    """元数据二级索引测试类"""
+    
+    def test_add_and_lookup(self):
+        """测试按字段查找文档ID"""
+        index = MetadataIndex(fields=("source", "page"))
+        index.add(["id1", "id2", "id3"], [
+            {"source": "a.pdf", "page": 1},
+            {"source": "a.pdf", "page": 2},
+            {"source": "b.pdf", "page": 1}
+        ])
+        
+        assert index.lookup(source="a.pdf") == {"id1", "id2"}
+        assert index.lookup(source="a.pdf", page=1) == {"id1"}
+        assert index.lookup(source="c.pdf") == set()
+        assert index.lookup(author="张三") is None
+    
+    def test_update_and_remove(self):
+        """测试覆盖写入和删除"""
+        index = MetadataIndex(fields=("source",))
+        index.add(["id1"], [{"source": "a.pdf"}])
+        index.add(["id1"], [{"source": "b.pdf"}])
+        
+        assert index.lookup(source="a.pdf") == set()
+        assert index.lookup(source="b.pdf") == {"id1"}
+        
+        index.remove(["id1"])
+        assert len(index) == 0
+        assert index.values("source") == []
+    
+    def test_persist_and_reload(self, tmp_path):
+        """测试变更日志持久化和重放"""
+        path = str(tmp_path / "index" / "rag.metadata_index.jsonl")
+        index = MetadataIndex(fields=("source", "page"), path=path)
+        index.add(["id1", "id2"], [{"source": "a.pdf", "page": 1}, {"source": "b.pdf", "page": 1}])
+        index.remove(["id2"])
+        
+        reloaded = MetadataIndex(fields=("source", "page"), path=path)
+        assert reloaded.lookup(source="a.pdf", page=1) == {"id1"}
+        assert reloaded.lookup(source="b.pdf") == set()
+        assert len(reloaded) == 1
+    
+    def test_rebuild_pages_through_collection(self):
+        """测试从集合分页重建索引"""
+        collection = Mock()
+        collection.get.side_effect = [
+            {"ids": ["id1", "id2"], "metadatas": [{"source": "a.pdf"}, {"source": "b.pdf"}]},
+            {"ids": ["id3"], "metadatas": [{"source": "a.pdf"}]}
+        ]
+        
+        index = MetadataIndex(fields=("source",))
+        assert index.rebuild(collection, batch_size=2) == 3
+        assert index.lookup(source="a.pdf") == {"id1", "id3"}
+        assert collection.get.call_count == 2
+    
+    def test_rebuild_stops_on_empty_page(self):
+        """测试空页面时停止分页"""
+        collection = Mock()
+        collection.get.return_value = {"ids": [], "metadatas": []}
+        
+        index = MetadataIndex()
+        assert index.rebuild(collection) == 0
+        assert collection.get.call_count == 1
@@ -0,0 +1,146 @@
+"""
+嵌入模型迁移测试
+"""
+
+import threading
+from unittest.mock import MagicMock, Mock, patch
+from src.rag_system.core.migration import EmbeddingMigration
+from src.rag_system.core.rag_system import RAGSystem
+from src.rag_system.database.collection_pool import CollectionPool
+
+
+def _collection(documents):
+    """按get参数返回数据的模拟集合，documents为ID到文本的有序映射"""
+    collection = Mock()
+    
+    def get(ids=None, include=None, limit=None, offset=0, **kwargs):
+        selected = [doc_id for doc_id in documents if ids is None or doc_id in ids]
+        if limit is not None:
+            selected = selected[offset:offset + limit]
+        return {
+            "ids": selected,
+            "documents": [documents[doc_id] for doc_id in selected],
+            "metadatas": [{"source": "test"} for _ in selected]
+        }
+    
+    collection.get.side_effect = get
+    collection.count.side_effect = lambda: len(documents)
+    return collection
+
+
+def _manager(documents):
+    manager = Mock()
+    manager.collection_name = "rag_collection"
+    manager.external_documents = False
+    manager.collection = _collection(documents)
+    manager._collection_count.side_effect = lambda: len(documents)
+    return manager
+
+
+class TestEmbeddingMigration:
+    """嵌入模型迁移测试类"""
+    
+    def _rag_system(self, documents):
+        rag_system = MagicMock()
+        rag_system.tenant = None
+        rag_system.write_lock = threading.RLock()
+        rag_system.db_manager = _manager(documents)
+        return rag_system
+    
+    @patch('src.rag_system.core.migration.ChromaDBManager')
+    def test_copy_and_switch(self, mock_manager_class):
+        """测试分批重新嵌入后切换集合和嵌入客户端"""
+        source_docs = {"id1": "文档1", "id2": "文档2", "id3": "文档3"}
+        shadow_docs = {}
+        rag_system = self._rag_system(source_docs)
+        source = rag_system.db_manager
+        shadow = _manager(shadow_docs)
+        shadow.upsert_documents.side_effect = lambda docs, embs, metas, ids: shadow_docs.update(zip(ids, docs))
+        mock_manager_class.return_value = shadow
+        target = Mock()
+        target.get_embeddings.side_effect = lambda texts: [[0.5, 0.5, 0.5] for _ in texts]
+        
+        progress = EmbeddingMigration(rag_system, target, batch_size=2).start().wait(timeout=5)
+        
+        assert progress["state"] == "switched"
+        assert progress["migrated"] == 3
+        assert shadow.upsert_documents.call_count == 2
+        assert shadow.upsert_documents.call_args_list[0].args[3] == ["id1", "id2"]
+        assert mock_manager_class.call_args.kwargs["client"] is source.client
+        source.rename.assert_called_once()
+        shadow.rename.assert_called_once_with("rag_collection")
+        assert rag_system.db_manager is shadow
+        assert rag_system.embedding_client is target
+    
+    @patch('src.rag_system.core.migration.ChromaDBManager')
+    def test_catch_up_and_resume(self, mock_manager_class):
+        """测试跳过已迁移的文档，并在追赶阶段补写新增文档、删除已删除的文档"""
+        source_docs = {"id1": "文档1", "id2": "文档2"}
+        shadow_docs = {"id1": "文档1", "gone": "旧文档"}
+        rag_system = self._rag_system(source_docs)
+        shadow = _manager(shadow_docs)
+        
+        def upsert(docs, embs, metas, ids):
+            shadow_docs.update(zip(ids, docs))
+            # 模拟复制期间有新文档写入旧集合
+            source_docs.setdefault("id3", "文档3")
+        
+        shadow.upsert_documents.side_effect = upsert
+        shadow.delete_documents.side_effect = lambda ids: [shadow_docs.pop(doc_id) for doc_id in ids]
+        mock_manager_class.return_value = shadow
+        target = Mock()
+        target.get_embeddings.side_effect = lambda texts: [[0.1] for _ in texts]
+        
+        progress = EmbeddingMigration(rag_system, target, batch_size=10).run()
+        
+        embedded = [call.args[0] for call in target.get_embeddings.call_args_list]
+        assert embedded == [["文档2"], ["文档3"]]
+        assert progress["deleted"] == 1
+        assert set(shadow_docs) == {"id1", "id2", "id3"}
+    
+    @patch('src.rag_system.core.migration.ChromaDBManager')
+    def test_stop_keeps_old_collection(self, mock_manager_class):
+        """测试停止迁移后继续使用旧集合"""
+        rag_system = self._rag_system({"id1": "文档1"})
+        source = rag_system.db_manager
+        mock_manager_class.return_value = _manager({})
+        migration = EmbeddingMigration(rag_system, Mock())
+        migration.stop()
+        migration._stop.set = Mock()
+        migration._stop.clear = Mock()
+        
+        progress = migration.run()
+        
+        assert progress["state"] == "stopped"
+        assert rag_system.db_manager is source
+        source.rename.assert_not_called()
+    
+    @patch('src.rag_system.database.collection_pool.ChromaDBManager')
+    @patch('src.rag_system.core.migration.ChromaDBManager')
+    def test_tenant_switch_updates_pool(self, mock_manager_class, mock_pool_manager_class):
+        """测试租户迁移后，新建的租户视图和重新打开的句柄都使用新的嵌入模型"""
+        source_docs = {"id1": "文档1"}
+        shadow_docs = {}
+        mock_pool_manager_class.return_value = _manager(source_docs)
+        shadow = _manager(shadow_docs)
+        shadow.upsert_documents.side_effect = lambda docs, embs, metas, ids: shadow_docs.update(zip(ids, docs))
+        mock_manager_class.return_value = shadow
+        target = Mock()
+        target.get_embeddings.side_effect = lambda texts: [[0.5] for _ in texts]
+        
+        rag_system = object.__new__(RAGSystem)
+        rag_system.embedding_client = Mock()
+        rag_system._pool = CollectionPool(max_size=4, idle_timeout=0)
+        rag_system.tenant = None
+        
+        progress = EmbeddingMigration(rag_system.for_tenant("acme"), target).run()
+        
+        assert progress["state"] == "switched"
+        view = rag_system.for_tenant("acme")
+        assert view.embedding_client is target
+        assert view.db_manager is shadow
+        assert rag_system.for_tenant("beta").embedding_client is rag_system.embedding_client
+        
+        rag_system.pool.evict("acme")
+        rag_system.pool.get("acme")
+        assert mock_pool_manager_class.call_args.kwargs["embedding_function"] == target.get_embeddings
@@ -0,0 +1,146 @@
+"""
+PDF解析测试
+"""
+
+import pytest
+from src.rag_system.ingestion import PDFParser, PDFDocument, DataLoader, ParseCache
+from src.rag_system.ingestion import pdf_parser
+
+pytest.importorskip("pdfplumber")
+
+
+# 两行两列的表格：边框线和单元格文字
+TABLE_PAGE = (
+    "72 700 m 272 700 l S 72 650 m 272 650 l S 72 600 m 272 600 l S "
+    "72 700 m 72 600 l S 172 700 m 172 600 l S 272 700 m 272 600 l S "
+    "BT /F1 12 Tf 80 670 Td (Year) Tj ET BT /F1 12 Tf 180 670 Td (Revenue) Tj ET "
+    "BT /F1 12 Tf 80 620 Td (2023) Tj ET BT /F1 12 Tf 180 620 Td (100) Tj ET"
+)
+
+
+def make_pdf(path, texts, drawings=None):
+    """生成每页一行文字的最小PDF，drawings可为每页追加绘图指令"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for index, text in enumerate(texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        if drawings and drawings[index]:
+            stream += " " + drawings[index]
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(body)
+    return str(path)
+
+
+class TestPDFParser:
+    """PDF解析测试类"""
+
+    def test_parse_returns_structured_pages(self, tmp_path):
+        """测试返回结构化结果"""
+        path = make_pdf(tmp_path / "doc.pdf", ["Page one", "Page two"])
+        document = PDFParser(workers=1).parse(path)
+
+        assert isinstance(document, PDFDocument)
+        assert [page.page_number for page in document.pages] == [1, 2]
+        assert document.pages[0].text == "Page one"
+        assert document.text == "Page one\nPage two"
+        assert document.to_dict()["pages"][1]["tables"] == []
+
+    def test_iter_pages_selected_pages(self, tmp_path):
+        """测试逐页解析指定页"""
+        path = make_pdf(tmp_path / "doc.pdf", ["A1", "B2", "C3"])
+        pages = PDFParser(workers=1).iter_pages(path, page_numbers=[3, 1])
+
+        assert [(page.page_number, page.text) for page in pages] == [(3, "C3"), (1, "A1")]
+
+    def test_parallel_parse_keeps_page_order(self, tmp_path):
+        """测试多进程按页段解析后保持页序"""
+        texts = [f"Page {i}" for i in range(1, 8)]
+        path = make_pdf(tmp_path / "doc.pdf", texts)
+        parser = PDFParser(workers=2, pages_per_task=2)
+        try:
+            document = parser.parse(path)
+        finally:
+            parser.close()
+
+        assert [page.text for page in document.pages] == texts
+        assert [page.page_number for page in document.pages] == list(range(1, 8))
+        # 各工作进程的统计汇总到解析器
+        assert parser.stats()["pages"] == 7
+
+    def test_extraction_profiles(self, tmp_path):
+        """测试各提取范围，表格只在有边框线的页面上提取"""
+        path = make_pdf(tmp_path / "doc.pdf", ["Plain", "Report"], drawings=[None, TABLE_PAGE])
+
+        text_only = PDFParser(workers=1, profile="text")
+        document = text_only.parse(path)
+        assert all(page.tables == [] for page in document.pages)
+        assert text_only.stats()["table_pages"] == 0
+
+        tables = PDFParser(workers=1, profile="tables")
+        document = tables.parse(path)
+        assert document.pages[0].tables == []
+        assert document.pages[1].tables == [[["Year", "Revenue"], ["2023", "100"]]]
+        stats = tables.stats()
+        assert stats["table_pages"] == 1
+        assert stats["skipped_table_pages"] == 1
+        assert stats["pages"] == 2
+
+        with pytest.raises(ValueError):
+            PDFParser(profile="unknown")
+
+    def test_loader_uses_parser_text(self, tmp_path):
+        """测试加载器直接使用解析结果的文本"""
+        path = make_pdf(tmp_path / "doc.pdf", ["Hello"])
+        assert DataLoader(pdf_parser=PDFParser(workers=1)).load(path) == "Hello"
+
+    def test_parse_cache_skips_unchanged_pages(self, tmp_path, monkeypatch):
+        """测试文件未变化时从缓存读取，不再打开PDF"""
+        path = make_pdf(tmp_path / "doc.pdf", ["Page one", "Page two"])
+        cache = ParseCache(str(tmp_path / "cache" / "parse.sqlite3"))
+        first = PDFParser(workers=1, cache=cache).parse(path)
+
+        def fail_open(file_path):
+            raise AssertionError("不应重新解析")
+
+        monkeypatch.setattr(pdf_parser, "_open_pdf", fail_open)
+        parser = PDFParser(workers=1, cache=cache)
+        assert parser.parse(path) == first
+        assert [page.text for page in parser.iter_pages(path)] == ["Page one", "Page two"]
+        assert parser.stats()["pages"] == 0
+        assert parser.stats()["cached_pages"] == 4
+
+        # 提取范围不同时不使用缓存
+        with pytest.raises(AssertionError):
+            PDFParser(workers=1, profile="tables", cache=cache).parse(path)
+
+    def test_parse_cache_fills_missing_pages(self, tmp_path):
+        """测试只解析缓存中缺失的页面，文件内容变化后重新解析"""
+        path = make_pdf(tmp_path / "doc.pdf", ["A1", "B2", "C3"])
+        cache = ParseCache(str(tmp_path / "parse.sqlite3"))
+        assert [page.text for page in PDFParser(workers=1, cache=cache).iter_pages(path, page_numbers=[2])] == ["B2"]
+
+        parser = PDFParser(workers=1, cache=cache)
+        assert parser.parse(path).text == "A1\nB2\nC3"
+        assert parser.stats()["pages"] == 2
+        assert parser.stats()["cached_pages"] == 1
+
+        make_pdf(tmp_path / "doc.pdf", ["A1", "changed"])
+        parser = PDFParser(workers=1, cache=cache)
+        assert parser.parse(path).text == "A1\nchanged"
+        assert parser.stats()["pages"] == 2
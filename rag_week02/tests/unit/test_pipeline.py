@@ -0,0 +1,64 @@
+"""
+流水线测试
+"""
+
+import threading
+import pytest
+from src.rag_system.core.pipeline import Stage, StagedPipeline
+
+
+class TestStagedPipeline:
+    """多阶段流水线测试类"""
+    
+    def test_run_through_stages(self):
+        """测试数据依次经过各个阶段"""
+        pipeline = StagedPipeline([
+            Stage("double", lambda x: x * 2),
+            Stage("inc", lambda x: x + 1, workers=3)
+        ], queue_size=2)
+        
+        results = sorted(pipeline.run(range(10)))
+        
+        assert results == [x * 2 + 1 for x in range(10)]
+        assert pipeline.stats["double"]["items"] == 10
+        assert pipeline.stats["inc"]["items"] == 10
+    
+    def test_backpressure_limits_inflight_items(self):
+        """测试有界队列限制了读取进度"""
+        consumed = []
+        release = threading.Event()
+        
+        def source():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+        
+        def slow(x):
+            release.wait(timeout=5)
+            return x
+        
+        pipeline = StagedPipeline([Stage("slow", slow)], queue_size=2)
+        iterator = pipeline.run(source())
+        
+        threading.Timer(0.3, release.set).start()
+        first = next(iterator)
+        
+        assert first == 0
+        # 输入队列、工作线程和输出队列中最多只能积压少量数据
+        assert len(consumed) < 10
+        assert len(list(iterator)) == 99
+    
+    def test_stage_error_is_raised(self):
+        """测试阶段异常传递给消费者"""
+        def fail(x):
+            raise ValueError("阶段错误")
+        
+        pipeline = StagedPipeline([Stage("fail", fail)])
+        
+        with pytest.raises(RuntimeError, match="流水线阶段 fail 失败"):
+            list(pipeline.run([1, 2, 3]))
+    
+    def test_empty_stages(self):
+        """测试没有阶段时初始化失败"""
+        with pytest.raises(ValueError, match="流水线至少需要一个阶段"):
+            StagedPipeline([])
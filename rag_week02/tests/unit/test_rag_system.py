@@ -5,6 +5,9 @@ RAG系统主框架测试
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from src.rag_system.core.rag_system import RAGSystem
+from src.rag_system.database.chroma_manager import QueryHit
+from src.rag_system.core.circuit_breaker import CircuitOpenError
+from src.rag_system.ingestion import DataLoader, FinancialTermStandardizer, TextChunker
 
 
 class TestRAGSystem:
@@ -53,7 +56,7 @@ class TestRAGSystem:
                 result = rag_system.ingest_documents(["文档1", "文档2"])
                 
                 assert result is True
-                mock_db.add_documents.assert_called_once()
+                mock_db.upsert_documents.assert_called_once()
     
     @patch('src.rag_system.core.rag_system.logger')
     @patch('src.rag_system.core.rag_system.config')
@@ -157,4 +160,326 @@ class TestRAGSystem:
                             assert info['embedding_model'] == 'test_embedding_model'
                             assert info['reranker_model'] == 'test_reranker_model'
                             assert info['llm_model'] == 'test_llm_model'
-                            assert info['collection_info']['count'] == 10
\ No newline at end of file
+                            assert info['collection_info']['count'] == 10
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_stream(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm):
+        """测试流式摄取"""
+        mock_config.ingest.batch_size = 2
+        mock_config.ingest.queue_size = 2
+        mock_config.ingest.embed_workers = 2
+        mock_config.ingest.store_workers = 1
+        mock_embedding_class.return_value.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        
+        rag_system = RAGSystem()
+        records = ((f"文档{i}", {"source": "test"}, f"id{i}") for i in range(5))
+        results = sorted(rag_system.ingest_stream(records), key=lambda r: r["batch"])
+        
+        assert [r["batch"] for r in results] == [0, 1, 2]
+        assert all(r["success"] for r in results)
+        assert results[2]["ids"] == ["id4"]
+        assert mock_db.upsert_documents.call_count == 3
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_stream_with_chunker_and_failure(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm):
+        """测试流式摄取的分块阶段和单批失败"""
+        mock_config.ingest.queue_size = 2
+        mock_config.ingest.embed_workers = 1
+        mock_config.ingest.store_workers = 1
+        mock_config.ingest.chunk_workers = 1
+        
+        def get_embeddings(docs):
+            if "坏" in docs[0]:
+                raise RuntimeError("嵌入失败")
+            return [[0.1] for _ in docs]
+        
+        mock_embedding_class.return_value.get_embeddings.side_effect = get_embeddings
+        mock_db = mock_db_class.return_value
+        
+        def chunker(text, metadata):
+            return [(part, {"part": i}) for i, part in enumerate(text.split("|"))]
+        
+        rag_system = RAGSystem()
+        records = [("好a|好b", {"source": "x"}, "doc1"), ("坏c", {"source": "y"}, "doc2")]
+        results = sorted(rag_system.ingest_stream(records, batch_size=1, chunker=chunker), key=lambda r: r["batch"])
+        
+        assert results[0]["success"] is True
+        assert results[0]["ids"] == ["doc1_0", "doc1_1"]
+        assert results[1]["success"] is False
+        assert "嵌入失败" in results[1]["error"]
+        stored_metadatas = mock_db.upsert_documents.call_args.args[2]
+        assert stored_metadatas == [{"source": "x", "part": 0}, {"source": "x", "part": 1}]
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_files(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm, tmp_path):
+        """测试文件经加载、标准化、分块后写入，读取失败的文件单独报告"""
+        mock_config.ingest.files_per_batch = 2
+        mock_config.ingest.queue_size = 2
+        for stage in ("load", "standardize", "chunk", "embed", "store"):
+            setattr(mock_config.ingest, f"{stage}_workers", 1)
+        mock_config.ingest.terms_path = ""
+        mock_embedding_class.return_value.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        
+        path = tmp_path / "report.txt"
+        path.write_text("icbc annual report", encoding="utf-8")
+        standardizer = FinancialTermStandardizer({"icbc": "ICBC"})
+        
+        rag_system = RAGSystem()
+        results = list(rag_system.ingest_files(
+            [str(path), str(tmp_path / "missing.txt")], standardizer=standardizer, chunker=TextChunker(10, 0)
+        ))
+        
+        assert len(results) == 1
+        assert results[0]["success"] is True
+        assert results[0]["failed"] == [str(tmp_path / "missing.txt")]
+        documents, _, metadatas, ids = mock_db.upsert_documents.call_args.args
+        assert documents == ["ICBC annua", "l report"]
+        assert metadatas[0] == {"source": str(path), "start": 0, "end": 10, "method": "fixed"}
+        assert ids[1].endswith("_1")
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_files_streams_csv(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm, tmp_path):
+        """测试CSV按行组分散到多个批次，元数据包含行范围"""
+        pytest.importorskip("pandas")
+        mock_config.ingest.files_per_batch = 2
+        mock_config.ingest.queue_size = 2
+        for stage in ("load", "standardize", "chunk", "embed", "store"):
+            setattr(mock_config.ingest, f"{stage}_workers", 1)
+        mock_embedding_class.return_value.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        
+        path = tmp_path / "data.csv"
+        path.write_text("name,value\n" + "".join(f"r{i},{i}\n" for i in range(5)), encoding="utf-8")
+        
+        rag_system = RAGSystem()
+        results = list(rag_system.ingest_files(
+            [str(path)], standardizer=FinancialTermStandardizer({}), chunker=TextChunker(100, 0),
+            loader=DataLoader(cache=None, csv_rows=2)
+        ))
+        
+        assert [result["count"] for result in sorted(results, key=lambda r: r["batch"])] == [2, 1]
+        metadatas = [m for call in mock_db.upsert_documents.call_args_list for m in call.args[2]]
+        assert sorted((m["row_start"], m["row_end"]) for m in metadatas) == [(0, 2), (2, 4), (4, 5)]
+        assert all(m["source"] == str(path) for m in metadatas)
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_documents_incremental(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm):
+        """测试增量摄取只嵌入变化的文档并删除过期文档"""
+        mock_config.database.manifest_path = None
+        mock_embedding = mock_embedding_class.return_value
+        mock_embedding.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        mock_db.delete_documents.return_value = True
+        
+        rag_system = RAGSystem()
+        metadatas = [{"source": "a.txt"}, {"source": "a.txt"}]
+        assert rag_system.ingest_documents(["段落1", "段落2"], metadatas, incremental=True) is True
+        assert mock_embedding.get_embeddings.call_args.args[0] == ["段落1", "段落2"]
+        first_ids = mock_db.upsert_documents.call_args.args[3]
+        
+        # 第二次摄取：段落1未变化，段落2被修改
+        mock_embedding.get_embeddings.reset_mock()
+        assert rag_system.ingest_documents(["段落1", "段落2（修订）"], metadatas, incremental=True) is True
+        
+        assert mock_embedding.get_embeddings.call_args.args[0] == ["段落2（修订）"]
+        mock_db.delete_documents.assert_called_once_with([first_ids[1]])
+        
+        # 第三次摄取：没有任何变化
+        mock_embedding.get_embeddings.reset_mock()
+        assert rag_system.ingest_documents(["段落1", "段落2（修订）"], metadatas, incremental=True) is True
+        mock_embedding.get_embeddings.assert_not_called()
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_documents_incremental_repeated_content(self, mock_config, mock_embedding_class, mock_db_class,
+                                                           mock_reranker, mock_llm):
+        """测试增量摄取分别跟踪同一来源中重复的内容"""
+        mock_config.database.manifest_path = None
+        mock_embedding = mock_embedding_class.return_value
+        mock_embedding.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        mock_db.delete_documents.return_value = True
+        
+        rag_system = RAGSystem()
+        metadatas = [{"source": "a.pdf"}] * 3
+        assert rag_system.ingest_documents(["页眉", "正文", "页眉"], metadatas, incremental=True) is True
+        ids = mock_db.upsert_documents.call_args.args[3]
+        assert len(set(ids)) == 3
+        assert set(rag_system.manifest.get("a.pdf")) == set(ids)
+        
+        # 重复的页眉各自被记录，再次摄取不需要嵌入
+        mock_embedding.get_embeddings.reset_mock()
+        assert rag_system.ingest_documents(["页眉", "正文", "页眉"], metadatas, incremental=True) is True
+        mock_embedding.get_embeddings.assert_not_called()
+        mock_db.delete_documents.assert_not_called()
+        
+        # 去掉一个页眉后只删除多出来的那份
+        assert rag_system.ingest_documents(["页眉", "正文"], metadatas[:2], incremental=True) is True
+        mock_embedding.get_embeddings.assert_not_called()
+        mock_db.delete_documents.assert_called_once_with([ids[2]])
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_documents_full_then_incremental(self, mock_config, mock_embedding_class, mock_db_class,
+                                                    mock_reranker, mock_llm):
+        """测试全量摄取也写入清单，之后的增量摄取不重复嵌入"""
+        mock_config.database.manifest_path = None
+        mock_embedding = mock_embedding_class.return_value
+        mock_embedding.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        
+        rag_system = RAGSystem()
+        metadatas = [{"source": "a.txt"}, {"source": "a.txt"}]
+        assert rag_system.ingest_documents(["段落1", "段落2"], metadatas) is True
+        assert len(rag_system.manifest.get("a.txt")) == 2
+        
+        mock_embedding.get_embeddings.reset_mock()
+        mock_db.upsert_documents.reset_mock()
+        assert rag_system.ingest_documents(["段落1", "段落2"], metadatas, incremental=True) is True
+        mock_embedding.get_embeddings.assert_not_called()
+        mock_db.upsert_documents.assert_not_called()
+        mock_db.delete_documents.assert_not_called()
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_clear_database_clears_manifest_when_empty(self, mock_config, mock_embedding_class, mock_db_class,
+                                                       mock_reranker, mock_llm):
+        """测试集合为空时也清空摄取清单"""
+        mock_config.database.manifest_path = None
+        mock_db = mock_db_class.return_value
+        mock_db.get_collection_info.return_value = {"count": 0}
+        
+        rag_system = RAGSystem()
+        rag_system.manifest.set("a.txt", {"id1": "h1"})
+        
+        assert rag_system.clear_database() is True
+        assert len(rag_system.manifest) == 0
+        mock_db.reset.assert_not_called()
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_ingest_documents_repeated_content(self, mock_config, mock_embedding_class, mock_db_class, mock_reranker, mock_llm):
+        """测试同一来源中重复的内容得到不同的ID，且只嵌入一次"""
+        mock_config.database.manifest_path = None
+        mock_embedding = mock_embedding_class.return_value
+        mock_embedding.get_embeddings.side_effect = lambda docs: [[0.1] for _ in docs]
+        mock_db = mock_db_class.return_value
+        
+        rag_system = RAGSystem()
+        result = rag_system.ingest_documents(["页眉", "正文", "页眉"], [{"source": "a.pdf"}] * 3)
+        
+        assert result is True
+        assert mock_embedding.get_embeddings.call_count == 1
+        documents, embeddings, metadatas, ids = mock_db.upsert_documents.call_args.args
+        assert embeddings == [[0.1], [0.1], [0.1]]
+        assert len(set(ids)) == 3
+        
+        # 再次摄取相同输入得到相同的ID
+        rag_system.ingest_documents(["页眉", "正文", "页眉"], [{"source": "a.pdf"}] * 3)
+        assert mock_db.upsert_documents.call_args.args[3] == ids
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_query_fetches_text_for_context_only(self, mock_config, mock_embedding_class, mock_db_class,
+                                                 mock_reranker_class, mock_llm_class):
+        """测试外部文档存储模式下只为进入上下文的结果取回文本"""
+        mock_db = mock_db_class.return_value
+        mock_db.external_documents = True
+        mock_db.query.return_value = [QueryHit("id1", distance=0.1), QueryHit("id2", distance=0.2),
+                                      QueryHit("id3", distance=0.3)]
+        mock_db.fetch_documents.return_value = ["文档1", "文档2"]
+        mock_llm_class.return_value.generate_with_context.return_value = "回答"
+        
+        rag_system = RAGSystem()
+        result = rag_system.query("测试问题", use_rerank=False, top_n=2)
+        
+        assert mock_db.query.call_args.kwargs['include'] == ("metadatas", "distances")
+        mock_db.fetch_documents.assert_called_once_with(["id1", "id2"])
+        assert result['context'] == "文档1\n文档2"
+    
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_query_degrades_when_services_unavailable(self, mock_config, mock_embedding_class, mock_db_class,
+                                                      mock_reranker_class, mock_llm_class):
+        """测试重排序和大语言模型熔断时退回检索结果"""
+        mock_db = mock_db_class.return_value
+        mock_db.external_documents = False
+        mock_db.query.return_value = [QueryHit("id1", "文档1", distance=0.1), QueryHit("id2", "文档2", distance=0.2)]
+        mock_reranker_class.return_value.rerank.side_effect = CircuitOpenError("重排序模型服务熔断中")
+        mock_llm_class.return_value.generate_with_context.side_effect = CircuitOpenError("大语言模型服务熔断中")
+        
+        rag_system = RAGSystem()
+        result = rag_system.query("测试问题", top_n=1)
+        
+        assert result['context'] == "文档1"
+        assert result['reranked_documents'] == []
+        assert result['degraded'] == ["rerank", "llm"]
+        assert result['answer'].startswith(RAGSystem.PASSAGES_ONLY_ANSWER)
+        assert "文档1" in result['answer']
+    
+    @patch('src.rag_system.core.rag_system.CollectionPool')
+    @patch('src.rag_system.core.rag_system.CustomLLM')
+    @patch('src.rag_system.core.rag_system.CustomReranker')
+    @patch('src.rag_system.core.rag_system.ChromaDBManager')
+    @patch('src.rag_system.core.rag_system.CustomEmbedding')
+    @patch('src.rag_system.core.rag_system.config')
+    def test_for_tenant_shares_clients(self, mock_config, mock_embedding_class, mock_db_class,
+                                       mock_reranker_class, mock_llm_class, mock_pool_class):
+        """测试租户视图共享模型客户端，只替换集合管理器和摄取清单"""
+        mock_pool = mock_pool_class.return_value
+        tenant_db = Mock()
+        mock_pool.get.return_value = tenant_db
+        mock_pool.embedding.return_value = None
+        
+        rag_system = RAGSystem()
+        view = rag_system.for_tenant("acme")
+        rag_system.for_tenant("beta")
+        
+        mock_pool_class.assert_called_once()
+        assert mock_pool_class.call_args.kwargs['client'] is rag_system.db_manager.client
+        assert view.db_manager is tenant_db
+        assert view.manifest is mock_pool.manifest.return_value
+        assert view.embedding_client is rag_system.embedding_client
+        assert view.llm_client is rag_system.llm_client
+        assert rag_system.db_manager is mock_db_class.return_value
+        assert view.tenant == "acme" and rag_system.tenant is None
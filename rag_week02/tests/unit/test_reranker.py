@@ -5,6 +5,7 @@
 import pytest
 from unittest.mock import Mock, patch
 from src.rag_system.reranker.custom_reranker import CustomReranker
+from src.rag_system.core.scheduler import scheduler
 
 
 class TestCustomReranker:
@@ -108,4 +109,37 @@ class TestCustomReranker:
             reranker = CustomReranker()
             
             with pytest.raises(RuntimeError, match="重排序API请求失败"):
-                reranker.rerank("查询", ["文档1"])
\ No newline at end of file
+                reranker.rerank("查询", ["文档1"])
+    
+    @patch('src.rag_system.reranker.custom_reranker.requests.post')
+    def test_rerank_retries_after_rate_limit(self, mock_post):
+        """测试被限流时按Retry-After等待后重试"""
+        throttled = Mock(status_code=429, headers={"retry-after": "0.05"})
+        success = Mock(status_code=200, headers={})
+        success.json.return_value = {"results": [{"index": 0, "relevance_score": 0.9}]}
+        mock_post.side_effect = [throttled, success]
+        
+        with patch('src.rag_system.reranker.custom_reranker.config') as mock_config:
+            mock_config.reranker.api_key = 'test_key'
+            
+            reranker = CustomReranker()
+            result = reranker.rerank("查询", ["文档1"])
+            
+            assert result[0]['relevance_score'] == 0.9
+            assert mock_post.call_count == 2
+            assert scheduler.stats()[reranker._rate_key(reranker.endpoints.urls[0])]["throttled"] == 1
+    
+    @patch('src.rag_system.reranker.custom_reranker.requests.post')
+    def test_rerank_fails_over_to_next_endpoint(self, mock_post):
+        """测试配置多个地址时，服务端错误切换到其他端点"""
+        failed = Mock(status_code=503, headers={})
+        success = Mock(status_code=200, headers={})
+        success.json.return_value = {"results": [{"index": 0, "relevance_score": 0.9}]}
+        mock_post.side_effect = [failed, success]
+        
+        reranker = CustomReranker(api_key='test_key', base_url='http://a/v1,http://b/v1', model_name='m')
+        result = reranker.rerank("查询", ["文档1"])
+        
+        assert result[0]['relevance_score'] == 0.9
+        urls = [call.args[0] for call in mock_post.call_args_list]
+        assert sorted(urls) == ["http://a/v1/rerank", "http://b/v1/rerank"]
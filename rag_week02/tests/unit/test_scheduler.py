@@ -0,0 +1,187 @@
+"""
+模型调用调度器测试
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from src.rag_system.core.scheduler import (
+    RateLimitScheduler, TokenBucket, RateLimitError, CallResult, estimate_tokens,
+    priority, current_priority, INTERACTIVE, BULK
+)
+
+
+class TestTokenBucket:
+    """令牌桶测试类"""
+
+    def test_reserve_within_capacity(self):
+        """测试余额充足时无需等待"""
+        bucket = TokenBucket(per_minute=600)
+        assert bucket.reserve(50, bucket._updated) == 0.0
+
+    def test_shortfall_over_capacity(self):
+        """测试余额不足时按速率计算等待时间，超过容量的请求只需等到桶满"""
+        bucket = TokenBucket(per_minute=600)  # 每秒10个，容量100
+        now = bucket._updated
+        bucket.reserve(100, now)
+        assert bucket.shortfall(20, now) == pytest.approx(2.0)
+        assert bucket.shortfall(500, now) == pytest.approx(10.0)
+
+    def test_refund_and_clamp(self):
+        """测试结算归还和按服务端剩余额度校正"""
+        bucket = TokenBucket(per_minute=600)
+        now = bucket._updated
+        bucket.reserve(80, now)
+        bucket.refund(30, now)
+        assert bucket.level == pytest.approx(50)
+        bucket.clamp(10, now)
+        assert bucket.level == pytest.approx(10)
+
+
+class TestRateLimitScheduler:
+    """速率限制调度器测试类"""
+
+    def test_estimate_tokens(self):
+        """测试中文按字计数，其他文本按4个字符计数"""
+        assert estimate_tokens(["中文文本"]) == 4
+        assert estimate_tokens(["abcdefgh"]) == 2
+        assert estimate_tokens([]) == 1
+
+    def test_configure_ignores_invalid_limits(self):
+        """测试非数值限额视为不限制"""
+        scheduler = RateLimitScheduler()
+        scheduler.configure("ep", rpm=Mock(), tpm=None)
+        assert scheduler.acquire("ep", tokens=10 ** 6) == pytest.approx(0, abs=0.05)
+
+    def test_acquire_waits_when_over_budget(self):
+        """测试超出token预算时等待"""
+        scheduler = RateLimitScheduler(headroom=1.0)
+        scheduler.configure("ep", tpm=60000)  # 每秒1000个，容量10000
+        scheduler.acquire("ep", tokens=10000)
+        wait = scheduler.acquire("ep", tokens=100)
+
+        assert wait == pytest.approx(0.1, abs=0.05)
+        assert scheduler.stats()["ep"]["calls"] == 2
+
+    def test_call_retries_after_rate_limit(self):
+        """测试被限流后按Retry-After等待并重试"""
+        scheduler = RateLimitScheduler()
+        scheduler.configure("ep", rpm=60)
+        func = Mock(side_effect=[
+            RateLimitError("429", headers={"retry-after": "0.1"}),
+            CallResult("ok", {}, 10)
+        ])
+
+        start = time.monotonic()
+        assert scheduler.call("ep", func, tokens=10) == "ok"
+        assert time.monotonic() - start >= 0.1
+        assert func.call_count == 2
+        stats = scheduler.stats()["ep"]
+        assert stats["throttled"] == 1
+        assert stats["rate_factor"] < 1.0
+        assert stats["lanes"][INTERACTIVE]["active"] == 0
+
+    def test_call_raises_after_max_retries(self):
+        """测试超过重试次数后抛出限流异常"""
+        scheduler = RateLimitScheduler()
+        func = Mock(side_effect=RateLimitError("429", retry_after=0.01))
+
+        with pytest.raises(RateLimitError):
+            scheduler.call("ep", func, max_retries=2)
+        assert func.call_count == 3
+
+    def test_observe_clamps_to_remaining_headers(self):
+        """测试以响应头中的剩余额度为准"""
+        scheduler = RateLimitScheduler(headroom=1.0)
+        scheduler.configure("ep", tpm=60000)
+        scheduler.observe("ep", {"x-ratelimit-remaining-tokens": "5", "x-ratelimit-reset-tokens": "1s"})
+
+        assert scheduler.acquire("ep", tokens=105) == pytest.approx(0.1, abs=0.05)
+
+    def test_observe_pauses_when_quota_exhausted(self):
+        """测试剩余额度为0时暂停到重置时间"""
+        scheduler = RateLimitScheduler()
+        scheduler.configure("ep", rpm=1000)
+        scheduler.observe("ep", {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "6m0s"})
+
+        state = scheduler._endpoints["ep"]
+        assert state.paused_until - time.monotonic() == pytest.approx(360, abs=1)
+        assert scheduler._blocked(state, INTERACTIVE, 0, time.monotonic()) > 350
+
+    def test_throttle_backoff_resets_after_success(self):
+        """测试没有Retry-After时按连续限流次数退避，正常响应后重新从短暂停开始"""
+        scheduler = RateLimitScheduler()
+        scheduler.configure("ep", rpm=1000)
+        for _ in range(7):
+            scheduler.observe("ep", {}, throttled=True)
+        state = scheduler._endpoints["ep"]
+        assert state.paused_until - time.monotonic() == pytest.approx(60, abs=1)
+
+        scheduler.observe("ep", {})
+        state.paused_until = 0.0
+        scheduler.observe("ep", {}, throttled=True)
+
+        assert state.paused_until - time.monotonic() == pytest.approx(2, abs=0.5)
+        assert state.throttled == 8
+
+    def test_settle_refunds_unused_tokens(self):
+        """测试按实际用量结算后归还多预留的token"""
+        scheduler = RateLimitScheduler(headroom=1.0)
+        scheduler.configure("ep", tpm=600)
+        scheduler.acquire("ep", tokens=100)
+        scheduler.settle("ep", reserved=100, actual=10)
+
+        assert scheduler._endpoints["ep"].tokens.level == pytest.approx(90, abs=1)
+
+
+class TestPriorityLanes:
+    """优先级通道测试类"""
+
+    def test_priority_context(self):
+        """测试默认通道为交互通道，上下文结束后恢复"""
+        assert current_priority() == INTERACTIVE
+        with priority(BULK):
+            assert current_priority() == BULK
+        assert current_priority() == INTERACTIVE
+        with pytest.raises(ValueError):
+            with priority("unknown"):
+                pass
+
+    def test_lane_concurrency_cap(self):
+        """测试批量通道的并发上限"""
+        scheduler = RateLimitScheduler(bulk_concurrency=1)
+        scheduler.acquire("ep", lane=BULK)
+        acquired = threading.Event()
+        worker = threading.Thread(target=lambda: (scheduler.acquire("ep", lane=BULK), acquired.set()))
+        worker.start()
+
+        assert not acquired.wait(0.1)
+        # 交互通道不受批量通道上限影响
+        assert scheduler.acquire("ep", lane=INTERACTIVE) == pytest.approx(0, abs=0.05)
+        scheduler.release("ep", lane=BULK)
+        assert acquired.wait(1)
+        worker.join()
+
+    def test_interactive_preempts_queued_bulk(self):
+        """测试预算不足时排队的交互调用先于批量调用放行"""
+        scheduler = RateLimitScheduler(headroom=1.0, interactive_concurrency=0, bulk_concurrency=0)
+        scheduler.configure("ep", tpm=6000)  # 每秒100个，容量1000
+        scheduler.acquire("ep", tokens=1000, lane=BULK)
+        order = []
+
+        def run(lane, delay):
+            time.sleep(delay)
+            with priority(lane):
+                scheduler.acquire("ep", tokens=50)
+            order.append(lane)
+
+        bulk = threading.Thread(target=run, args=(BULK, 0))
+        interactive = threading.Thread(target=run, args=(INTERACTIVE, 0.05))
+        bulk.start()
+        interactive.start()
+        bulk.join(5)
+        interactive.join(5)
+
+        assert order == [INTERACTIVE, BULK]
+        assert scheduler.stats()["ep"]["lanes"][BULK]["calls"] == 2